@@ -0,0 +1,24 @@
+"""
+Diagnostic endpoints for operators
+"""
+from fastapi import APIRouter, Query
+
+from app.core.loop_monitor import loop_monitor
+
+router = APIRouter()
+
+@router.get("/admin/loop")
+async def loop_report(limit: int = Query(20, ge=1, le=100)):
+    """
+    Event loop lag percentiles and the code locations that blocked the
+    loop longest, with their stacks. Empty unless AHA_LOOP_MONITOR_ENABLED.
+    """
+    return loop_monitor.report(limit)
+
+@router.delete("/admin/loop")
+async def reset_loop_report():
+    """
+    Forget recorded stalls, e.g. after a deploy
+    """
+    loop_monitor.reset()
+    return {"status": "reset"}
@@ -1,38 +1,115 @@
 """
 API endpoints for incident management
 """
-from fastapi import APIRouter, HTTPException
-from typing import List
+import asyncio
+from datetime import datetime
+from fastapi import APIRouter, HTTPException, Query, Header
+from fastapi.responses import StreamingResponse
+from typing import Optional
 
-from app.models.incident import IncidentResponse
-from app.storage.memory_store import memory_store
+from app.core.config import settings
+from app.core.events import incident_events
+from app.core.tracing import tracer
+from app.models.incident import IncidentResponse, IncidentPage
+from app.services.dedup_service import dedup_service
+from app.services.diagnosis_cache import diagnosis_cache
+from app.services.diagnosis_service import diagnosis_service
+from app.services.github_service import github_service
+from app.services.langsmith_service import langsmith_service
+from app.services.llm_router import llm_router
+from app.services.rule_classifier import rule_classifier
+from app.services.run_ingestion import run_cache, run_ingestor
+from app.services.run_tree import RunTree
+from app.services.similarity_index import similarity_index
+from app.services.trace_compactor import trace_compactor
+from app.storage.base import IncidentFilter
+from app.storage.factory import incident_store
 
 router = APIRouter()
 
-@router.get("/incidents", response_model=List[IncidentResponse])
-async def get_incidents():
+@router.get("/incidents", response_model=IncidentPage)
+async def get_incidents(
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = None,
+    status: Optional[str] = None,
+    error_type: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None
+):
     """
-    Get all incidents for the dashboard
+    Get one page of incidents for the dashboard, newest first.
+
+    Pass the returned `next_cursor` back as `cursor` to fetch the next page.
+    `since` is inclusive and `until` exclusive.
+    """
+    filters = IncidentFilter(
+        status=status,
+        error_type=error_type,
+        created_after=since,
+        created_before=until
+    )
+    try:
+        return incident_store.list_incidents(limit=limit, cursor=cursor, filters=filters)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/incidents/stream")
+async def stream_incidents(
+    since: Optional[int] = None,
+    last_event_id: Optional[int] = Header(None)
+):
+    """
+    Server-Sent Events stream of incident deltas (created, updated, cleared).
+
+    Each event carries an id usable as a resume token, either via the
+    `since` query parameter or the `Last-Event-ID` header that browsers send
+    automatically on reconnect. A `reset` event means the client should
+    reload the incident list.
     """
-    incidents = memory_store.get_all_incidents()
-    return incidents
+    resume_from = last_event_id if last_event_id is not None else since
+    return StreamingResponse(
+        incident_events.subscribe(resume_from),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 @router.get("/incidents/{incident_id}", response_model=IncidentResponse)
 async def get_incident(incident_id: str):
     """
     Get a specific incident by ID
     """
-    incident = memory_store.get_incident(incident_id)
+    incident = incident_store.get_incident(incident_id)
     if not incident:
         raise HTTPException(status_code=404, detail="Incident not found")
     return incident
 
+@router.get("/incidents/{incident_id}/trace-tree")
+async def get_incident_trace_tree(incident_id: str):
+    """
+    Shape of the incident's trace: the path down to the root-cause run, that
+    run's siblings, and the path of slowest runs
+    """
+    incident = incident_store.get_incident(incident_id)
+    if not incident:
+        raise HTTPException(status_code=404, detail="Incident not found")
+    trace_data = run_cache.get_trace(incident.trace_id) if settings.langsmith_ingest_enabled else None
+    if trace_data is None:
+        trace_data = await langsmith_service.get_trace(incident.trace_id)
+    if not trace_data:
+        raise HTTPException(status_code=404, detail="Trace not available")
+    # Indexing a trace with tens of thousands of runs takes a while; keep it off the loop
+    summary = await asyncio.to_thread(lambda: RunTree(trace_data["runs"]).summary())
+    return {"trace_id": incident.trace_id, **summary}
+
 @router.delete("/incidents")
 async def clear_incidents():
     """
     Clear all incidents (for demo purposes)
     """
-    memory_store.clear_all()
+    incident_store.clear_all()
+    dedup_service.clear()
+    similarity_index.clear()
+    incident_events.publish("cleared")
     return {"message": "All incidents cleared"}
 
 @router.get("/health")
@@ -40,8 +117,19 @@ async def health_check():
     """
     Health check endpoint
     """
-    incident_count = len(memory_store.get_all_incidents())
+    incident_count = incident_store.count_incidents()
     return {
         "status": "healthy",
-        "incident_count": incident_count
+        "incident_count": incident_count,
+        "incidents_by_status": incident_store.count_by_status(),
+        "incident_store": incident_store.stats(),
+        "diagnosis_cache": diagnosis_cache.stats(),
+        "rule_classifier": rule_classifier.stats(),
+        "similarity_index": similarity_index.stats(),
+        "trace_compaction": trace_compactor.stats(),
+        "llm": llm_router.stats(),
+        "diagnosis_batching": diagnosis_service.batcher.stats() if diagnosis_service.batcher else None,
+        "github": github_service.stats(),
+        "run_ingestion": run_ingestor.stats(),
+        "tracing": tracer.stats()
     }
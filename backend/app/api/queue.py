@@ -0,0 +1,38 @@
+"""
+API endpoints for inspecting the incident processing queue
+"""
+from fastapi import APIRouter, HTTPException, Query
+
+from app.pipeline.job_queue import job_queue
+from app.pipeline.processor import worker_pool
+
+router = APIRouter()
+
+@router.get("/queue")
+async def queue_status():
+    """
+    Queue depth by status plus worker counters
+    """
+    return {
+        "jobs": job_queue.stats(),
+        "workers": worker_pool.worker_count,
+        "processed": worker_pool.processed,
+        "failed_attempts": worker_pool.failed
+    }
+
+@router.get("/queue/dead")
+async def dead_letters(limit: int = Query(100, ge=1, le=1000)):
+    """
+    Jobs that exhausted their retries
+    """
+    return job_queue.dead_letters(limit)
+
+@router.post("/queue/dead/{job_id}/retry")
+async def retry_dead_letter(job_id: int):
+    """
+    Put a dead-lettered job back on the queue
+    """
+    if not job_queue.retry_dead(job_id):
+        raise HTTPException(status_code=404, detail="Dead letter not found")
+    worker_pool.notify()
+    return {"status": "requeued", "job_id": job_id}
@@ -1,85 +1,113 @@
 """
 Webhook endpoints for receiving notifications from LangSmith
 """
-from fastapi import APIRouter, HTTPException, BackgroundTasks
+from fastapi import APIRouter, Body, HTTPException
+from datetime import datetime
+from typing import Any, Dict
 import logging
+import time
 
+from app.core.config import settings
+from app.core.events import incident_events
+from app.core.metrics import webhooks_received
+from app.core.tracing import tracer
 from app.models.incident import LangSmithWebhookPayload
-from app.services.langsmith_service import langsmith_service
-from app.services.diagnosis_service import diagnosis_service
-from app.services.github_service import github_service
-from app.storage.memory_store import memory_store
+from app.pipeline.job_queue import job_queue
+from app.pipeline.processor import worker_pool
+from app.services.dedup_service import dedup_service
+from app.services.run_ingestion import run_cache
+from app.storage.factory import incident_store
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
 @router.post("/langsmith")
-async def langsmith_webhook(
-    payload: LangSmithWebhookPayload,
-    background_tasks: BackgroundTasks
-):
+async def langsmith_webhook(payload: LangSmithWebhookPayload):
     """
     Receive webhook notifications from LangSmith when errors occur
     """
+    received_ns = time.time_ns()
     logger.info(f"Received LangSmith webhook for trace: {payload.trace_id}")
-    
+
     # Only process error events
     if payload.status != "error" or not payload.error:
+        webhooks_received.inc(status="ignored")
         return {"status": "ignored", "reason": "not an error event"}
-    
-    # Add background task to process the incident
-    background_tasks.add_task(
-        process_incident,
-        payload.trace_id,
-        payload.error.get("type", "unknown"),
-        payload.error.get("message", "No error message provided")
-    )
-    
-    return {"status": "accepted", "trace_id": payload.trace_id}
 
-async def process_incident(trace_id: str, error_type: str, error_message: str):
-    """
-    Background task to process an incident
-    """
+    error_type = payload.error.get("type", "unknown")
+    error_message = payload.error.get("message", "No error message provided")
+
+    # Collapse retries and error storms onto the existing incident
+    decision = dedup_service.check(payload.trace_id, payload.run_id, error_type, error_message)
+    if decision.action == "duplicate" or not dedup_service.claim(payload.run_id):
+        # A concurrent delivery on another worker may not have its incident yet
+        incident_id = decision.incident.id if decision.incident else None
+        webhooks_received.inc(status="duplicate")
+        return {"status": "duplicate", "trace_id": payload.trace_id, "incident_id": incident_id}
+    incident = None
+    created = False
     try:
-        logger.info(f"Processing incident for trace: {trace_id}")
-        
-        # 1. Create incident record
-        langsmith_url = f"https://smith.langchain.com/trace/{trace_id}"
-        incident = memory_store.create_incident(
-            trace_id=trace_id,
+        if decision.action == "coalesced":
+            incident = incident_store.record_occurrence(decision.incident.id, datetime.utcnow())
+            if incident is None:
+                # Removed since the check by retention, a clear or another worker's rollback
+                logger.info(f"Incident {decision.incident.id} is gone, recording trace "
+                            f"{payload.trace_id} as a new incident")
+            else:
+                dedup_service.remember(payload.run_id, incident.id)
+                incident_events.publish("updated", incident)
+                logger.info(f"Coalesced trace {payload.trace_id} into incident {incident.id} "
+                            f"({incident.occurrence_count} occurrences)")
+                webhooks_received.inc(status="coalesced")
+                tracer.record(incident.id, "webhook", received_ns, time.time_ns(),
+                              status="coalesced", trace_id=payload.trace_id, run_id=payload.run_id)
+                return {"status": "coalesced", "trace_id": payload.trace_id, "incident_id": incident.id}
+
+        # Record the incident right away, then queue the slow work
+        langsmith_url = f"https://smith.langchain.com/trace/{payload.trace_id}"
+        incident = incident_store.create_incident(
+            trace_id=payload.trace_id,
             error_type=error_type,
             error_message=error_message,
-            langsmith_trace_url=langsmith_url
-        )
-        
-        # 2. Fetch full trace data from LangSmith
-        trace_data = await langsmith_service.get_trace(trace_id)
-        if not trace_data:
-            logger.error(f"Failed to fetch trace data for {trace_id}")
-            return
-        
-        # 3. Analyze with LLM
-        diagnosis_result = await diagnosis_service.analyze_trace(trace_data)
-        
-        # 4. Create GitHub issue
-        github_url = await github_service.create_issue(
-            title=f"Agent Failure: {error_type}",
-            trace_id=trace_id,
-            diagnosis_result=diagnosis_result,
-            langsmith_url=langsmith_url
+            langsmith_trace_url=langsmith_url,
+            fingerprint=decision.fingerprint
         )
-        
-        # 5. Update incident with results
-        memory_store.update_incident(
-            incident.id,
-            diagnosis=diagnosis_result.diagnosis,
-            confidence_score=diagnosis_result.confidence_score,
-            github_issue_url=github_url,
-            status="analyzed"
+        created = True
+        dedup_service.remember(payload.run_id, incident.id)
+        incident_events.publish("created", incident)
+
+        job_queue.enqueue(
+            {
+                "trace_id": payload.trace_id,
+                "run_id": payload.run_id,
+                "error_type": error_type,
+                "langsmith_url": langsmith_url,
+                "fingerprint": decision.fingerprint
+            },
+            incident_id=incident.id
         )
-        
-        logger.info(f"Successfully processed incident {incident.id}")
-        
-    except Exception as e:
-        logger.error(f"Error processing incident for trace {trace_id}: {str(e)}")
+        worker_pool.notify()
+    except Exception:
+        # Unclaim the run, and drop an incident that never got a job, so
+        # LangSmith's redelivery is accepted instead of dropped as a duplicate
+        if created:
+            incident_store.delete_incident(incident.id)
+        dedup_service.forget(payload.run_id)
+        raise
+
+    webhooks_received.inc(status="accepted")
+    tracer.record(incident.id, "webhook", received_ns, time.time_ns(),
+                  status="accepted", trace_id=payload.trace_id, run_id=payload.run_id)
+    return {"status": "accepted", "trace_id": payload.trace_id, "incident_id": incident.id}
+
+@router.post("/langsmith/runs")
+async def langsmith_runs_webhook(body: Dict[str, Any] = Body(...)):
+    """
+    Receive finished runs, either one run or {"runs": [...]}, and cache
+    them so their trace is assembled before any error webhook for it
+    """
+    if not settings.langsmith_ingest_enabled:
+        # The cache is only read with ingestion on, so accepting runs would just fill memory
+        raise HTTPException(status_code=409, detail="Run ingestion is disabled (LANGSMITH_INGEST_ENABLED)")
+    runs = body.get("runs") if isinstance(body.get("runs"), list) else [body]
+    return {"status": "cached", "runs": run_cache.add_runs(runs)}
@@ -4,6 +4,8 @@ Configuration management using Pydantic settings
 from pydantic_settings import BaseSettings
 from typing import Optional
 
+from app.core.registry import services
+
 class Settings(BaseSettings):
     """Application settings loaded from environment variables"""
     
@@ -11,20 +13,124 @@ class Settings(BaseSettings):
     langsmith_api_key: str
     langsmith_project: str = "aha-demo"
     langsmith_webhook_secret: Optional[str] = None
+    langsmith_api_url: str = "https://api.smith.langchain.com"
+    langsmith_page_size: int = 100
+    langsmith_max_concurrent_fetches: int = 8
+    langsmith_max_connections: int = 20
+    langsmith_timeout_seconds: float = 30.0
+
+    # Run Ingestion (assemble traces locally before their error webhook)
+    langsmith_ingest_enabled: bool = False
+    langsmith_ingest_poll: bool = True  # false: only runs pushed to /webhook/langsmith/runs
+    langsmith_ingest_poll_seconds: float = 2.0
+    langsmith_ingest_lookback_seconds: float = 60.0  # re-read runs that were still in progress
+    langsmith_run_cache_traces: int = 5000
+    langsmith_run_cache_ttl_seconds: float = 3600.0
     
     # LLM Configuration
     openai_api_key: Optional[str] = None
     anthropic_api_key: Optional[str] = None
+    anthropic_base_url: Optional[str] = None  # point at a proxy or the demo fake
+
+    # LLM Providers (those in llm_providers with an API key are used)
+    llm_providers: str = "anthropic,openai"
+    anthropic_model: str = "claude-3-5-sonnet-20241022"
+    anthropic_max_concurrency: int = 16
+    openai_base_url: str = "https://api.openai.com/v1"
+    openai_model: str = "gpt-4o"
+    openai_max_concurrency: int = 16
+    llm_breaker_failures: int = 5
+    llm_breaker_reset_seconds: float = 30.0
+    llm_hedge_enabled: bool = False
+    llm_hedge_min_delay_seconds: float = 2.0
+
+    # Rule-based Classification (known failures are diagnosed without the LLM)
+    diagnosis_rules_enabled: bool = True
+    diagnosis_rules_min_confidence: float = 0.8
+
+    # Diagnosis Cache
+    diagnosis_cache_enabled: bool = True
+    diagnosis_cache_size: int = 1024
+    diagnosis_cache_ttl_seconds: float = 86400.0
+    diagnosis_cache_path: Optional[str] = None  # SQLite file for the on-disk tier
+
+    # Trace Compaction
+    diagnosis_token_budget: int = 6000
+    diagnosis_payload_token_limit: int = 400
+
+    # Streaming Diagnosis (publish fields to the dashboard as they arrive)
+    diagnosis_streaming_enabled: bool = True
+
+    # Batched Diagnosis (raise AHA_WORKER_COUNT so batches can fill)
+    diagnosis_batch_enabled: bool = False
+    diagnosis_batch_size: int = 8
+    diagnosis_batch_window_seconds: float = 0.5
+    diagnosis_batch_max_tokens: int = 24000
+
+    # Similar Incident Lookup
+    similarity_enabled: bool = True
+    similarity_threshold: float = 0.9
+    similarity_dimensions: int = 2048
+    similarity_max_entries: int = 5000
     
     # GitHub Configuration
     github_token: str
     github_repo_owner: str
     github_repo_name: str = "aha-incidents"
+    github_api_url: str = "https://api.github.com"
+    github_max_connections: int = 10
+    github_timeout_seconds: float = 30.0
+    github_requests_per_second: float = 1.0  # GitHub asks for ~1/s on content-creating calls
+    github_burst: int = 5
+    github_max_retries: int = 3
+    github_issue_index_path: Optional[str] = "aha_issues.db"  # fingerprint -> open issue
+    github_issue_resync_seconds: float = 900.0  # re-read open issues; 0 only reads them at startup
     
     # AHA Configuration
     aha_webhook_port: int = 8000
     aha_frontend_port: int = 3000
     aha_debug_mode: bool = True
+
+    # Storage Configuration
+    aha_storage_backend: str = "sqlite"  # sqlite, memory
+    aha_sqlite_path: str = "aha_incidents.db"
+
+    # Incident Retention (memory backend; 0 disables a limit)
+    aha_retention_max_incidents: int = 10000
+    aha_retention_max_age_seconds: float = 0.0
+    aha_archive_path: Optional[str] = "aha_archive.jsonl"  # evicted incidents, one JSON per line
+
+    # Multi-process Deployment (uvicorn --workers N)
+    aha_shared_state: bool = False  # share events and webhook deliveries through SQLite
+    aha_state_path: str = "aha_state.db"
+    aha_event_poll_seconds: float = 0.1
+
+    # Incident Processing Pipeline
+    aha_queue_path: str = "aha_queue.db"
+    aha_worker_count: int = 4
+    aha_worker_poll_seconds: float = 1.0
+    aha_job_lease_seconds: float = 300.0
+    aha_job_max_attempts: int = 5
+    aha_job_backoff_seconds: float = 2.0
+    aha_job_max_backoff_seconds: float = 300.0
+    aha_diagnose_concurrency: int = 4
+    aha_issue_concurrency: int = 2
+
+    # Event Loop Diagnostics (opt-in; reports at /api/admin/loop)
+    aha_loop_monitor_enabled: bool = False
+    aha_loop_monitor_interval_seconds: float = 0.05
+    aha_loop_slow_threshold_seconds: float = 0.1
+
+    # Pipeline Tracing (spans for AHA's own processing)
+    aha_tracing_exporter: str = "none"  # none, jsonl, otlp
+    aha_tracing_path: str = "aha_spans.jsonl"
+    aha_tracing_otlp_endpoint: str = "http://127.0.0.1:4318/v1/traces"
+    aha_tracing_flush_seconds: float = 1.0
+
+    # Webhook Deduplication
+    aha_dedup_enabled: bool = True
+    aha_dedup_window_seconds: float = 3600.0
+    aha_dedup_tracked_runs: int = 10000
     
     class Config:
         env_file = ".env"
@@ -35,5 +141,5 @@ class Settings(BaseSettings):
         """Ensure at least one LLM provider is configured"""
         return bool(self.openai_api_key or self.anthropic_api_key)
 
-# Global settings instance
-settings = Settings()
+# Global settings instance, read from the environment on first use
+settings = services.register("settings", Settings)
@@ -0,0 +1,227 @@
+"""
+In-process fan-out of incident change events to streaming clients
+"""
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+from collections import deque
+from dataclasses import dataclass
+from typing import AsyncIterator, Deque, List, Optional, Set
+
+from app.core.config import settings
+from app.core.registry import services
+from app.models.incident import IncidentResponse
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class IncidentEvent:
+    """A single incident delta, serialized once at publish time"""
+    id: int
+    type: str  # created, updated, cleared, reset
+    data: str
+
+    def to_sse(self) -> str:
+        return f"id: {self.id}\ndata: {self.data}\n\n"
+
+@dataclass(eq=False)
+class _Subscriber:
+    queue: "asyncio.Queue[IncidentEvent]"
+    overflowed: bool = False
+
+class IncidentEventBus:
+    """
+    Keeps a bounded history of recent events so clients can resume from the
+    last event id they saw, and pushes new events to live subscribers.
+    """
+
+    def __init__(self, history_size: int = 1000, queue_size: int = 256):
+        self.queue_size = queue_size
+        self._seq = 0
+        self._history: Deque[IncidentEvent] = deque(maxlen=history_size)
+        self._subscribers: Set[_Subscriber] = set()
+
+    def publish(self, event_type: str, incident: Optional[IncidentResponse] = None) -> IncidentEvent:
+        """Record an event and deliver it to every subscriber"""
+        self._seq += 1
+        event = IncidentEvent(id=self._seq, type=event_type, data=self._serialize(event_type, incident))
+        self._history.append(event)
+        self._dispatch(event)
+        return event
+
+    async def start(self) -> None:
+        """Nothing to run for the in-process bus"""
+
+    async def stop(self) -> None:
+        """Nothing to release for the in-process bus"""
+
+    @staticmethod
+    def _serialize(event_type: str, incident: Optional[IncidentResponse]) -> str:
+        payload = {"type": event_type, "incident": incident.model_dump(mode="json") if incident else None}
+        return json.dumps(payload)
+
+    def _dispatch(self, event: IncidentEvent) -> None:
+        for subscriber in self._subscribers:
+            if subscriber.overflowed:
+                continue
+            try:
+                subscriber.queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # Slow client: stop feeding it and make it resync from scratch
+                subscriber.overflowed = True
+
+    def _replay(self, last_event_id: int) -> Optional[List[IncidentEvent]]:
+        """Events after `last_event_id`, or None if they are no longer retained"""
+        if last_event_id == self._seq:
+            return []
+        if last_event_id > self._seq:
+            # Token from before a restart
+            return None
+        if not self._history or self._history[0].id > last_event_id + 1:
+            return None
+        return [event for event in self._history if event.id > last_event_id]
+
+    def _reset_event(self) -> IncidentEvent:
+        return IncidentEvent(id=self._seq, type="reset", data=json.dumps({"type": "reset", "incident": None}))
+
+    async def subscribe(
+        self,
+        last_event_id: Optional[int] = None,
+        heartbeat_seconds: float = 15.0
+    ) -> AsyncIterator[str]:
+        """
+        Yield SSE frames, first replaying anything missed since `last_event_id`.
+
+        A `reset` event tells the client its resume point is gone and it
+        should reload the incident list.
+        """
+        subscriber = _Subscriber(queue=asyncio.Queue(maxsize=self.queue_size))
+        self._subscribers.add(subscriber)
+        try:
+            if last_event_id is not None:
+                missed = self._replay(last_event_id)
+                if missed is None:
+                    yield self._reset_event().to_sse()
+                else:
+                    for event in missed:
+                        yield event.to_sse()
+
+            while True:
+                if subscriber.overflowed:
+                    # Drain stale events and start over from the current position
+                    subscriber.queue = asyncio.Queue(maxsize=self.queue_size)
+                    subscriber.overflowed = False
+                    yield self._reset_event().to_sse()
+                try:
+                    event = await asyncio.wait_for(subscriber.queue.get(), timeout=heartbeat_seconds)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                yield event.to_sse()
+        finally:
+            self._subscribers.discard(subscriber)
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+class SQLiteEventBus(IncidentEventBus):
+    """
+    Event bus shared by every process using the same SQLite file.
+
+    Publishing appends to an event log table; each process tails the log
+    and pushes new rows to its own subscribers. Event ids therefore come
+    from one sequence, so a client can resume against any worker.
+    """
+
+    def __init__(self, path: str, poll_seconds: float, history_size: int = 1000, queue_size: int = 256):
+        super().__init__(history_size=history_size, queue_size=queue_size)
+        self.history_size = history_size
+        self.poll_seconds = poll_seconds
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS incident_events "
+            "(id INTEGER PRIMARY KEY AUTOINCREMENT, type TEXT NOT NULL, data TEXT NOT NULL)"
+        )
+        row = self._conn.execute("SELECT MAX(id) FROM incident_events").fetchone()
+        self._seq = row[0] or 0
+        self._tail_task: Optional[asyncio.Task] = None
+
+    def publish(self, event_type: str, incident: Optional[IncidentResponse] = None) -> IncidentEvent:
+        """Append to the shared log; subscribers get it from the tail"""
+        data = self._serialize(event_type, incident)
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO incident_events (type, data) VALUES (?, ?)", (event_type, data)
+            )
+            event_id = cursor.lastrowid
+            if event_id % 100 == 0:
+                self._conn.execute(
+                    "DELETE FROM incident_events WHERE id <= ?", (event_id - self.history_size,)
+                )
+        return IncidentEvent(id=event_id, type=event_type, data=data)
+
+    async def start(self) -> None:
+        if self._tail_task is None:
+            self._tail_task = asyncio.create_task(self._tail(), name="incident-event-tail")
+
+    async def stop(self) -> None:
+        if self._tail_task is not None:
+            self._tail_task.cancel()
+            await asyncio.gather(self._tail_task, return_exceptions=True)
+            self._tail_task = None
+        with self._lock:
+            self._conn.close()
+
+    async def _tail(self) -> None:
+        while True:
+            try:
+                events = self._read(after=self._seq, limit=500)
+            except sqlite3.Error as e:
+                logger.warning(f"Reading incident event log failed: {e}")
+                events = []
+            for event in events:
+                self._seq = event.id
+                self._dispatch(event)
+            if len(events) < 500:
+                await asyncio.sleep(self.poll_seconds)
+
+    def _read(self, after: int, limit: int, up_to: Optional[int] = None) -> List[IncidentEvent]:
+        query = "SELECT id, type, data FROM incident_events WHERE id > ?"
+        params: list = [after]
+        if up_to is not None:
+            query += " AND id <= ?"
+            params.append(up_to)
+        with self._lock:
+            rows = self._conn.execute(f"{query} ORDER BY id LIMIT ?", (*params, limit)).fetchall()
+        return [IncidentEvent(id=row[0], type=row[1], data=row[2]) for row in rows]
+
+    def _replay(self, last_event_id: int) -> Optional[List[IncidentEvent]]:
+        """Logged events up to what this process has dispatched"""
+        if last_event_id == self._seq:
+            return []
+        if last_event_id > self._seq or self._seq - last_event_id > self.history_size:
+            return None
+        events = self._read(after=last_event_id, limit=self.history_size, up_to=self._seq)
+        if not events or events[0].id > last_event_id + 1:
+            return None
+        return events
+
+def create_event_bus() -> IncidentEventBus:
+    """Shared SQLite-backed bus when several processes serve the API"""
+    if settings.aha_shared_state:
+        return SQLiteEventBus(settings.aha_state_path, settings.aha_event_poll_seconds)
+    return IncidentEventBus()
+
+# Global event bus instance
+incident_events = services.register(
+    "incident_events",
+    create_event_bus,
+    warm_up=lambda bus: bus.start(),
+    close=lambda bus: bus.stop()
+)
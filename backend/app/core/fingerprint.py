@@ -0,0 +1,35 @@
+"""
+Normalization of error text so recurring failures share a fingerprint
+"""
+import hashlib
+import re
+
+# Order matters: replace the most specific shapes first
+_NORMALIZERS = [
+    (re.compile(r"[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}", re.I), "<id>"),
+    (re.compile(r"\b\d{4}-\d{2}-\d{2}[t ]\d{2}:\d{2}:\d{2}(?:\.\d+)?(?:z|[+-]\d{2}:?\d{2})?", re.I), "<ts>"),
+    (re.compile(r"\b0x[0-9a-f]+\b", re.I), "<hex>"),
+    (re.compile(r"\b(?=[0-9a-f]*\d)[0-9a-f]{12,}\b", re.I), "<id>"),
+    (re.compile(r"\b[\w-]*_\d+\b"), "<id>"),
+    # Keep HTTP status codes, which distinguish failure classes
+    (re.compile(r"(?<!http )(?<!status )(?<!code )(?<![\d.])\d+(?:\.\d+)?", re.I), "<n>"),
+    (re.compile(r"\s+"), " "),
+]
+
+def normalize_error_text(text: str) -> str:
+    """
+    Strip the parts of an error that vary between occurrences (ids,
+    timestamps, numbers such as line/column/char positions).
+
+    "Expecting ',' delimiter: line 1 column 45 (char 44)" and
+    "Expecting ',' delimiter: line 3 column 7 (char 90)" normalize alike.
+    """
+    normalized = text.strip()
+    for pattern, replacement in _NORMALIZERS:
+        normalized = pattern.sub(replacement, normalized)
+    return normalized
+
+def error_fingerprint(error_type: str, error_message: str) -> str:
+    """Stable short hash of an error type plus its normalized message"""
+    key = f"{error_type.strip()}\n{normalize_error_text(error_message)}"
+    return hashlib.sha1(key.encode()).hexdigest()[:16]
@@ -0,0 +1,200 @@
+"""
+Event loop lag sampling and slow-callback detection
+"""
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Deque, Dict, List, Optional
+
+import app
+from app.core.config import settings
+from app.core.metrics import loop_lag_seconds
+from app.core.registry import services
+
+logger = logging.getLogger(__name__)
+
+# Frames under the app package identify where a stall came from. Built from
+# the package location, since the whole deployment often lives under /app.
+APP_PATH = str(Path(app.__file__).parent) + os.sep
+
+@dataclass
+class StallSite:
+    """Every stall seen with the same blocking frame"""
+    location: str
+    stack: List[str]
+    count: int = 0
+    total_seconds: float = 0.0
+    max_seconds: float = 0.0
+    last_seen: float = field(default_factory=time.time)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "location": self.location,
+            "count": self.count,
+            "total_ms": round(self.total_seconds * 1000, 1),
+            "max_ms": round(self.max_seconds * 1000, 1),
+            "last_seen": self.last_seen,
+            "stack": self.stack
+        }
+
+class LoopMonitor:
+    """
+    Watches the event loop for callbacks that hold it too long.
+
+    A ticker coroutine wakes every `interval_seconds` and records how late
+    it was (the loop lag). A watchdog thread checks the ticker's heartbeat;
+    once it is more than `threshold_seconds` overdue, the loop thread is
+    stuck in one callback, so the watchdog captures that thread's stack
+    and, when the ticker runs again, charges the stall's full duration to
+    the blocking frame. Sites are kept per frame, worst first.
+    """
+
+    def __init__(self, interval_seconds: float, threshold_seconds: float,
+                 max_sites: int = 50, sample_window: int = 1200):
+        self.interval_seconds = interval_seconds
+        self.threshold_seconds = threshold_seconds
+        self.max_sites = max_sites
+        self.samples: Deque[float] = deque(maxlen=sample_window)
+        self.sites: Dict[str, StallSite] = {}
+        self.stalls = 0
+        self._heartbeat = time.perf_counter()
+        self._captured: Optional[StallSite] = None
+        self._loop_thread_id: Optional[int] = None
+        self._lock = threading.Lock()
+        self._ticker: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
+
+    @property
+    def running(self) -> bool:
+        return self._ticker is not None and not self._ticker.done()
+
+    async def start(self) -> None:
+        if self.running:
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.perf_counter()
+        self._stopping.clear()
+        self._ticker = asyncio.create_task(self._tick())
+        self._watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._watchdog.start()
+        logger.info(f"Event loop monitor started (threshold {self.threshold_seconds * 1000:.0f}ms)")
+
+    async def stop(self) -> None:
+        self._stopping.set()
+        if self._ticker is not None:
+            self._ticker.cancel()
+            try:
+                await self._ticker
+            except asyncio.CancelledError:
+                pass
+            self._ticker = None
+        if self._watchdog is not None:
+            self._watchdog.join(timeout=1)
+            self._watchdog = None
+
+    async def _tick(self) -> None:
+        while True:
+            expected = time.perf_counter() + self.interval_seconds
+            await asyncio.sleep(self.interval_seconds)
+            now = time.perf_counter()
+            lag = max(0.0, now - expected)
+            self.samples.append(lag)
+            loop_lag_seconds.observe(lag)
+            with self._lock:
+                self._heartbeat = now
+                site, self._captured = self._captured, None
+                if site is not None:
+                    site.count += 1
+                    site.total_seconds += lag
+                    site.max_seconds = max(site.max_seconds, lag)
+                    self.stalls += 1
+            if site is not None:
+                logger.warning(f"Event loop blocked for {lag * 1000:.0f}ms at {site.location}")
+
+    def _watch(self) -> None:
+        check_every = min(self.interval_seconds, self.threshold_seconds) / 2
+        while not self._stopping.wait(check_every):
+            with self._lock:
+                overdue = time.perf_counter() - self._heartbeat - self.interval_seconds
+                if overdue < self.threshold_seconds or self._captured is not None:
+                    continue
+            stack = self._loop_stack()
+            if stack is None:
+                continue
+            with self._lock:
+                # The ticker may have caught up while the stack was taken
+                if time.perf_counter() - self._heartbeat - self.interval_seconds < self.threshold_seconds:
+                    continue
+                self._captured = self._site_for(stack)
+
+    def _loop_stack(self) -> Optional[List[traceback.FrameSummary]]:
+        frame = sys._current_frames().get(self._loop_thread_id)
+        return traceback.extract_stack(frame) if frame is not None else None
+
+    def _site_for(self, stack: List[traceback.FrameSummary]) -> StallSite:
+        """Site keyed by the innermost application frame, else the innermost frame"""
+        app_frames = [f for f in stack if f.filename.startswith(APP_PATH) and f.filename != __file__]
+        blamed = app_frames[-1] if app_frames else stack[-1]
+        location = f"{blamed.filename}:{blamed.lineno} in {blamed.name}"
+        site = self.sites.get(location)
+        if site is None:
+            if len(self.sites) >= self.max_sites:
+                # Make room by dropping the mildest site
+                mildest = min(self.sites.values(), key=lambda s: s.max_seconds)
+                del self.sites[mildest.location]
+            site = self.sites[location] = StallSite(location, traceback.format_list(stack[-15:]))
+        site.last_seen = time.time()
+        return site
+
+    def lag_stats(self) -> Dict[str, Optional[float]]:
+        ordered = sorted(self.samples)
+        if not ordered:
+            return {"samples": 0, "p50_ms": None, "p99_ms": None, "max_ms": None}
+
+        def ms(pct: float) -> float:
+            return round(ordered[min(len(ordered) - 1, int(pct * len(ordered)))] * 1000, 2)
+        return {"samples": len(ordered), "p50_ms": ms(0.5), "p99_ms": ms(0.99), "max_ms": ms(1.0)}
+
+    def report(self, limit: int = 20) -> Dict[str, Any]:
+        """Lag percentiles over the recent window and the worst stall sites"""
+        with self._lock:
+            worst = sorted(self.sites.values(), key=lambda s: s.max_seconds, reverse=True)[:limit]
+            sites = [site.as_dict() for site in worst]
+            stalls = self.stalls
+        return {
+            "enabled": self.running,
+            "interval_ms": self.interval_seconds * 1000,
+            "threshold_ms": self.threshold_seconds * 1000,
+            "lag": self.lag_stats(),
+            "stalls": stalls,
+            "sites": sites
+        }
+
+    def reset(self) -> None:
+        with self._lock:
+            self.sites.clear()
+            self.stalls = 0
+        self.samples.clear()
+
+async def _start_if_enabled(monitor: LoopMonitor) -> None:
+    if settings.aha_loop_monitor_enabled:
+        await monitor.start()
+
+# Global monitor instance
+loop_monitor = services.register(
+    "loop_monitor",
+    lambda: LoopMonitor(
+        interval_seconds=settings.aha_loop_monitor_interval_seconds,
+        threshold_seconds=settings.aha_loop_slow_threshold_seconds
+    ),
+    warm_up=_start_if_enabled,
+    close=lambda monitor: monitor.stop()
+)
@@ -0,0 +1,153 @@
+"""
+Registry of lazily constructed application services
+"""
+import asyncio
+import inspect
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+Hook = Callable[[Any], Any]
+
+class _Entry:
+    """One registered service and its lifecycle state"""
+
+    def __init__(self, name: str, factory: Callable[[], Any], warm_up: Optional[Hook],
+                 close: Optional[Hook], critical: bool):
+        self.name = name
+        self.factory = factory
+        self.warm_up = warm_up
+        self.close = close
+        self.critical = critical
+        self.instance: Any = None
+        self.built = False
+        self.state = "pending"  # pending, ready, failed
+        self.error: Optional[str] = None
+        self.seconds: Optional[float] = None
+        self._lock = threading.RLock()
+
+    def get(self) -> Any:
+        if not self.built:
+            with self._lock:
+                if not self.built:
+                    self.instance = self.factory()
+                    self.built = True
+        return self.instance
+
+class LazyService:
+    """
+    Stands in for a service until first use, then forwards every attribute
+    access to the instance built by the registered factory.
+    """
+
+    def __init__(self, entry: _Entry):
+        object.__setattr__(self, "_lazy_entry", entry)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._lazy_entry.get(), name)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        setattr(self._lazy_entry.get(), name, value)
+
+    def __repr__(self) -> str:
+        entry = self._lazy_entry
+        return f"<LazyService {entry.name} {'built' if entry.built else 'not built'}>"
+
+class ServiceRegistry:
+    """
+    Services register a factory at import time but are only constructed
+    on first use or during the lifespan warm-up, which builds them all in
+    parallel and runs their warm-up hooks. Shutdown closes built services
+    in reverse registration order, so dependents close before what they
+    depend on.
+    """
+
+    def __init__(self):
+        self._entries: Dict[str, _Entry] = {}
+        self.warmed_up = False
+        self.warm_up_seconds: Optional[float] = None
+
+    def register(
+        self,
+        name: str,
+        factory: Callable[[], Any],
+        warm_up: Optional[Hook] = None,
+        close: Optional[Hook] = None,
+        critical: bool = True
+    ) -> Any:
+        """
+        Register a service and return its lazy proxy.
+
+        `warm_up` and `close` receive the instance and may be coroutines.
+        A failed non-critical service does not hold back readiness.
+        """
+        if name in self._entries:
+            raise ValueError(f"Service already registered: {name}")
+        entry = _Entry(name, factory, warm_up, close, critical)
+        self._entries[name] = entry
+        return LazyService(entry)
+
+    async def warm_up(self) -> None:
+        """Build every service and run warm-up hooks concurrently"""
+        started = time.perf_counter()
+        await asyncio.gather(*(self._warm(entry) for entry in list(self._entries.values())))
+        self.warm_up_seconds = time.perf_counter() - started
+        self.warmed_up = True
+        failed = [entry.name for entry in self._entries.values() if entry.state == "failed"]
+        logger.info(f"Warmed up {len(self._entries)} services in {self.warm_up_seconds * 1000:.0f}ms"
+                    + (f", failed: {', '.join(failed)}" if failed else ""))
+
+    async def _warm(self, entry: _Entry) -> None:
+        started = time.perf_counter()
+        try:
+            # Constructors may open files or sockets; keep them off the loop
+            instance = await asyncio.to_thread(entry.get)
+            if entry.warm_up is not None:
+                result = entry.warm_up(instance)
+                if inspect.isawaitable(result):
+                    await result
+            entry.state = "ready"
+        except Exception as e:
+            entry.state = "failed"
+            entry.error = f"{type(e).__name__}: {e}"
+            log = logger.error if entry.critical else logger.warning
+            log(f"Service {entry.name} failed to warm up: {entry.error}")
+        finally:
+            entry.seconds = time.perf_counter() - started
+
+    @property
+    def ready(self) -> bool:
+        """Every critical service is warmed up; slow optional ones don't count"""
+        return all(entry.state == "ready" for entry in self._entries.values() if entry.critical)
+
+    def status(self) -> Dict[str, Dict[str, Any]]:
+        """Per-service state for the readiness endpoint"""
+        return {
+            entry.name: {
+                "state": entry.state,
+                "critical": entry.critical,
+                "seconds": round(entry.seconds, 4) if entry.seconds is not None else None,
+                "error": entry.error
+            }
+            for entry in self._entries.values()
+        }
+
+    async def shutdown(self) -> None:
+        """Close built services, newest registration first"""
+        entries: List[_Entry] = list(self._entries.values())
+        for entry in reversed(entries):
+            if not entry.built or entry.close is None:
+                continue
+            try:
+                result = entry.close(entry.instance)
+                if inspect.isawaitable(result):
+                    await result
+            except Exception as e:
+                logger.warning(f"Error closing service {entry.name}: {e}")
+        self.warmed_up = False
+
+# Global registry instance
+services = ServiceRegistry()
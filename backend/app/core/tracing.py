@@ -0,0 +1,278 @@
+"""
+Spans for AHA's own incident pipeline, exported as JSONL or OTLP/JSON
+"""
+import asyncio
+import json
+import logging
+import secrets
+import time
+import uuid
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional
+
+import httpx
+
+from app.core.config import settings
+from app.core.registry import services
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class Span:
+    """One timed operation within an incident's trace"""
+    trace_id: str
+    span_id: str
+    parent_id: Optional[str]
+    name: str
+    start_ns: int
+    end_ns: int = 0
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    error: Optional[str] = None
+
+    def set(self, **attributes: Any) -> None:
+        self.attributes.update(attributes)
+
+    @property
+    def duration_ms(self) -> float:
+        return (self.end_ns - self.start_ns) / 1e6
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start_ns": self.start_ns,
+            "end_ns": self.end_ns,
+            "duration_ms": round(self.duration_ms, 3),
+            "attributes": self.attributes,
+            "error": self.error
+        }
+
+class _NoopSpan:
+    """Returned when tracing is off or no incident trace is active"""
+
+    def set(self, **attributes: Any) -> None:
+        pass
+
+NOOP_SPAN = _NoopSpan()
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("aha_current_span", default=None)
+
+def trace_id_for(incident_id: str) -> str:
+    """32-hex trace id; incident ids are already UUIDs"""
+    try:
+        return uuid.UUID(incident_id).hex
+    except ValueError:
+        return uuid.uuid5(uuid.NAMESPACE_OID, incident_id).hex
+
+class SpanExporter(ABC):
+    """Writes finished spans; called from a worker thread"""
+
+    @abstractmethod
+    def export(self, spans: List[Span]) -> None:
+        """Write a batch of finished spans"""
+
+    def close(self) -> None:
+        pass
+
+class JsonlSpanExporter(SpanExporter):
+    """Appends one JSON object per span to a local file"""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def export(self, spans: List[Span]) -> None:
+        with open(self.path, "a") as out:
+            for span in spans:
+                out.write(json.dumps(span.as_dict(), default=str) + "\n")
+
+class OtlpHttpSpanExporter(SpanExporter):
+    """Posts spans to an OTLP/HTTP collector using the JSON encoding"""
+
+    def __init__(self, endpoint: str, service_name: str = "aha-backend", timeout_seconds: float = 5.0):
+        self.endpoint = endpoint
+        self.service_name = service_name
+        self._client = httpx.Client(timeout=timeout_seconds)
+
+    @staticmethod
+    def _attribute(key: str, value: Any) -> Dict[str, Any]:
+        if isinstance(value, bool):
+            encoded = {"boolValue": value}
+        elif isinstance(value, int):
+            encoded = {"intValue": str(value)}
+        elif isinstance(value, float):
+            encoded = {"doubleValue": value}
+        else:
+            encoded = {"stringValue": str(value)}
+        return {"key": key, "value": encoded}
+
+    def _encode(self, span: Span) -> Dict[str, Any]:
+        encoded = {
+            "traceId": span.trace_id,
+            "spanId": span.span_id,
+            "name": span.name,
+            "kind": 1,  # internal
+            "startTimeUnixNano": str(span.start_ns),
+            "endTimeUnixNano": str(span.end_ns),
+            "attributes": [self._attribute(k, v) for k, v in span.attributes.items()],
+            "status": {"code": 2, "message": span.error} if span.error else {"code": 1}
+        }
+        if span.parent_id:
+            encoded["parentSpanId"] = span.parent_id
+        return encoded
+
+    def export(self, spans: List[Span]) -> None:
+        body = {"resourceSpans": [{
+            "resource": {"attributes": [self._attribute("service.name", self.service_name)]},
+            "scopeSpans": [{"scope": {"name": "aha.pipeline"}, "spans": [self._encode(s) for s in spans]}]
+        }]}
+        response = self._client.post(self.endpoint, json=body)
+        response.raise_for_status()
+
+    def close(self) -> None:
+        self._client.close()
+
+class Tracer:
+    """
+    Collects spans for each incident and exports them in the background.
+
+    `trace()` opens the root span of an incident's processing attempt;
+    `span()` nests under whatever span is current in the task, and is a
+    no-op outside a trace, so library code can be instrumented freely.
+    Finished spans are buffered and handed to the exporter on a thread
+    every `flush_seconds`, keeping file and network I/O off the loop.
+    """
+
+    def __init__(self, exporter: Optional[SpanExporter], flush_seconds: float = 1.0,
+                 max_buffered: int = 10000):
+        self.exporter = exporter
+        self.flush_seconds = flush_seconds
+        self.max_buffered = max_buffered
+        self.exported = 0
+        self.dropped = 0
+        self._buffer: List[Span] = []
+        self._flusher: Optional[asyncio.Task] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.exporter is not None
+
+    @contextmanager
+    def trace(self, incident_id: str, name: str, **attributes: Any) -> Iterator[Any]:
+        """Root span for work on `incident_id`"""
+        if not self.enabled:
+            yield NOOP_SPAN
+            return
+        span = Span(trace_id_for(incident_id), secrets.token_hex(8), None, name,
+                    time.time_ns(), attributes={"incident_id": incident_id, **attributes})
+        with self._activate(span):
+            yield span
+
+    @contextmanager
+    def span(self, name: str, **attributes: Any) -> Iterator[Any]:
+        """Child of the current span, if there is one"""
+        parent = _current_span.get()
+        if parent is None:
+            yield NOOP_SPAN
+            return
+        span = Span(parent.trace_id, secrets.token_hex(8), parent.span_id, name,
+                    time.time_ns(), attributes=attributes)
+        with self._activate(span):
+            yield span
+
+    @contextmanager
+    def _activate(self, span: Span) -> Iterator[None]:
+        token = _current_span.set(span)
+        try:
+            yield
+        except BaseException as e:
+            span.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            _current_span.reset(token)
+            span.end_ns = time.time_ns()
+            self._finish(span)
+
+    def record(self, incident_id: str, name: str, start_ns: int, end_ns: int, **attributes: Any) -> None:
+        """Add a span measured elsewhere, e.g. time spent waiting in the queue"""
+        if self.enabled:
+            self._finish(Span(trace_id_for(incident_id), secrets.token_hex(8), None, name,
+                              start_ns, end_ns, attributes={"incident_id": incident_id, **attributes}))
+
+    @staticmethod
+    def annotate(**attributes: Any) -> None:
+        """Set attributes on the current span, if any"""
+        span = _current_span.get()
+        if span is not None:
+            span.set(**attributes)
+
+    def _finish(self, span: Span) -> None:
+        if len(self._buffer) >= self.max_buffered:
+            self.dropped += 1
+            return
+        self._buffer.append(span)
+
+    async def start(self) -> None:
+        if self.enabled and self._flusher is None:
+            self._flusher = asyncio.create_task(self._flush_periodically())
+
+    async def _flush_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_seconds)
+            await self.flush()
+
+    async def flush(self) -> None:
+        batch, self._buffer = self._buffer, []
+        if not batch or self.exporter is None:
+            return
+        try:
+            await asyncio.to_thread(self.exporter.export, batch)
+            self.exported += len(batch)
+        except Exception as e:
+            self.dropped += len(batch)
+            logger.warning(f"Dropped {len(batch)} spans, export failed: {e}")
+
+    async def stop(self) -> None:
+        if self._flusher is not None:
+            self._flusher.cancel()
+            try:
+                await self._flusher
+            except asyncio.CancelledError:
+                pass
+            self._flusher = None
+        await self.flush()
+        if self.exporter is not None:
+            self.exporter.close()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "exporter": type(self.exporter).__name__ if self.exporter else None,
+            "buffered": len(self._buffer),
+            "exported": self.exported,
+            "dropped": self.dropped
+        }
+
+def create_tracer() -> Tracer:
+    """Build the tracer for `aha_tracing_exporter` (none, jsonl or otlp)"""
+    kind = settings.aha_tracing_exporter.lower()
+    if kind == "none":
+        exporter = None
+    elif kind == "jsonl":
+        exporter = JsonlSpanExporter(settings.aha_tracing_path)
+    elif kind == "otlp":
+        exporter = OtlpHttpSpanExporter(settings.aha_tracing_otlp_endpoint)
+    else:
+        raise ValueError(f"Unknown tracing exporter: {settings.aha_tracing_exporter}")
+    return Tracer(exporter, flush_seconds=settings.aha_tracing_flush_seconds)
+
+# Global tracer instance
+tracer = services.register(
+    "tracer",
+    create_tracer,
+    warm_up=lambda t: t.start(),
+    close=lambda t: t.stop()
+)
@@ -1,16 +1,36 @@
 """
 FastAPI application entry point for AHA Backend
 """
+import asyncio
+from contextlib import asynccontextmanager, suppress
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
 
-from app.api import webhooks, incidents
+from app.api import admin, webhooks, incidents, queue
 from app.core.config import settings
+from app.core.metrics import metrics
+from app.core.registry import services
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Warm up services in the background so the process accepts connections
+    at once; /ready reports when they are usable. Shutdown stops the
+    workers and releases connections.
+    """
+    warm_up = asyncio.create_task(services.warm_up())
+    yield
+    warm_up.cancel()
+    with suppress(asyncio.CancelledError):
+        await warm_up
+    await services.shutdown()
 
 app = FastAPI(
     title="Autonomous AI Healing Agent (AHA)",
     description="Backend API for the AHA system",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
 # Add CORS middleware for frontend communication
@@ -25,6 +45,28 @@ app.add_middleware(
 # Include API routers
 app.include_router(webhooks.router, prefix="/webhook", tags=["webhooks"])
 app.include_router(incidents.router, prefix="/api", tags=["incidents"])
+app.include_router(queue.router, prefix="/api", tags=["queue"])
+app.include_router(admin.router, prefix="/api", tags=["admin"])
+
+@app.get("/live")
+async def live():
+    """Liveness: the process is serving requests"""
+    return {"status": "alive"}
+
+@app.get("/ready")
+async def ready():
+    """Readiness: every critical service has been built and warmed up"""
+    body = {
+        "ready": services.ready,
+        "warm_up_seconds": services.warm_up_seconds,
+        "services": services.status()
+    }
+    return JSONResponse(body, status_code=200 if services.ready else 503)
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    """Prometheus scrape endpoint for this worker process"""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
 
 @app.get("/")
 async def root():
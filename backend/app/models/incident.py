@@ -3,7 +3,7 @@ Pydantic models for incident data
 """
 from pydantic import BaseModel
 from datetime import datetime
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 
 class IncidentCreate(BaseModel):
     """Model for creating a new incident"""
@@ -20,10 +20,21 @@ class IncidentResponse(BaseModel):
     error_message: str
     diagnosis: Optional[str] = None
     confidence_score: Optional[float] = None
+    error_category: Optional[str] = None
     github_issue_url: Optional[str] = None
     langsmith_trace_url: Optional[str] = None
     created_at: datetime
     status: str = "detected"  # detected, analyzed, resolved
+    stage: Optional[str] = None  # fetching_trace, diagnosing, filing_issue, complete, failed
+    fingerprint: Optional[str] = None
+    occurrence_count: int = 1
+    last_seen_at: Optional[datetime] = None
+    related_incident_id: Optional[str] = None  # earlier incident whose diagnosis was reused
+
+class IncidentPage(BaseModel):
+    """One page of incidents plus the cursor for the next page"""
+    items: List[IncidentResponse]
+    next_cursor: Optional[str] = None
 
 class LangSmithWebhookPayload(BaseModel):
     """Model for LangSmith webhook payload"""
@@ -41,3 +52,5 @@ class DiagnosisResult(BaseModel):
     suggested_fix: str
     error_category: str
     root_cause: str
+    similar_incident_id: Optional[str] = None
+    similarity_score: Optional[float] = None
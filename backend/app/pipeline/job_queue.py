@@ -0,0 +1,261 @@
+"""
+Durable SQLite-backed job queue for incident processing
+"""
+import json
+import logging
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.core.registry import services
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    incident_id TEXT,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    available_at REAL NOT NULL,
+    lease_expires_at REAL,
+    last_error TEXT,
+    claimed_by TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_ready ON jobs (status, available_at);
+CREATE INDEX IF NOT EXISTS idx_jobs_lease ON jobs (status, lease_expires_at);
+"""
+
+# Matches only the claim a worker holds: same claimant, same attempt, still running
+FENCE = "id = ? AND claimed_by IS ? AND attempts = ? AND status = 'running'"
+
+@dataclass
+class Job:
+    """A claimed unit of work"""
+    id: int
+    incident_id: Optional[str]
+    payload: Dict[str, Any]
+    attempts: int
+    created_at: float
+    claimed_by: Optional[str] = None
+
+    @classmethod
+    def from_row(cls, row: sqlite3.Row) -> "Job":
+        return cls(
+            id=row["id"],
+            incident_id=row["incident_id"],
+            payload=json.loads(row["payload"]),
+            attempts=row["attempts"],
+            created_at=row["created_at"],
+            claimed_by=row["claimed_by"]
+        )
+
+class JobQueue:
+    """
+    At-least-once job queue.
+
+    Jobs move pending -> running -> deleted on success, or back to pending with
+    exponential backoff on failure until `max_attempts`, after which they
+    are parked as dead letters. A running job whose lease expires (e.g. the
+    process died) becomes claimable again; workers renew the lease while
+    they are still on the job.
+
+    Several processes can share one queue file. Each claim records the
+    claiming worker and bumps the attempt count; together they fence the
+    job, so a worker whose lease expired and was re-claimed elsewhere
+    cannot complete, fail or release it.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        with self._lock:
+            self._conn.executescript(SCHEMA)
+            columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+            if "claimed_by" not in columns:
+                self._conn.execute("ALTER TABLE jobs ADD COLUMN claimed_by TEXT")
+
+    def enqueue(self, payload: Dict[str, Any], incident_id: Optional[str] = None, delay: float = 0.0) -> int:
+        """Add a job and return its id"""
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO jobs (incident_id, payload, available_at, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (incident_id, json.dumps(payload), now + delay, now, now)
+            )
+            return cursor.lastrowid
+
+    def claim(self, lease_seconds: float, worker_id: str = "") -> Optional[Job]:
+        """Atomically take the oldest ready job, or None if there is none"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT * FROM jobs WHERE "
+                    "(status = 'pending' AND available_at <= ?) OR "
+                    "(status = 'running' AND lease_expires_at < ?) "
+                    "ORDER BY available_at LIMIT 1",
+                    (now, now)
+                ).fetchone()
+                if row is None:
+                    self._conn.execute("COMMIT")
+                    return None
+                self._conn.execute(
+                    "UPDATE jobs SET status = 'running', attempts = attempts + 1, "
+                    "lease_expires_at = ?, claimed_by = ?, updated_at = ? WHERE id = ?",
+                    (now + lease_seconds, worker_id, now, row["id"])
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+        job = Job.from_row(row)
+        job.attempts += 1
+        job.claimed_by = worker_id
+        return job
+
+    def renew(self, job: Job, lease_seconds: float) -> bool:
+        """
+        Push back the lease of a job still being worked on. Returns False
+        if the lease had already passed to another worker.
+        """
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                f"UPDATE jobs SET lease_expires_at = ?, updated_at = ? WHERE {FENCE}",
+                (now + lease_seconds, now, job.id, job.claimed_by, job.attempts)
+            )
+        return self._check_fence(job, cursor.rowcount, "renewing its lease")
+
+    def complete(self, job: Job) -> bool:
+        """
+        Remove a finished job so the table only holds outstanding work.
+        Returns False if the lease had already passed to another worker.
+        """
+        with self._lock:
+            cursor = self._conn.execute(
+                f"DELETE FROM jobs WHERE {FENCE}",
+                (job.id, job.claimed_by, job.attempts)
+            )
+        return self._check_fence(job, cursor.rowcount, "complete")
+
+    def fail(self, job: Job, error: str) -> bool:
+        """
+        Record a failed attempt. Returns True if the job will be retried
+        (or is no longer ours), False if it was moved to the dead-letter list.
+        """
+        if job.attempts >= settings.aha_job_max_attempts:
+            return not self._set_status(job, "dead", last_error=error, lease_expires_at=None)
+
+        backoff = min(
+            settings.aha_job_backoff_seconds * (2 ** (job.attempts - 1)),
+            settings.aha_job_max_backoff_seconds
+        )
+        self._set_status(
+            job, "pending",
+            last_error=error,
+            available_at=time.time() + backoff,
+            lease_expires_at=None
+        )
+        return True
+
+    def release(self, job: Job) -> None:
+        """Hand an unfinished job back without counting the attempt (shutdown)"""
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = 'pending', attempts = MAX(attempts - 1, 0), "
+                f"available_at = ?, lease_expires_at = NULL, updated_at = ? WHERE {FENCE}",
+                (now, now, job.id, job.claimed_by, job.attempts)
+            )
+        self._check_fence(job, cursor.rowcount, "release")
+
+    def retry_dead(self, job_id: int) -> bool:
+        """Move a dead letter back to the queue with a fresh attempt budget"""
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = 'pending', attempts = 0, available_at = ?, "
+                "updated_at = ? WHERE id = ? AND status = 'dead'",
+                (now, now, job_id)
+            )
+            return cursor.rowcount > 0
+
+    def dead_letters(self, limit: int = 100) -> List[Dict[str, Any]]:
+        """Most recent jobs that exhausted their retries"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM jobs WHERE status = 'dead' ORDER BY updated_at DESC LIMIT ?",
+                (limit,)
+            ).fetchall()
+        return [
+            {
+                "id": row["id"],
+                "incident_id": row["incident_id"],
+                "payload": json.loads(row["payload"]),
+                "attempts": row["attempts"],
+                "last_error": row["last_error"],
+                "updated_at": row["updated_at"],
+            }
+            for row in rows
+        ]
+
+    def stats(self) -> Dict[str, int]:
+        """Job counts by status"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT status, COUNT(*) AS count FROM jobs GROUP BY status"
+            ).fetchall()
+        counts = {"pending": 0, "running": 0, "dead": 0}
+        counts.update({row["status"]: row["count"] for row in rows})
+        return counts
+
+    def _set_status(self, job: Job, status: str, **fields: Any) -> bool:
+        fields["status"] = status
+        fields["updated_at"] = time.time()
+        assignments = ", ".join(f"{key} = ?" for key in fields)
+        with self._lock:
+            cursor = self._conn.execute(
+                f"UPDATE jobs SET {assignments} WHERE {FENCE}",
+                (*fields.values(), job.id, job.claimed_by, job.attempts)
+            )
+        return self._check_fence(job, cursor.rowcount, status)
+
+    @staticmethod
+    def _check_fence(job: Job, rowcount: int, action: str) -> bool:
+        if rowcount == 0:
+            logger.warning(f"Job {job.id} lease lost before {action}; another worker owns it now")
+            return False
+        return True
+
+    def close(self) -> None:
+        """Close the database connection"""
+        with self._lock:
+            self._conn.close()
+
+# Global queue instance
+job_queue = services.register(
+    "job_queue",
+    lambda: JobQueue(settings.aha_queue_path),
+    close=JobQueue.close
+)
+
+metrics.collected(
+    "aha_queue_jobs", "Jobs in the processing queue by status", ["status"],
+    lambda: {(status,): count for status, count in job_queue.stats().items()}
+)
@@ -0,0 +1,174 @@
+"""
+Incident processing stages run by the worker pool
+"""
+import asyncio
+import logging
+import time
+from contextlib import contextmanager
+from typing import Any, Iterator, Optional
+
+from app.core.config import settings
+from app.core.events import incident_events
+from app.core.metrics import stage_failures, stage_seconds
+from app.core.registry import services
+from app.core.tracing import tracer
+from app.models.incident import IncidentResponse
+from app.pipeline.job_queue import Job, job_queue
+from app.pipeline.worker import WorkerPool
+from app.services.langsmith_service import langsmith_service
+from app.services.rule_classifier import rule_classifier
+from app.services.run_ingestion import run_cache
+from app.services.diagnosis_service import diagnosis_service
+from app.services.github_service import github_service
+from app.storage.factory import incident_store
+
+logger = logging.getLogger(__name__)
+
+class TraceFetchError(Exception):
+    """Raised when LangSmith returns no trace so the job is retried"""
+
+class StageLimits:
+    """
+    Trace fetches are bounded inside LangSmithService; these cap the other
+    stages. With batching on, enough diagnoses must be in flight at once
+    to fill a batch.
+    """
+
+    def __init__(self):
+        self.diagnose = asyncio.Semaphore(
+            max(settings.aha_diagnose_concurrency, settings.diagnosis_batch_size)
+            if settings.diagnosis_batch_enabled else settings.aha_diagnose_concurrency
+        )
+        self.issue = asyncio.Semaphore(settings.aha_issue_concurrency)
+
+stage_limits = services.register("stage_limits", StageLimits)
+
+@contextmanager
+def timed_stage(stage: str) -> Iterator[Any]:
+    """Record a stage's latency and span, and count it as failed if it raises"""
+    try:
+        with tracer.span(stage) as span, stage_seconds.time(stage=stage):
+            yield span
+    except Exception:
+        stage_failures.inc(stage=stage)
+        raise
+
+def update_incident(incident_id: str, **changes) -> Optional[IncidentResponse]:
+    """Persist an incident change and push it to streaming dashboards"""
+    with tracer.span("store_update", fields=",".join(sorted(changes))):
+        incident = incident_store.update_incident(incident_id, **changes)
+    if incident:
+        incident_events.publish("updated", incident)
+    return incident
+
+async def process_incident(
+    incident_id: str,
+    trace_id: str,
+    error_type: str,
+    langsmith_url: str,
+    fingerprint: Optional[str] = None,
+    run_id: Optional[str] = None
+) -> None:
+    """
+    Fetch, diagnose and file an issue for an incident created at intake.
+
+    Raises on retryable failures so the queue can back off and try again.
+    """
+    logger.info(f"Processing incident {incident_id} for trace: {trace_id}")
+
+    # 1. Fetch full trace data from LangSmith
+    update_incident(incident_id, stage="fetching_trace")
+    with timed_stage("fetch_trace") as span:
+        # With ingestion on, the trace is usually already assembled locally
+        trace_data = run_cache.get_trace(trace_id, run_id) if settings.langsmith_ingest_enabled else None
+        span.set(source="run_cache" if trace_data else "langsmith")
+        if trace_data is None:
+            trace_data = await langsmith_service.get_trace(trace_id)
+        if not trace_data:
+            raise TraceFetchError(f"Failed to fetch trace data for {trace_id}")
+        span.set(runs=len(trace_data.get("runs", [])))
+
+    # 2. Analyze with LLM
+    update_incident(incident_id, stage="diagnosing")
+
+    def publish_field(field: str, value) -> None:
+        # Streamed fields reach the dashboard before the full answer is in
+        update_incident(incident_id, **{field: value})
+
+    # Known failures are diagnosed from their error text without waiting for an LLM slot
+    diagnosis_result = None
+    if settings.diagnosis_rules_enabled:
+        with timed_stage("classify"):
+            diagnosis_result = rule_classifier.classify(trace_data)
+    if diagnosis_result is None:
+        async with stage_limits.diagnose:
+            with timed_stage("diagnose"):
+                diagnosis_result = await diagnosis_service.analyze_trace(
+                    trace_data, incident_id=incident_id, on_field=publish_field
+                )
+    update_incident(
+        incident_id,
+        diagnosis=diagnosis_result.diagnosis,
+        confidence_score=diagnosis_result.confidence_score,
+        error_category=diagnosis_result.error_category,
+        related_incident_id=diagnosis_result.similar_incident_id,
+        stage="filing_issue"
+    )
+
+    # 3. Create GitHub issue
+    async with stage_limits.issue:
+        with timed_stage("file_issue"):
+            github_url = await github_service.create_issue(
+                title=f"Agent Failure: {error_type}",
+                trace_id=trace_id,
+                diagnosis_result=diagnosis_result,
+                langsmith_url=langsmith_url,
+                fingerprint=fingerprint
+            )
+
+    # 4. Update incident with results
+    update_incident(
+        incident_id,
+        github_issue_url=github_url,
+        status="analyzed",
+        stage="complete"
+    )
+
+    logger.info(f"Successfully processed incident {incident_id}")
+
+async def handle_job(job: Job) -> None:
+    """Worker entry point for queued incidents"""
+    if job.incident_id:
+        # Retries count their earlier attempts and backoff as waiting too
+        tracer.record(job.incident_id, "queue_wait", int(job.created_at * 1e9), time.time_ns(),
+                      job_id=job.id, attempt=job.attempts)
+    with tracer.trace(job.incident_id or str(job.id), "process_incident",
+                      job_id=job.id, attempt=job.attempts, trace_id=job.payload["trace_id"]):
+        await process_incident(
+            incident_id=job.incident_id,
+            trace_id=job.payload["trace_id"],
+            error_type=job.payload["error_type"],
+            langsmith_url=job.payload["langsmith_url"],
+            fingerprint=job.payload.get("fingerprint"),
+            run_id=job.payload.get("run_id")
+        )
+
+def mark_incident_failed(job: Job, error: str) -> None:
+    """Dead-letter hook: surface the failure on the dashboard"""
+    if job.incident_id:
+        update_incident(job.incident_id, stage="failed")
+
+# Global worker pool instance
+worker_pool = services.register(
+    "worker_pool",
+    lambda: WorkerPool(
+        queue=job_queue,
+        handler=handle_job,
+        worker_count=settings.aha_worker_count,
+        lease_seconds=settings.aha_job_lease_seconds,
+        poll_seconds=settings.aha_worker_poll_seconds,
+        on_dead_letter=mark_incident_failed
+    ),
+    warm_up=WorkerPool.start,
+    close=WorkerPool.stop
+)
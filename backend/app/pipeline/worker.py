@@ -0,0 +1,129 @@
+"""
+Pool of async workers draining the job queue
+"""
+import asyncio
+import logging
+import os
+import socket
+from typing import Awaitable, Callable, List, Optional
+
+from app.pipeline.job_queue import Job, JobQueue
+
+logger = logging.getLogger(__name__)
+
+JobHandler = Callable[[Job], Awaitable[None]]
+DeadLetterHandler = Callable[[Job, str], None]
+
+class WorkerPool:
+    """
+    Runs `worker_count` coroutines that claim jobs and pass them to `handler`.
+
+    A handler that raises fails the attempt; the queue decides whether to
+    retry with backoff or dead-letter it, in which case `on_dead_letter`
+    is called. While a handler runs, its job's lease is renewed every
+    third of `lease_seconds`, so a job held up by a long rate-limit pause
+    is not claimed and processed again by another worker.
+    """
+
+    def __init__(
+        self,
+        queue: JobQueue,
+        handler: JobHandler,
+        worker_count: int,
+        lease_seconds: float,
+        poll_seconds: float,
+        on_dead_letter: Optional[DeadLetterHandler] = None
+    ):
+        self.queue = queue
+        self.handler = handler
+        self.worker_count = worker_count
+        self.lease_seconds = lease_seconds
+        self.poll_seconds = poll_seconds
+        self.on_dead_letter = on_dead_letter
+        self.processed = 0
+        self.failed = 0
+        self._tasks: List[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._stopping = False
+        # Identifies this process's workers in job claims
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+
+    async def start(self) -> None:
+        """Start the worker coroutines"""
+        if self._tasks:
+            return
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+        self._tasks = [
+            asyncio.create_task(self._run(n), name=f"incident-worker-{n}")
+            for n in range(self.worker_count)
+        ]
+        logger.info(f"Started {self.worker_count} incident workers")
+
+    async def stop(self, grace_seconds: float = 5.0) -> None:
+        """
+        Let idle workers exit, then cancel any still busy after
+        `grace_seconds`; their in-flight jobs are released back to the queue.
+        """
+        if not self._tasks:
+            return
+        self._stopping = True
+        self.notify()
+        _, busy = await asyncio.wait(self._tasks, timeout=grace_seconds)
+        for task in busy:
+            task.cancel()
+        if busy:
+            _, stuck = await asyncio.wait(busy, timeout=grace_seconds)
+            if stuck:
+                logger.warning(f"{len(stuck)} incident workers did not stop in time")
+        self._tasks = []
+
+    def notify(self) -> None:
+        """Wake idle workers because new work was enqueued"""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _wait_for_work(self) -> None:
+        self._wakeup.clear()
+        # asyncio.wait instead of wait_for, which on Python 3.11 can leave a
+        # cancelled caller stuck waiting on the inner Event.wait()
+        waiter = asyncio.ensure_future(self._wakeup.wait())
+        try:
+            await asyncio.wait({waiter}, timeout=self.poll_seconds)
+        finally:
+            waiter.cancel()
+
+    async def _run(self, worker_number: int) -> None:
+        while not self._stopping:
+            job = self.queue.claim(self.lease_seconds, f"{self.worker_id}:{worker_number}")
+            if job is None:
+                await self._wait_for_work()
+                continue
+
+            heartbeat = asyncio.create_task(self._keep_leased(job))
+            try:
+                await self.handler(job)
+            except asyncio.CancelledError:
+                self.queue.release(job)
+                raise
+            except Exception as e:
+                self.failed += 1
+                error = f"{type(e).__name__}: {e}"
+                retrying = self.queue.fail(job, error)
+                if retrying:
+                    logger.warning(f"Job {job.id} attempt {job.attempts} failed, will retry: {error}")
+                else:
+                    logger.error(f"Job {job.id} moved to dead letters after {job.attempts} attempts: {error}")
+                    if self.on_dead_letter:
+                        self.on_dead_letter(job, error)
+            else:
+                self.processed += 1
+                self.queue.complete(job)
+            finally:
+                heartbeat.cancel()
+
+    async def _keep_leased(self, job: Job) -> None:
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            if not self.queue.renew(job, self.lease_seconds):
+                return
@@ -0,0 +1,212 @@
+"""
+Service for webhook idempotency and error-storm coalescing
+"""
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Optional
+
+from app.core.config import settings
+from app.core.fingerprint import error_fingerprint
+from app.core.registry import services
+from app.models.incident import IncidentResponse
+from app.storage.base import IncidentStore
+from app.storage.factory import incident_store
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class DedupDecision:
+    """What to do with an incoming error webhook"""
+    action: str  # new, duplicate, coalesced
+    fingerprint: str
+    incident: Optional[IncidentResponse] = None
+
+class DeliveryLedger:
+    """
+    Remembers which webhook runs were accepted and the incident each one
+    was attributed to, bounded to the most recent `max_entries`.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        # run_id -> incident_id (None while the first delivery is still being recorded)
+        self._runs: "OrderedDict[str, Optional[str]]" = OrderedDict()
+
+    def seen(self, run_id: str) -> bool:
+        return run_id in self._runs
+
+    def incident_for(self, run_id: str) -> Optional[str]:
+        return self._runs.get(run_id)
+
+    def claim(self, run_id: str) -> bool:
+        """Reserve `run_id`; False if it was already taken"""
+        if run_id in self._runs:
+            return False
+        self._runs[run_id] = None
+        self._trim()
+        return True
+
+    def assign(self, run_id: str, incident_id: str) -> None:
+        self._runs[run_id] = incident_id
+        self._runs.move_to_end(run_id)
+        self._trim()
+
+    def forget(self, run_id: str) -> None:
+        self._runs.pop(run_id, None)
+
+    def clear(self) -> None:
+        self._runs.clear()
+
+    def _trim(self) -> None:
+        while len(self._runs) > self.max_entries:
+            self._runs.popitem(last=False)
+
+class SQLiteDeliveryLedger(DeliveryLedger):
+    """DeliveryLedger in a SQLite table, so claims hold across processes"""
+
+    def __init__(self, path: str, max_entries: int):
+        super().__init__(max_entries)
+        self._claims = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS webhook_deliveries "
+            "(run_id TEXT PRIMARY KEY, incident_id TEXT, received_at REAL NOT NULL)"
+        )
+
+    def seen(self, run_id: str) -> bool:
+        return self._row(run_id) is not None
+
+    def incident_for(self, run_id: str) -> Optional[str]:
+        row = self._row(run_id)
+        return row[0] if row else None
+
+    def claim(self, run_id: str) -> bool:
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT OR IGNORE INTO webhook_deliveries (run_id, received_at) VALUES (?, ?)",
+                (run_id, time.time())
+            )
+            self._claims += 1
+            if self._claims % 100 == 0:
+                self._trim()
+        return cursor.rowcount == 1
+
+    def assign(self, run_id: str, incident_id: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO webhook_deliveries (run_id, incident_id, received_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(run_id) DO UPDATE SET incident_id = excluded.incident_id",
+                (run_id, incident_id, time.time())
+            )
+
+    def forget(self, run_id: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM webhook_deliveries WHERE run_id = ?", (run_id,))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM webhook_deliveries")
+
+    def _row(self, run_id: str):
+        with self._lock:
+            return self._conn.execute(
+                "SELECT incident_id FROM webhook_deliveries WHERE run_id = ?", (run_id,)
+            ).fetchone()
+
+    def _trim(self) -> None:
+        # Caller holds the lock
+        self._conn.execute(
+            "DELETE FROM webhook_deliveries WHERE run_id IN ("
+            "SELECT run_id FROM webhook_deliveries ORDER BY received_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,)
+        )
+
+class DedupService:
+    """
+    Decides whether an error webhook is new work.
+
+    - duplicate: the same run_id was already delivered (webhook retry),
+      possibly to another worker process
+    - coalesced: another failure on the same trace, or the same error
+      fingerprint within the coalescing window; counted on the existing
+      incident instead of being fetched, diagnosed and filed again
+    - new: anything else
+    """
+
+    def __init__(self, store: IncidentStore, window_seconds: float, ledger: DeliveryLedger):
+        self.store = store
+        self.window = timedelta(seconds=window_seconds)
+        self.ledger = ledger
+
+    def check(self, trace_id: str, run_id: str, error_type: str, error_message: str) -> DedupDecision:
+        """
+        Classify a webhook. The only state it touches is forgetting a run
+        whose incident no longer exists, so the run counts as new again.
+        """
+        fingerprint = error_fingerprint(error_type, error_message)
+        if not settings.aha_dedup_enabled:
+            return DedupDecision("new", fingerprint)
+
+        if self.ledger.seen(run_id):
+            incident_id = self.ledger.incident_for(run_id)
+            if incident_id is None:
+                # First delivery is still being recorded, possibly by another worker
+                return DedupDecision("duplicate", fingerprint)
+            incident = self.store.get_incident(incident_id)
+            if incident:
+                return DedupDecision("duplicate", fingerprint, incident)
+            self.ledger.forget(run_id)
+
+        incident = self.store.find_incident_by_trace(trace_id)
+        if incident is None:
+            since = datetime.utcnow() - self.window
+            incident = self.store.find_recent_by_fingerprint(fingerprint, since)
+        if incident:
+            return DedupDecision("coalesced", fingerprint, incident)
+
+        return DedupDecision("new", fingerprint)
+
+    def claim(self, run_id: str) -> bool:
+        """
+        Atomically reserve a run before acting on it. False means another
+        delivery of the same run got there first.
+        """
+        if not settings.aha_dedup_enabled:
+            return True
+        return self.ledger.claim(run_id)
+
+    def remember(self, run_id: str, incident_id: str) -> None:
+        """Record which incident a run was attributed to"""
+        self.ledger.assign(run_id, incident_id)
+
+    def forget(self, run_id: str) -> None:
+        """Release a claim whose run was not recorded, so a redelivery is accepted"""
+        self.ledger.forget(run_id)
+
+    def clear(self) -> None:
+        """Forget remembered runs (for demo reset)"""
+        self.ledger.clear()
+
+def create_delivery_ledger() -> DeliveryLedger:
+    """Shared SQLite ledger when several processes receive webhooks"""
+    if settings.aha_shared_state:
+        return SQLiteDeliveryLedger(settings.aha_state_path, settings.aha_dedup_tracked_runs)
+    return DeliveryLedger(settings.aha_dedup_tracked_runs)
+
+# Global service instance
+dedup_service = services.register(
+    "dedup",
+    lambda: DedupService(
+        incident_store,
+        window_seconds=settings.aha_dedup_window_seconds,
+        ledger=create_delivery_ledger()
+    )
+)
@@ -0,0 +1,144 @@
+"""
+Batches pending diagnoses into shared LLM requests
+"""
+import asyncio
+import contextvars
+import json
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from app.services.diagnosis_schema import (
+    BATCH_DIAGNOSIS_JSON_SCHEMA, SCHEMA_TEXT, DiagnosisFormatError, extract_json_object
+)
+from app.services.trace_compactor import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+BATCH_DIAGNOSIS_PROMPT = """
+You are an expert AI system diagnostician specializing in multi-agent system failures.
+Below are {count} independent execution traces, each from a separate incident.
+Diagnose every incident on its own.
+
+{incidents}
+
+For EACH incident, write an object matching this JSON schema, plus an
+"incident" key holding the incident number:
+{schema}
+
+Reply with only one JSON object of the form {{"incidents": [...]}}, holding
+one entry per incident, and nothing else.
+
+Be specific and actionable in your recommendations.
+"""
+
+# (prompt, max_tokens, schema) -> reply
+Completion = Callable[[str, int, Dict[str, Any]], Awaitable[str]]
+
+class BatchResponseError(Exception):
+    """Raised for an incident the batched response did not answer"""
+
+class DiagnosisBatcher:
+    """
+    Collects formatted traces for up to `window_seconds` or `max_batch`
+    entries, sends them as one grouped request and hands each caller back
+    the section of the response written for its trace.
+
+    A batch is also cut early when adding a trace would push the prompt
+    past `max_prompt_tokens`, so one huge trace never drags others over
+    the context window.
+    """
+
+    def __init__(
+        self,
+        complete: Completion,
+        max_batch: int,
+        window_seconds: float,
+        max_prompt_tokens: int,
+        tokens_per_answer: int = 600
+    ):
+        self.complete = complete
+        self.max_batch = max_batch
+        self.window_seconds = window_seconds
+        self.max_prompt_tokens = max_prompt_tokens
+        self.tokens_per_answer = tokens_per_answer
+        self.batches_sent = 0
+        self.incidents_batched = 0
+        self._pending: List[Tuple[str, asyncio.Future]] = []
+        self._pending_tokens = 0
+        self._timer: Optional[asyncio.TimerHandle] = None
+        # The loop only holds weak references to tasks; a collected send would strand its callers
+        self._sending: Set[asyncio.Task] = set()
+
+    async def submit(self, formatted_trace: str) -> str:
+        """Queue a trace and wait for the LLM text diagnosing it"""
+        tokens = estimate_tokens(formatted_trace)
+        if self._pending and self._pending_tokens + tokens > self.max_prompt_tokens:
+            self._flush()
+
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((formatted_trace, future))
+        self._pending_tokens += tokens
+
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.window_seconds, self._flush)
+        return await future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending, self._pending_tokens = self._pending, [], 0
+        if batch:
+            # A batch serves several incidents; keep it out of the flushing caller's trace
+            task = asyncio.get_running_loop().create_task(self._send(batch), context=contextvars.Context())
+            self._sending.add(task)
+            task.add_done_callback(self._sending.discard)
+
+    async def _send(self, batch: List[Tuple[str, asyncio.Future]]) -> None:
+        incidents = "\n".join(
+            f"=== INCIDENT {number} ===\n{trace}" for number, (trace, _) in enumerate(batch, 1)
+        )
+        prompt = BATCH_DIAGNOSIS_PROMPT.format(count=len(batch), incidents=incidents, schema=SCHEMA_TEXT)
+        self.batches_sent += 1
+        self.incidents_batched += len(batch)
+        logger.info(f"Sending batched diagnosis for {len(batch)} incidents")
+
+        try:
+            response = await self.complete(prompt, self.tokens_per_answer * len(batch),
+                                           BATCH_DIAGNOSIS_JSON_SCHEMA)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        sections = self.split_sections(response)
+        for number, (_, future) in enumerate(batch, 1):
+            if future.done():
+                continue
+            if number in sections:
+                future.set_result(sections[number])
+            else:
+                future.set_exception(BatchResponseError(f"No answer for incident {number} in batch"))
+
+    @staticmethod
+    def split_sections(response: str) -> Dict[int, str]:
+        """Map incident number to the JSON diagnosis written for it"""
+        try:
+            entries = extract_json_object(response).get("incidents")
+        except DiagnosisFormatError:
+            return {}
+        sections: Dict[int, str] = {}
+        for entry in entries if isinstance(entries, list) else []:
+            if isinstance(entry, dict) and isinstance(entry.get("incident"), int):
+                sections.setdefault(entry["incident"], json.dumps(entry))
+        return sections
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "batches_sent": self.batches_sent,
+            "incidents_batched": self.incidents_batched,
+            "average_batch_size": self.incidents_batched / self.batches_sent if self.batches_sent else 0.0
+        }
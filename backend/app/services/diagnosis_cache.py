@@ -0,0 +1,136 @@
+"""
+Content-addressed cache of diagnoses keyed by canonicalized trace text
+"""
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from app.core.config import settings
+from app.core.fingerprint import normalize_error_text
+from app.core.metrics import metrics
+from app.core.registry import services
+from app.models.incident import DiagnosisResult
+
+logger = logging.getLogger(__name__)
+
+class DiagnosisCache:
+    """
+    Two-tier cache: an in-memory LRU with TTL, backed optionally by a SQLite
+    file so warm entries survive restarts.
+
+    Keys hash the formatted trace after ids, timestamps and numbers are
+    normalized, so structurally identical failures share an entry.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float, path: Optional[str] = None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[float, DiagnosisResult]]" = OrderedDict()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        if path:
+            self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS diagnosis_cache "
+                "(key TEXT PRIMARY KEY, result TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+
+    @staticmethod
+    def key_for(formatted_trace: str) -> str:
+        """Canonical hash of a formatted trace"""
+        return hashlib.sha256(normalize_error_text(formatted_trace).encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[DiagnosisResult]:
+        """Cached diagnosis for `key`, or None"""
+        now = time.time()
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, result = entry
+            if expires_at > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return result.model_copy()
+            del self._entries[key]
+
+        result = self._get_from_disk(key, now)
+        if result is not None:
+            self.disk_hits += 1
+            self._remember(key, result, now)
+            return result.model_copy()
+
+        self.misses += 1
+        return None
+
+    def put(self, key: str, result: DiagnosisResult) -> None:
+        """Store a diagnosis in both tiers"""
+        now = time.time()
+        self._remember(key, result, now)
+        if self._conn is not None:
+            with self._lock:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO diagnosis_cache (key, result, expires_at) VALUES (?, ?, ?)",
+                    (key, result.model_dump_json(), now + self.ttl_seconds)
+                )
+
+    def _remember(self, key: str, result: DiagnosisResult, now: float) -> None:
+        self._entries[key] = (now + self.ttl_seconds, result)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _get_from_disk(self, key: str, now: float) -> Optional[DiagnosisResult]:
+        if self._conn is None:
+            return None
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT result, expires_at FROM diagnosis_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if row[1] <= now:
+                self._conn.execute("DELETE FROM diagnosis_cache WHERE key = ?", (key,))
+                return None
+        return DiagnosisResult.model_validate_json(row[0])
+
+    def clear(self) -> None:
+        """Drop every cached diagnosis"""
+        self._entries.clear()
+        if self._conn is not None:
+            with self._lock:
+                self._conn.execute("DELETE FROM diagnosis_cache")
+
+    def stats(self) -> Dict[str, float]:
+        """Hit/miss counters for monitoring"""
+        lookups = self.hits + self.disk_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits + self.disk_hits) / lookups if lookups else 0.0
+        }
+
+# Global cache instance
+diagnosis_cache = services.register(
+    "diagnosis_cache",
+    lambda: DiagnosisCache(
+        max_entries=settings.diagnosis_cache_size,
+        ttl_seconds=settings.diagnosis_cache_ttl_seconds,
+        path=settings.diagnosis_cache_path
+    )
+)
+
+metrics.collected(
+    "aha_diagnosis_cache_lookups_total", "Diagnosis cache lookups by result", ["result"],
+    lambda: {(result,): diagnosis_cache.stats()[result] for result in ("hits", "disk_hits", "misses")},
+    kind="counter"
+)
@@ -0,0 +1,105 @@
+"""
+JSON schema for LLM diagnoses and the validating parser for replies
+"""
+import json
+import re
+from typing import Any, Dict
+
+from app.models.incident import DiagnosisResult
+
+# Keys the model must return, with what each should contain
+DIAGNOSIS_JSON_SCHEMA: Dict[str, Any] = {
+    "type": "object",
+    "properties": {
+        "diagnosis": {"type": "string", "description": "Brief summary of what went wrong"},
+        "confidence_score": {"type": "number", "minimum": 0, "maximum": 1},
+        "root_cause": {"type": "string", "description": "Detailed explanation of the underlying issue"},
+        "error_category": {
+            "type": "string",
+            "description": "parsing_error, api_failure, timeout, logic_error, etc."
+        },
+        "suggested_fix": {"type": "string", "description": "Specific actionable fix"}
+    },
+    "required": ["diagnosis", "confidence_score", "root_cause", "error_category", "suggested_fix"]
+}
+
+SCHEMA_TEXT = json.dumps(DIAGNOSIS_JSON_SCHEMA, indent=2)
+
+# A batched reply: one diagnosis per incident, tagged with its number
+BATCH_DIAGNOSIS_JSON_SCHEMA: Dict[str, Any] = {
+    "type": "object",
+    "properties": {
+        "incidents": {
+            "type": "array",
+            "items": {
+                **DIAGNOSIS_JSON_SCHEMA,
+                "properties": {"incident": {"type": "integer"}, **DIAGNOSIS_JSON_SCHEMA["properties"]},
+                "required": ["incident", *DIAGNOSIS_JSON_SCHEMA["required"]]
+            }
+        }
+    },
+    "required": ["incidents"]
+}
+
+REPAIR_PROMPT = """
+Your previous reply could not be used: {error}.
+
+Previous reply:
+{reply}
+
+Reply again with only one JSON object matching this schema, and nothing else:
+{schema}
+"""
+
+_FENCE = re.compile(r"^```(?:json)?\s*|\s*```$")
+_CATEGORY_SEPARATORS = re.compile(r"[^a-z0-9]+")
+
+class DiagnosisFormatError(ValueError):
+    """Raised for a reply that is not a diagnosis matching the schema"""
+
+def extract_json_object(text: str) -> Dict[str, Any]:
+    """The JSON object in `text`, tolerating code fences and prose around it"""
+    stripped = _FENCE.sub("", text.strip())
+    try:
+        value = json.loads(stripped)
+    except json.JSONDecodeError:
+        start, end = stripped.find("{"), stripped.rfind("}")
+        if start < 0 or end <= start:
+            raise DiagnosisFormatError("reply contains no JSON object")
+        try:
+            value = json.loads(stripped[start:end + 1])
+        except json.JSONDecodeError as e:
+            raise DiagnosisFormatError(f"invalid JSON: {e}")
+    if not isinstance(value, dict):
+        raise DiagnosisFormatError(f"expected a JSON object, got {type(value).__name__}")
+    return value
+
+def normalize_category(value: str) -> str:
+    """`API Failure` and `api-failure` both become `api_failure`"""
+    return _CATEGORY_SEPARATORS.sub("_", value.strip().lower()).strip("_") or "unknown"
+
+def diagnosis_from_object(value: Dict[str, Any]) -> DiagnosisResult:
+    """Validate a decoded reply against the schema"""
+    missing = [key for key in DIAGNOSIS_JSON_SCHEMA["required"] if value.get(key) in (None, "")]
+    if missing:
+        raise DiagnosisFormatError(f"missing {', '.join(missing)}")
+    text_fields = {}
+    for key in ("diagnosis", "root_cause", "error_category", "suggested_fix"):
+        if not isinstance(value[key], str):
+            raise DiagnosisFormatError(f"{key} must be a string")
+        text_fields[key] = value[key].strip()
+    try:
+        confidence = float(value["confidence_score"])
+    except (TypeError, ValueError):
+        raise DiagnosisFormatError("confidence_score must be a number")
+    return DiagnosisResult(
+        diagnosis=text_fields["diagnosis"],
+        confidence_score=max(0.0, min(1.0, confidence)),
+        root_cause=text_fields["root_cause"],
+        error_category=normalize_category(text_fields["error_category"]),
+        suggested_fix=text_fields["suggested_fix"]
+    )
+
+def parse_diagnosis(text: str) -> DiagnosisResult:
+    """Diagnosis from an LLM reply, or DiagnosisFormatError saying what is wrong"""
+    return diagnosis_from_object(extract_json_object(text))
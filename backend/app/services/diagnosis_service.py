@@ -2,14 +2,27 @@
 Service for LLM-powered diagnosis of agent failures
 """
 import logging
-from typing import Dict, Any
-import anthropic
+from typing import Callable, Dict, Any, Optional
 
 from app.core.config import settings
+from app.core.metrics import diagnosis_repairs, diagnosis_sources
+from app.core.registry import services
+from app.core.tracing import tracer
 from app.models.incident import DiagnosisResult
+from app.services.diagnosis_batcher import BatchResponseError, DiagnosisBatcher
+from app.services.diagnosis_cache import diagnosis_cache
+from app.services.diagnosis_schema import (
+    DIAGNOSIS_JSON_SCHEMA, REPAIR_PROMPT, SCHEMA_TEXT, DiagnosisFormatError, parse_diagnosis
+)
+from app.services.diagnosis_stream import IncrementalDiagnosisParser
+from app.services.llm_router import LLMRouter, llm_router
+from app.services.similarity_index import similarity_index
+from app.services.trace_compactor import trace_compactor
 
 logger = logging.getLogger(__name__)
 
+FieldCallback = Callable[[str, Any], None]
+
 DIAGNOSIS_PROMPT = """
 You are an expert AI system diagnostician specializing in multi-agent system failures. 
 Analyze the following execution trace and provide a detailed diagnosis.
@@ -17,13 +30,8 @@ Analyze the following execution trace and provide a detailed diagnosis.
 TRACE DATA:
 {trace_data}
 
-Please provide your analysis in the following format:
-
-DIAGNOSIS: [Brief summary of what went wrong]
-CONFIDENCE: [0.0-1.0 confidence score]
-ROOT CAUSE: [Detailed explanation of the underlying issue]
-ERROR CATEGORY: [Classification: parsing_error, api_failure, timeout, logic_error, etc.]
-SUGGESTED FIX: [Specific actionable fix]
+Reply with only one JSON object matching this schema, and nothing else:
+{schema}
 
 Focus on:
 1. Agent interaction patterns
@@ -38,37 +46,100 @@ Be specific and actionable in your recommendations.
 class DiagnosisService:
     """Service for analyzing traces with LLM"""
     
-    def __init__(self):
-        self.anthropic_client = None
-        
-        if settings.anthropic_api_key:
-            self.anthropic_client = anthropic.AsyncAnthropic(api_key=settings.anthropic_api_key)
+    def __init__(self, router: Optional[LLMRouter] = None):
+        self.router = router if router is not None else llm_router
+
+        self.batcher: Optional[DiagnosisBatcher] = None
+        if settings.diagnosis_batch_enabled:
+            self.batcher = DiagnosisBatcher(
+                complete=self._complete,
+                max_batch=settings.diagnosis_batch_size,
+                window_seconds=settings.diagnosis_batch_window_seconds,
+                max_prompt_tokens=settings.diagnosis_batch_max_tokens
+            )
     
-    async def analyze_trace(self, trace_data: Dict[str, Any]) -> DiagnosisResult:
+    async def analyze_trace(
+        self,
+        trace_data: Dict[str, Any],
+        incident_id: Optional[str] = None,
+        on_field: Optional[FieldCallback] = None
+    ) -> DiagnosisResult:
         """
-        Analyze trace data using LLM and return structured diagnosis
+        Analyze trace data using LLM and return structured diagnosis.
+
+        When `incident_id` is given, a fresh LLM diagnosis is indexed so
+        later near-duplicate incidents can reuse it. When `on_field` is
+        given and streaming is enabled, it is called with each of the
+        diagnosis, confidence_score and error_category fields as soon as
+        the model has written it.
         """
         try:
             logger.info(f"Analyzing trace: {trace_data.get('trace_id', 'unknown')}")
             
             # Format trace data for analysis
-            formatted_trace = self._format_trace_for_analysis(trace_data)
-            prompt = DIAGNOSIS_PROMPT.format(trace_data=formatted_trace)
+            with tracer.span("build_prompt"):
+                formatted_trace = self._format_trace_for_analysis(trace_data)
+
+            # Structurally identical traces reuse an earlier diagnosis
+            cache_key = diagnosis_cache.key_for(formatted_trace)
+            if settings.diagnosis_cache_enabled:
+                cached = diagnosis_cache.get(cache_key)
+                if cached:
+                    logger.info(f"Diagnosis cache hit for trace: {trace_data.get('trace_id', 'unknown')}")
+                    diagnosis_sources.inc(source="cache")
+                    tracer.annotate(source="cache")
+                    return cached
+
+            # Near-duplicates of an earlier incident reuse its diagnosis
+            similarity_text = self._similarity_text(trace_data)
+            if settings.similarity_enabled:
+                match = similarity_index.query(similarity_text)
+                if match and match[2] >= settings.similarity_threshold:
+                    similar_id, similar_result, score = match
+                    logger.info(f"Reusing diagnosis of incident {similar_id} (similarity {score:.2f})")
+                    diagnosis_sources.inc(source="similar")
+                    tracer.annotate(source="similar", similar_incident_id=similar_id)
+                    return similar_result.model_copy(
+                        update={"similar_incident_id": similar_id, "similarity_score": score}
+                    )
+
+            prompt = DIAGNOSIS_PROMPT.format(trace_data=formatted_trace, schema=SCHEMA_TEXT)
             
-            # Use Anthropic Claude for analysis
-            if self.anthropic_client:
-                response = await self._analyze_with_anthropic(prompt)
-            else:
+            if not self.router.providers:
                 raise ValueError("No LLM provider configured")
+            source = "llm"
+            with tracer.span("llm_call", prompt_chars=len(prompt)) as span:
+                if self.batcher:
+                    span.set(mode="batch")
+                    try:
+                        response = await self.batcher.submit(formatted_trace)
+                        source = "batch"
+                    except BatchResponseError as e:
+                        logger.warning(f"{e}, diagnosing on its own")
+                        span.set(mode="batch_fallback")
+                        response = await self._complete(prompt)
+                elif on_field and settings.diagnosis_streaming_enabled:
+                    span.set(mode="stream")
+                    response = await self._stream(prompt, on_field)
+                else:
+                    span.set(mode="single")
+                    response = await self._complete(prompt)
             
-            # Parse the response into structured format
-            diagnosis_result = self._parse_diagnosis_response(response)
+            diagnosis_result = await self._parse_or_repair(response)
+            if settings.diagnosis_cache_enabled:
+                diagnosis_cache.put(cache_key, diagnosis_result)
+            if settings.similarity_enabled and incident_id:
+                similarity_index.add(incident_id, similarity_text, diagnosis_result)
             
             logger.info(f"Analysis complete with confidence: {diagnosis_result.confidence_score}")
+            diagnosis_sources.inc(source=source)
+            tracer.annotate(source="llm")
             return diagnosis_result
             
         except Exception as e:
             logger.error(f"Error analyzing trace: {str(e)}")
+            diagnosis_sources.inc(source="fallback")
+            tracer.annotate(source="fallback", diagnosis_error=str(e))
             # Return fallback diagnosis
             return DiagnosisResult(
                 diagnosis="Failed to analyze trace - see raw error data",
@@ -78,66 +149,76 @@ class DiagnosisService:
                 root_cause=f"LLM analysis failed: {str(e)}"
             )
     
-    async def _analyze_with_anthropic(self, prompt: str) -> str:
-        """Analyze with Anthropic Claude"""
-        response = await self.anthropic_client.messages.create(
-            model="claude-3-5-sonnet-20241022",
-            max_tokens=1000,
-            temperature=0.1,
-            messages=[{"role": "user", "content": prompt}]
-        )
-        return response.content[0].text
+    async def _complete(self, prompt: str, max_tokens: int = 1000,
+                        schema: Dict[str, Any] = DIAGNOSIS_JSON_SCHEMA) -> str:
+        """One JSON completion following `schema` from whichever provider the router picks"""
+        return await self.router.complete(prompt, max_tokens, schema=schema)
+
+    async def _stream(self, prompt: str, on_field: FieldCallback) -> str:
+        """Stream a JSON completion, reporting fields as their values complete"""
+        parser = IncrementalDiagnosisParser()
+        await self.router.stream(prompt, lambda text: self._report_fields(parser.feed(text), on_field),
+                                 schema=DIAGNOSIS_JSON_SCHEMA)
+        self._report_fields(parser.close(), on_field)
+        return parser.text
+
+    async def _parse_or_repair(self, response: str) -> DiagnosisResult:
+        """
+        Validate the reply against the schema. A malformed reply gets exactly
+        one repair request, which sends back the reply and the problem but
+        not the trace.
+        """
+        with tracer.span("parse", response_chars=len(response)) as span:
+            try:
+                return parse_diagnosis(response)
+            except DiagnosisFormatError as e:
+                span.set(error=str(e))
+                problem = e
+        logger.warning(f"Diagnosis reply did not match the schema ({problem}), asking for a repair")
+        with tracer.span("repair", problem=str(problem)):
+            repaired = await self._complete(
+                REPAIR_PROMPT.format(error=problem, reply=response[:8000], schema=SCHEMA_TEXT)
+            )
+        with tracer.span("parse", response_chars=len(repaired)):
+            try:
+                result = parse_diagnosis(repaired)
+            except DiagnosisFormatError:
+                diagnosis_repairs.inc(outcome="failed")
+                raise
+        diagnosis_repairs.inc(outcome="repaired")
+        return result
+
+    @staticmethod
+    def _report_fields(fields: Dict[str, Any], on_field: FieldCallback) -> None:
+        for field, value in fields.items():
+            try:
+                on_field(field, value)
+            except Exception as e:
+                logger.warning(f"Early update of {field} failed: {str(e)}")
     
     def _format_trace_for_analysis(self, trace_data: Dict[str, Any]) -> str:
-        """Format trace data for LLM analysis"""
-        formatted = f"Trace ID: {trace_data.get('trace_id', 'unknown')}\n\n"
-        
-        for i, run in enumerate(trace_data.get('runs', [])):
-            formatted += f"=== RUN {i+1}: {run.get('name', 'Unknown')} ===\n"
-            formatted += f"Type: {run.get('run_type', 'unknown')}\n"
-            formatted += f"Inputs: {run.get('inputs', {})}\n"
-            formatted += f"Outputs: {run.get('outputs', {})}\n"
-            
-            if run.get('error'):
-                formatted += f"ERROR: {run['error']}\n"
-            
-            formatted += f"Duration: {run.get('start_time', '')} to {run.get('end_time', '')}\n\n"
-        
-        return formatted
-    
-    def _parse_diagnosis_response(self, response: str) -> DiagnosisResult:
-        """Parse LLM response into structured diagnosis"""
-        lines = response.strip().split('\n')
-        
-        diagnosis = ""
-        confidence_score = 0.5
-        root_cause = ""
-        error_category = "unknown"
-        suggested_fix = ""
-        
-        for line in lines:
-            line = line.strip()
-            if line.startswith("DIAGNOSIS:"):
-                diagnosis = line.replace("DIAGNOSIS:", "").strip()
-            elif line.startswith("CONFIDENCE:"):
-                try:
-                    confidence_score = float(line.replace("CONFIDENCE:", "").strip())
-                except ValueError:
-                    confidence_score = 0.5
-            elif line.startswith("ROOT CAUSE:"):
-                root_cause = line.replace("ROOT CAUSE:", "").strip()
-            elif line.startswith("ERROR CATEGORY:"):
-                error_category = line.replace("ERROR CATEGORY:", "").strip()
-            elif line.startswith("SUGGESTED FIX:"):
-                suggested_fix = line.replace("SUGGESTED FIX:", "").strip()
-        
-        return DiagnosisResult(
-            diagnosis=diagnosis or "Analysis completed",
-            confidence_score=max(0.0, min(1.0, confidence_score)),
-            suggested_fix=suggested_fix or "No specific fix suggested",
-            error_category=error_category or "unknown",
-            root_cause=root_cause or "Root cause analysis incomplete"
+        """Format trace data for LLM analysis, compacted to the token budget"""
+        compact = trace_compactor.compact(trace_data)
+        logger.info(
+            f"Compacted trace {trace_data.get('trace_id', 'unknown')}: "
+            f"{compact.tokens_used} tokens (saved {compact.tokens_saved}), "
+            f"{compact.runs_included} runs kept, {compact.runs_omitted} omitted"
         )
+        tracer.annotate(
+            tokens_original=compact.tokens_original,
+            tokens_used=compact.tokens_used,
+            runs_included=compact.runs_included,
+            runs_omitted=compact.runs_omitted
+        )
+        return compact.text
+    
+    def _similarity_text(self, trace_data: Dict[str, Any]) -> str:
+        """Failing runs and their errors, the part that identifies a failure class"""
+        runs = trace_data.get('runs', [])
+        failing = [f"{run.get('name', 'Unknown')}: {run['error']}" for run in runs if run.get('error')]
+        if failing:
+            return "\n".join(failing)
+        return "\n".join(str(run.get('name', 'Unknown')) for run in runs)
 
 # Global service instance
-diagnosis_service = DiagnosisService()
+diagnosis_service = services.register("diagnosis", DiagnosisService)
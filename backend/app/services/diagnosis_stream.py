@@ -0,0 +1,69 @@
+"""
+Incremental parsing of streamed diagnosis responses
+"""
+import json
+import re
+from typing import Any, Dict, List, Optional
+
+from app.services.diagnosis_schema import normalize_category
+
+# Fields worth showing before the whole answer is in
+STREAMED_FIELDS: List[str] = ["diagnosis", "confidence_score", "error_category"]
+
+# A key with a finished value: a closed string, or a number followed by what ends it
+_FIELD = re.compile(
+    r'"(' + "|".join(STREAMED_FIELDS) + r')"\s*:\s*("(?:[^"\\]|\\.)*"|-?\d+(?:\.\d+)?(?=[\s,}]))'
+)
+
+class IncrementalDiagnosisParser:
+    """
+    Fed text deltas of a streamed JSON diagnosis; reports each streamed
+    field once its value is complete, so partial values never reach the
+    dashboard. The full text is validated separately when the stream ends.
+    """
+
+    def __init__(self):
+        self._chunks: List[str] = []
+        self._scanned = 0
+        self.fields: Dict[str, Any] = {}
+
+    @property
+    def text(self) -> str:
+        """Full response received so far"""
+        return "".join(self._chunks)
+
+    def feed(self, delta: str) -> Dict[str, Any]:
+        """Add a text delta; return fields completed by it"""
+        self._chunks.append(delta)
+        if len(self.fields) == len(STREAMED_FIELDS):
+            return {}
+        return self._scan(self.text)
+
+    def close(self) -> Dict[str, Any]:
+        """Pick up a number that ended the stream without a delimiter"""
+        return self._scan(self.text + "}")
+
+    def _scan(self, text: str) -> Dict[str, Any]:
+        completed: Dict[str, Any] = {}
+        # Keys arrive in order, so nothing unfinished starts before the last match
+        for match in _FIELD.finditer(text, self._scanned):
+            field = match.group(1)
+            if field in self.fields:
+                continue
+            value = self._convert(field, match.group(2))
+            if value is not None:
+                self.fields[field] = completed[field] = value
+            self._scanned = match.end()
+        return completed
+
+    @staticmethod
+    def _convert(field: str, raw: str) -> Optional[Any]:
+        try:
+            value = json.loads(raw)
+        except json.JSONDecodeError:
+            return None
+        if field == "confidence_score":
+            return max(0.0, min(1.0, float(value))) if isinstance(value, (int, float)) else None
+        if not isinstance(value, str) or not value.strip():
+            return None
+        return normalize_category(value) if field == "error_category" else value.strip()
@@ -0,0 +1,153 @@
+"""
+Async GitHub REST client with pooled connections and rate limiting
+"""
+import asyncio
+import logging
+import time
+from typing import Any, Dict, Mapping, Optional
+
+import httpx
+
+from app.core.config import settings
+from app.core.tracing import tracer
+
+logger = logging.getLogger(__name__)
+
+class GitHubAPIError(Exception):
+    """Non-success response from the GitHub API"""
+
+    def __init__(self, status_code: int, message: str):
+        super().__init__(f"GitHub API {status_code}: {message}")
+        self.status_code = status_code
+
+class TokenBucket:
+    """
+    Paces requests to `rate` per second with bursts of up to `capacity`.
+
+    GitHub's rate-limit headers override the local estimate: a response
+    with `retry-after`, or with `x-ratelimit-remaining: 0`, pauses every
+    caller until the server says requests may resume.
+    """
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        """Wait for a token"""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    await asyncio.sleep(self._paused_until - now)
+                    continue
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+    def pause(self, seconds: float) -> None:
+        """Hold all callers for `seconds`"""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+        self._tokens = 0.0
+
+    def observe(self, headers: Mapping[str, str]) -> Optional[float]:
+        """Apply rate-limit headers; return the pause they imposed, if any"""
+        retry_after = headers.get("retry-after")
+        if retry_after is not None:
+            try:
+                seconds = float(retry_after)
+            except ValueError:
+                seconds = 60.0
+            self.pause(seconds)
+            return seconds
+
+        if headers.get("x-ratelimit-remaining") == "0" and headers.get("x-ratelimit-reset"):
+            try:
+                seconds = max(0.0, float(headers["x-ratelimit-reset"]) - time.time())
+            except ValueError:
+                return None
+            self.pause(seconds)
+            return seconds
+        return None
+
+class GitHubClient:
+    """Thin async wrapper over the GitHub REST API"""
+
+    def __init__(self, token: str):
+        self.token = token
+        self.throttled = 0
+        self._client: Optional[httpx.AsyncClient] = None
+        self.bucket = TokenBucket(
+            rate=settings.github_requests_per_second,
+            capacity=settings.github_burst
+        )
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """Shared keep-alive HTTP client, created on first use"""
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=settings.github_api_url,
+                headers={
+                    "Authorization": f"Bearer {self.token}",
+                    "Accept": "application/vnd.github+json",
+                    "X-GitHub-Api-Version": "2022-11-28"
+                },
+                timeout=settings.github_timeout_seconds,
+                limits=httpx.Limits(
+                    max_connections=settings.github_max_connections,
+                    max_keepalive_connections=settings.github_max_connections
+                )
+            )
+        return self._client
+
+    async def aclose(self) -> None:
+        """Close pooled connections"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def request(
+        self,
+        method: str,
+        path: str,
+        json: Optional[Dict[str, Any]] = None,
+        params: Optional[Dict[str, Any]] = None
+    ) -> Any:
+        """
+        Send a request, waiting out primary and secondary rate limits.
+
+        Raises GitHubAPIError for other failures, or once
+        `github_max_retries` throttled attempts are used up.
+        """
+        with tracer.span("github_call", method=method, path=path) as span:
+            waited = 0.0
+            for attempt in range(settings.github_max_retries + 1):
+                started = time.perf_counter()
+                await self.bucket.acquire()
+                waited += time.perf_counter() - started
+                response = await self.client.request(method, path, json=json, params=params)
+                pause = self.bucket.observe(response.headers)
+                span.set(status_code=response.status_code, attempts=attempt + 1,
+                         rate_limit_wait_ms=round(waited * 1000, 1))
+
+                if response.status_code in (403, 429) and pause is not None:
+                    self.throttled += 1
+                    logger.warning(f"GitHub rate limited {method} {path}, pausing {pause:.1f}s")
+                    continue
+                if response.status_code >= 400:
+                    try:
+                        message = response.json().get("message", response.text)
+                    except ValueError:
+                        message = response.text
+                    raise GitHubAPIError(response.status_code, message)
+                return response.json() if response.content else None
+
+            raise GitHubAPIError(429, f"Still rate limited after {settings.github_max_retries} retries")
@@ -1,13 +1,17 @@
 """
 Service for creating GitHub issues
 """
+import asyncio
+import contextvars
 import logging
-from typing import Optional
-from github import Github
-from github.GithubException import GithubException
+import time
+from typing import Dict, Iterable, Optional, Set, Tuple
 
 from app.core.config import settings
+from app.core.registry import services
 from app.models.incident import DiagnosisResult
+from app.services.github_client import GitHubAPIError, GitHubClient
+from app.services.issue_index import FINGERPRINT_MARKER, IssueIndex, fingerprint_from_body
 
 logger = logging.getLogger(__name__)
 
@@ -37,42 +41,275 @@ ISSUE_TEMPLATE = """
 *This issue was automatically created by AHA (Autonomous AI Healing Agent)*
 """
 
+OCCURRENCE_COMMENT = """
+**Recurred** in trace `{trace_id}` ([LangSmith]({langsmith_url}))
+
+Diagnosis: {diagnosis} (confidence {confidence_score:.2f})
+"""
+
+class LabelQueue:
+    """
+    Makes sure labels exist before issues use them.
+
+    Labels requested while a flush is pending are collected for
+    `window_seconds` and created together, each name once no matter how
+    many issues asked for it; callers share the result.
+    """
+
+    def __init__(self, client: GitHubClient, repo_path: str, window_seconds: float = 0.1):
+        self.client = client
+        self.repo_path = repo_path
+        self.window_seconds = window_seconds
+        self.known: Set[str] = set()
+        self._pending: Dict[str, asyncio.Future] = {}
+        self._flush_task: Optional[asyncio.Task] = None
+
+    async def ensure(self, names: Iterable[str]) -> None:
+        """Wait until every label in `names` exists"""
+        waiting = []
+        for name in set(names) - self.known:
+            future = self._pending.get(name)
+            if future is None:
+                future = asyncio.get_running_loop().create_future()
+                self._pending[name] = future
+            waiting.append(future)
+        if not waiting:
+            return
+        if self._flush_task is None or self._flush_task.done():
+            # Shared by every waiting issue, so not part of any one incident's trace
+            self._flush_task = asyncio.create_task(self._flush(), context=contextvars.Context())
+        # The futures are shared with other issues, so a cancelled caller must not cancel them
+        await asyncio.wait(waiting)
+        for future in waiting:
+            future.result()
+
+    async def _flush(self) -> None:
+        # Labels requested while a batch is being created go in the next one
+        while self._pending:
+            await asyncio.sleep(self.window_seconds)
+            batch, self._pending = self._pending, {}
+            logger.info(f"Creating {len(batch)} GitHub labels")
+            for name, future in batch.items():
+                try:
+                    await self.client.request("POST", f"{self.repo_path}/labels", json={"name": name})
+                except Exception as e:
+                    # 422 means the label already exists; anything else fails only this label
+                    if not (isinstance(e, GitHubAPIError) and e.status_code == 422):
+                        if not future.done():
+                            future.set_exception(e)
+                        continue
+                self.known.add(name)
+                if not future.done():
+                    future.set_result(None)
+
 class GitHubService:
     """Service for GitHub API interactions"""
-    
+
     def __init__(self):
-        self.github = None
-        self.repo = None
-        
-        try:
-            if settings.github_token and settings.github_token != "ghp_your_actual_token_here":
-                self.github = Github(settings.github_token)
-                self.repo = self.github.get_repo(
-                    f"{settings.github_repo_owner}/{settings.github_repo_name}"
-                )
-                logger.info("GitHub service initialized successfully")
-            else:
-                logger.warning("GitHub token not configured - issues will not be created")
-        except Exception as e:
-            logger.warning(f"GitHub service initialization failed: {e}")
-    
+        self.client: Optional[GitHubClient] = None
+        self.repo_path = f"/repos/{settings.github_repo_owner}/{settings.github_repo_name}"
+        self.repo: Optional[Dict] = None
+        self.labels: Optional[LabelQueue] = None
+        self._repo_lock = asyncio.Lock()
+        self.issue_index = IssueIndex(settings.github_issue_index_path)
+        # fingerprint -> settles once the first issue for it has been filed
+        self._filing: Dict[str, asyncio.Future] = {}
+        self._resync_task: Optional[asyncio.Task] = None
+        self.issues_created = 0
+        self.comments_added = 0
+        self.resyncs = 0
+
+        if settings.github_token and settings.github_token != "ghp_your_actual_token_here":
+            self.client = GitHubClient(settings.github_token)
+        else:
+            logger.warning("GitHub token not configured - issues will not be created")
+
+    async def resolve_repo(self) -> Optional[Dict]:
+        """
+        Look up the target repository once, on first use, and load its
+        labels and open AHA issues
+        """
+        if self.repo is not None or self.client is None:
+            return self.repo
+        async with self._repo_lock:
+            if self.repo is None:
+                try:
+                    repo = await self.client.request("GET", self.repo_path)
+                    labels = LabelQueue(self.client, self.repo_path)
+                    existing = await self.client.request(
+                        "GET", f"{self.repo_path}/labels", params={"per_page": 100}
+                    )
+                    labels.known.update(label["name"] for label in existing or [])
+                    indexed = await self._warm_issue_index()
+                    self.repo, self.labels = repo, labels
+                    logger.info(f"GitHub repository {repo.get('full_name')} resolved, "
+                                f"{indexed} open AHA issues indexed")
+                    if settings.github_issue_resync_seconds > 0:
+                        # Not part of any one incident's trace
+                        self._resync_task = asyncio.create_task(
+                            self._resync_issue_index(), context=contextvars.Context()
+                        )
+                except Exception as e:
+                    logger.warning(f"GitHub repository lookup failed: {e}")
+        return self.repo
+
+    async def warm_up(self) -> None:
+        """Resolve the repository ahead of the first issue"""
+        if self.client is not None and not await self.resolve_repo():
+            raise RuntimeError(f"GitHub repository {self.repo_path} could not be resolved")
+
+    async def _warm_issue_index(self) -> int:
+        """
+        Index the repo's open aha-generated issues by their fingerprint
+        marker, and drop persisted entries for issues closed since
+        """
+        started = time.time()
+        open_fingerprints: Set[str] = set()
+        page = 1
+        while True:
+            issues = await self.client.request(
+                "GET",
+                f"{self.repo_path}/issues",
+                params={"labels": "aha-generated", "state": "open", "per_page": 100, "page": page}
+            ) or []
+            for issue in issues:
+                fingerprint = fingerprint_from_body(issue.get("body"))
+                if fingerprint:
+                    self.issue_index.put(fingerprint, issue["number"], issue["html_url"])
+                    open_fingerprints.add(fingerprint)
+            if len(issues) < 100:
+                break
+            page += 1
+        dropped = self.issue_index.retain(open_fingerprints, before=started)
+        if dropped:
+            logger.info(f"Dropped {dropped} indexed issues that are no longer open")
+        return len(open_fingerprints)
+
+    async def _resync_issue_index(self) -> None:
+        """
+        Re-read the open issues every `github_issue_resync_seconds`, so
+        issues closed on GitHub stop collecting occurrence comments
+        """
+        while True:
+            await asyncio.sleep(settings.github_issue_resync_seconds)
+            try:
+                await self._warm_issue_index()
+                self.resyncs += 1
+            except Exception as e:
+                logger.warning(f"GitHub issue index re-sync failed: {e}")
+
+    async def aclose(self) -> None:
+        """Close pooled connections"""
+        if self._resync_task is not None:
+            self._resync_task.cancel()
+            try:
+                await self._resync_task
+            except asyncio.CancelledError:
+                pass
+            self._resync_task = None
+        if self.client is not None:
+            await self.client.aclose()
+        self.issue_index.close()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "indexed_issues": len(self.issue_index),
+            "issues_created": self.issues_created,
+            "comments_added": self.comments_added,
+            "index_resyncs": self.resyncs,
+            "throttled": self.client.throttled if self.client else 0
+        }
+
     async def create_issue(
         self,
         title: str,
         trace_id: str,
         diagnosis_result: DiagnosisResult,
-        langsmith_url: str
+        langsmith_url: str,
+        fingerprint: Optional[str] = None
     ) -> Optional[str]:
         """
-        Create a GitHub issue for the incident
+        Create a GitHub issue for the incident.
+
+        An incident whose `fingerprint` already has an open issue gets an
+        occurrence comment on that issue instead of a new one.
         """
-        if not self.repo:
+        if not await self.resolve_repo():
             logger.warning("GitHub repository not configured - skipping issue creation")
             return None
-            
+        if not fingerprint:
+            return await self._open_issue(title, trace_id, diagnosis_result, langsmith_url, None)
+
+        # Let a concurrent filing for the same fingerprint finish first
+        while (pending := self._filing.get(fingerprint)) is not None:
+            await asyncio.wait({pending})
+
+        existing = self.issue_index.get(fingerprint)
+        if existing:
+            url = await self._add_occurrence(fingerprint, existing, trace_id, diagnosis_result, langsmith_url)
+            if url:
+                return url
+
+        filed = asyncio.get_running_loop().create_future()
+        self._filing[fingerprint] = filed
+        try:
+            return await self._open_issue(title, trace_id, diagnosis_result, langsmith_url, fingerprint)
+        finally:
+            filed.set_result(None)
+            if self._filing.get(fingerprint) is filed:
+                del self._filing[fingerprint]
+
+    async def _add_occurrence(
+        self,
+        fingerprint: str,
+        existing: Tuple[int, str],
+        trace_id: str,
+        diagnosis_result: DiagnosisResult,
+        langsmith_url: str
+    ) -> Optional[str]:
+        """
+        Comment on the indexed issue for `fingerprint`; None if it no
+        longer exists. Issues closed on GitHub are dropped from the index
+        by the periodic re-sync, not checked here on every recurrence.
+        """
+        number, html_url = existing
+        try:
+            await self.client.request(
+                "POST",
+                f"{self.repo_path}/issues/{number}/comments",
+                json={"body": OCCURRENCE_COMMENT.format(
+                    trace_id=trace_id,
+                    langsmith_url=langsmith_url,
+                    diagnosis=diagnosis_result.diagnosis,
+                    confidence_score=diagnosis_result.confidence_score
+                )}
+            )
+        except GitHubAPIError as e:
+            if e.status_code in (404, 410):
+                logger.info(f"Issue #{number} no longer exists, filing a new one")
+                self.issue_index.remove(fingerprint)
+                return None
+            logger.error(f"GitHub API error commenting on #{number}: {str(e)}")
+            return html_url
+        except Exception as e:
+            logger.error(f"Error commenting on GitHub issue #{number}: {str(e)}")
+            return html_url
+
+        self.comments_added += 1
+        logger.info(f"Recorded occurrence on existing GitHub issue: {html_url}")
+        return html_url
+
+    async def _open_issue(
+        self,
+        title: str,
+        trace_id: str,
+        diagnosis_result: DiagnosisResult,
+        langsmith_url: str,
+        fingerprint: Optional[str]
+    ) -> Optional[str]:
         try:
             logger.info(f"Creating GitHub issue for trace: {trace_id}")
-            
+
             # Format the issue body
             body = ISSUE_TEMPLATE.format(
                 trace_id=trace_id,
@@ -84,18 +321,25 @@ class GitHubService:
                 suggested_fix=diagnosis_result.suggested_fix,
                 langsmith_url=langsmith_url
             )
-            
+            if fingerprint:
+                body += FINGERPRINT_MARKER.format(fingerprint=fingerprint) + "\n"
+
             # Create the issue
-            issue = self.repo.create_issue(
-                title=title,
-                body=body,
-                labels=["aha-generated", "bug", diagnosis_result.error_category]
+            labels = ["aha-generated", "bug", diagnosis_result.error_category]
+            await self.labels.ensure(labels)
+            issue = await self.client.request(
+                "POST",
+                f"{self.repo_path}/issues",
+                json={"title": title, "body": body, "labels": labels}
             )
-            
-            logger.info(f"Created GitHub issue: {issue.html_url}")
-            return issue.html_url
-            
-        except GithubException as e:
+
+            self.issues_created += 1
+            if fingerprint:
+                self.issue_index.put(fingerprint, issue["number"], issue["html_url"])
+            logger.info(f"Created GitHub issue: {issue['html_url']}")
+            return issue["html_url"]
+
+        except GitHubAPIError as e:
             logger.error(f"GitHub API error: {str(e)}")
             return None
         except Exception as e:
@@ -103,4 +347,10 @@ class GitHubService:
             return None
 
 # Global service instance
-github_service = GitHubService()
+github_service = services.register(
+    "github",
+    GitHubService,
+    warm_up=GitHubService.warm_up,
+    close=GitHubService.aclose,
+    critical=False  # incidents are still recorded and diagnosed without it
+)
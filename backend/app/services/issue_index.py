@@ -0,0 +1,98 @@
+"""
+Local index of open GitHub issues by incident fingerprint
+"""
+import logging
+import re
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Hidden marker embedded in issue bodies so the index can be rebuilt from GitHub
+FINGERPRINT_MARKER = "<!-- aha-fingerprint: {fingerprint} -->"
+_MARKER_PATTERN = re.compile(r"<!-- aha-fingerprint: ([0-9a-f]+) -->")
+
+def fingerprint_from_body(body: Optional[str]) -> Optional[str]:
+    """Fingerprint recorded in an AHA issue body, if any"""
+    match = _MARKER_PATTERN.search(body or "")
+    return match.group(1) if match else None
+
+class IssueIndex:
+    """
+    fingerprint -> (issue number, html_url), held in a dict and written
+    through to an optional SQLite file so it survives restarts. Misses fall
+    back to the file, which picks up issues filed by other processes.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self._entries: Dict[str, Tuple[int, str]] = {}
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        if path:
+            self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS issue_index "
+                "(fingerprint TEXT PRIMARY KEY, number INTEGER NOT NULL, "
+                "html_url TEXT NOT NULL, updated_at REAL NOT NULL)"
+            )
+            for fingerprint, number, html_url in self._conn.execute(
+                "SELECT fingerprint, number, html_url FROM issue_index"
+            ):
+                self._entries[fingerprint] = (number, html_url)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, fingerprint: str) -> Optional[Tuple[int, str]]:
+        """Open issue tracking `fingerprint` as (number, html_url)"""
+        entry = self._entries.get(fingerprint)
+        if entry is None and self._conn is not None:
+            with self._lock:
+                row = self._conn.execute(
+                    "SELECT number, html_url FROM issue_index WHERE fingerprint = ?", (fingerprint,)
+                ).fetchone()
+            if row:
+                entry = self._entries[fingerprint] = (row[0], row[1])
+        return entry
+
+    def put(self, fingerprint: str, number: int, html_url: str) -> None:
+        self._entries[fingerprint] = (number, html_url)
+        if self._conn is not None:
+            with self._lock:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO issue_index (fingerprint, number, html_url, updated_at) "
+                    "VALUES (?, ?, ?, ?)",
+                    (fingerprint, number, html_url, time.time())
+                )
+
+    def remove(self, fingerprint: str) -> None:
+        self._entries.pop(fingerprint, None)
+        if self._conn is not None:
+            with self._lock:
+                self._conn.execute("DELETE FROM issue_index WHERE fingerprint = ?", (fingerprint,))
+
+    def retain(self, fingerprints: Set[str], before: float) -> int:
+        """
+        Drop entries not in `fingerprints` that were written before
+        `before`, i.e. issues no longer open. Returns how many were dropped.
+        """
+        stale = [fingerprint for fingerprint in self._entries if fingerprint not in fingerprints]
+        for fingerprint in stale:
+            del self._entries[fingerprint]
+        if self._conn is None:
+            return len(stale)
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT fingerprint FROM issue_index WHERE updated_at < ?", (before,)
+            ).fetchall()
+            gone = [(row[0],) for row in rows if row[0] not in fingerprints]
+            self._conn.executemany("DELETE FROM issue_index WHERE fingerprint = ?", gone)
+        return len(set(stale) | {row[0] for row in gone})
+
+    def close(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
@@ -1,60 +1,139 @@
 """
 Service for interacting with LangSmith API
 """
+import asyncio
 import logging
-from typing import Optional, Dict, Any
-from langsmith import Client
+from datetime import datetime
+from typing import Optional, Dict, Any, List, AsyncIterator
+import httpx
 
 from app.core.config import settings
+from app.core.registry import services
 
 logger = logging.getLogger(__name__)
 
 class LangSmithService:
     """Service for LangSmith API interactions"""
-    
+
     def __init__(self):
-        self.client = Client(api_key=settings.langsmith_api_key)
-    
+        self._client: Optional[httpx.AsyncClient] = None
+        # Bounds how many traces are fetched at once across all incidents
+        self._fetch_semaphore = asyncio.Semaphore(settings.langsmith_max_concurrent_fetches)
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """Shared keep-alive HTTP client, created on first use"""
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=settings.langsmith_api_url,
+                headers={"x-api-key": settings.langsmith_api_key},
+                timeout=settings.langsmith_timeout_seconds,
+                limits=httpx.Limits(
+                    max_connections=settings.langsmith_max_connections,
+                    max_keepalive_connections=settings.langsmith_max_connections
+                )
+            )
+        return self._client
+
+    async def aclose(self) -> None:
+        """Close pooled connections"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def iter_run_pages(self, trace_id: str) -> AsyncIterator[List[Dict[str, Any]]]:
+        """
+        Stream the runs of a trace page by page using the runs query cursor
+        """
+        async for runs in self._query_runs({"trace": trace_id}):
+            yield runs
+
+    async def iter_project_runs(self, project_id: str, since: datetime) -> AsyncIterator[List[Dict[str, Any]]]:
+        """
+        Stream runs of a project that started at or after `since`, page by page
+        """
+        async for runs in self._query_runs({"session": [project_id], "start_time": since.isoformat()}):
+            yield runs
+
+    async def resolve_project_id(self, project_name: str) -> Optional[str]:
+        """Id of the tracing project (session) called `project_name`"""
+        response = await self.client.get("/sessions", params={"name": project_name, "limit": 1})
+        response.raise_for_status()
+        projects = response.json()
+        return str(projects[0]["id"]) if projects else None
+
+    async def _query_runs(self, query: Dict[str, Any]) -> AsyncIterator[List[Dict[str, Any]]]:
+        cursor = None
+        while True:
+            body: Dict[str, Any] = {**query, "limit": settings.langsmith_page_size}
+            if cursor:
+                body["cursor"] = cursor
+
+            response = await self.client.post("/runs/query", json=body)
+            response.raise_for_status()
+            payload = response.json()
+
+            runs = payload.get("runs") or []
+            if runs:
+                yield runs
+
+            cursor = (payload.get("cursors") or {}).get("next")
+            if not cursor or not runs:
+                break
+
     async def get_trace(self, trace_id: str) -> Optional[Dict[str, Any]]:
         """
         Fetch full trace data from LangSmith
         """
         try:
-            logger.info(f"Fetching trace data for: {trace_id}")
-            
-            # Get the run data from LangSmith
-            runs = list(self.client.list_runs(trace_id=trace_id))
-            
-            if not runs:
+            async with self._fetch_semaphore:
+                logger.info(f"Fetching trace data for: {trace_id}")
+
+                # Structure the trace data for analysis as pages arrive
+                trace_data = {
+                    "trace_id": trace_id,
+                    "runs": []
+                }
+                async for page in self.iter_run_pages(trace_id):
+                    trace_data["runs"].extend(self.format_run(run) for run in page)
+
+            if not trace_data["runs"]:
                 logger.warning(f"No runs found for trace: {trace_id}")
                 return None
-            
-            # Structure the trace data for analysis
-            trace_data = {
-                "trace_id": trace_id,
-                "runs": []
-            }
-            
-            for run in runs:
-                run_data = {
-                    "id": str(run.id),
-                    "name": run.name,
-                    "run_type": run.run_type,
-                    "inputs": run.inputs,
-                    "outputs": run.outputs,
-                    "error": run.error,
-                    "start_time": run.start_time.isoformat() if run.start_time else None,
-                    "end_time": run.end_time.isoformat() if run.end_time else None,
-                    "parent_run_id": str(run.parent_run_id) if run.parent_run_id else None
-                }
-                trace_data["runs"].append(run_data)
-            
-            logger.info(f"Successfully fetched trace data with {len(runs)} runs")
+
+            logger.info(f"Successfully fetched trace data with {len(trace_data['runs'])} runs")
             return trace_data
-            
+
         except Exception as e:
             logger.error(f"Error fetching trace {trace_id}: {str(e)}")
             return None
 
+    async def get_traces(self, trace_ids: List[str]) -> Dict[str, Optional[Dict[str, Any]]]:
+        """
+        Fetch several traces concurrently, bounded by the fetch semaphore
+        """
+        results = await asyncio.gather(*(self.get_trace(trace_id) for trace_id in trace_ids))
+        return dict(zip(trace_ids, results))
+
+    @staticmethod
+    def format_run(run: Dict[str, Any]) -> Dict[str, Any]:
+        """Reduce a raw run record to the fields used for analysis"""
+        return {
+            "id": str(run.get("id")),
+            "name": run.get("name"),
+            "run_type": run.get("run_type"),
+            "inputs": run.get("inputs"),
+            "outputs": run.get("outputs"),
+            "error": run.get("error"),
+            "start_time": run.get("start_time"),
+            "end_time": run.get("end_time"),
+            "parent_run_id": str(run["parent_run_id"]) if run.get("parent_run_id") else None
+        }
+
 # Global service instance
-langsmith_service = LangSmithService()
+langsmith_service = services.register(
+    "langsmith",
+    LangSmithService,
+    warm_up=lambda service: service.client,  # open the connection pool
+    close=LangSmithService.aclose
+)
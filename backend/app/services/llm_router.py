@@ -0,0 +1,537 @@
+"""
+Routing of diagnosis completions across LLM providers
+"""
+import asyncio
+import json
+import logging
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence
+
+import httpx
+
+from app.core.config import settings
+from app.core.metrics import llm_tokens, metrics
+from app.core.registry import services
+from app.core.tracing import tracer
+
+logger = logging.getLogger(__name__)
+
+TextCallback = Callable[[str], None]
+Validator = Callable[[str], bool]
+# JSON schema the reply must follow; providers answer with the JSON object as text
+Schema = Dict[str, Any]
+
+class LLMUnavailableError(Exception):
+    """Raised when no provider produced a usable completion"""
+
+class InvalidCompletionError(Exception):
+    """Raised for a completion the caller's validator rejected"""
+
+def record_usage(input_tokens: int, output_tokens: int) -> None:
+    llm_tokens.inc(input_tokens, direction="input")
+    llm_tokens.inc(output_tokens, direction="output")
+    tracer.annotate(input_tokens=input_tokens, output_tokens=output_tokens)
+
+class LLMProvider(ABC):
+    """
+    One completion backend; subclasses call a vendor API. Given a
+    `schema`, the provider should use whatever it has to make the reply a
+    single JSON object following it.
+    """
+
+    def __init__(self, name: str, max_concurrency: int):
+        self.name = name
+        self.max_concurrency = max_concurrency
+
+    @abstractmethod
+    async def complete(self, prompt: str, max_tokens: int, schema: Optional[Schema] = None) -> str:
+        """The whole completion as text"""
+
+    async def stream(self, prompt: str, max_tokens: int, on_text: TextCallback,
+                     schema: Optional[Schema] = None) -> str:
+        """Completion delivered through `on_text`; in one piece unless overridden"""
+        text = await self.complete(prompt, max_tokens, schema)
+        on_text(text)
+        return text
+
+    async def close(self) -> None:
+        pass
+
+class AnthropicProvider(LLMProvider):
+    """
+    Claude through the Anthropic SDK. A schema is sent as the input schema
+    of a tool the model is forced to call, and the tool input is returned
+    as JSON text.
+    """
+
+    TOOL_NAME = "submit_answer"
+
+    def __init__(self, client, model: str, max_concurrency: int, name: str = "anthropic"):
+        super().__init__(name, max_concurrency)
+        self.client = client
+        self.model = model
+
+    def _request(self, prompt: str, max_tokens: int, schema: Optional[Schema]) -> Dict[str, Any]:
+        request: Dict[str, Any] = {
+            "model": self.model,
+            "max_tokens": max_tokens,
+            "temperature": 0.1,
+            "messages": [{"role": "user", "content": prompt}]
+        }
+        if schema is not None:
+            request["tools"] = [{
+                "name": self.TOOL_NAME,
+                "description": "Submit the answer as structured data",
+                "input_schema": schema
+            }]
+            request["tool_choice"] = {"type": "tool", "name": self.TOOL_NAME}
+        return request
+
+    async def complete(self, prompt: str, max_tokens: int, schema: Optional[Schema] = None) -> str:
+        response = await self.client.messages.create(**self._request(prompt, max_tokens, schema))
+        usage = getattr(response, "usage", None)
+        if usage is not None:
+            record_usage(getattr(usage, "input_tokens", 0) or 0, getattr(usage, "output_tokens", 0) or 0)
+        for block in response.content:
+            if block.type == "tool_use":
+                return json.dumps(block.input)
+        return "".join(block.text for block in response.content if block.type == "text")
+
+    async def stream(self, prompt: str, max_tokens: int, on_text: TextCallback,
+                     schema: Optional[Schema] = None) -> str:
+        parts: List[str] = []
+        stream = await self.client.messages.create(**self._request(prompt, max_tokens, schema), stream=True)
+        async for event in stream:
+            if event.type == "content_block_delta":
+                # Tool input streams as partial JSON, plain replies as text
+                text = getattr(event.delta, "partial_json", None) or getattr(event.delta, "text", None)
+                if text:
+                    parts.append(text)
+                    on_text(text)
+            elif event.type == "message_start":
+                # Input tokens arrive up front; message_delta carries the final output count
+                usage = getattr(getattr(event, "message", None), "usage", None)
+                input_tokens = getattr(usage, "input_tokens", 0) or 0
+                llm_tokens.inc(input_tokens, direction="input")
+                tracer.annotate(input_tokens=input_tokens)
+            elif event.type == "message_delta":
+                usage = getattr(event, "usage", None)
+                output_tokens = getattr(usage, "output_tokens", 0) or 0
+                llm_tokens.inc(output_tokens, direction="output")
+                tracer.annotate(output_tokens=output_tokens)
+        return "".join(parts)
+
+class OpenAIProvider(LLMProvider):
+    """
+    OpenAI-compatible chat completions over plain HTTP. A schema turns on
+    JSON mode, which any compatible endpoint supports; the schema itself is
+    in the prompt.
+    """
+
+    def __init__(self, api_key: str, base_url: str, model: str, max_concurrency: int,
+                 timeout_seconds: float = 60.0, name: str = "openai"):
+        super().__init__(name, max_concurrency)
+        self.model = model
+        self.client = httpx.AsyncClient(
+            base_url=base_url,
+            headers={"Authorization": f"Bearer {api_key}"},
+            timeout=timeout_seconds
+        )
+
+    async def complete(self, prompt: str, max_tokens: int, schema: Optional[Schema] = None) -> str:
+        body = {
+            "model": self.model,
+            "max_tokens": max_tokens,
+            "temperature": 0.1,
+            "messages": [{"role": "user", "content": prompt}]
+        }
+        if schema is not None:
+            body["response_format"] = {"type": "json_object"}
+        response = await self.client.post("/chat/completions", json=body)
+        response.raise_for_status()
+        reply = response.json()
+        usage = reply.get("usage") or {}
+        record_usage(usage.get("prompt_tokens", 0), usage.get("completion_tokens", 0))
+        return reply["choices"][0]["message"]["content"]
+
+    async def close(self) -> None:
+        await self.client.aclose()
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failures. Once open, one
+    probe request is let through every `reset_seconds`; its success closes
+    the breaker again.
+    """
+
+    def __init__(self, failure_threshold: int, reset_seconds: float):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        return "half_open" if self._probe_due() or self._probing else "open"
+
+    def _probe_due(self) -> bool:
+        return (self.opened_at is not None and not self._probing
+                and time.monotonic() - self.opened_at >= self.reset_seconds)
+
+    def available(self) -> bool:
+        """Whether a request could be sent now, without claiming the probe"""
+        return self.opened_at is None or self._probe_due()
+
+    def acquire(self) -> bool:
+        """Claim the right to send a request"""
+        if self.opened_at is None:
+            return True
+        if self._probe_due():
+            self._probing = True
+            return True
+        return False
+
+    def release(self) -> None:
+        """The request was abandoned without an outcome"""
+        self._probing = False
+
+    def success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+
+    def failure(self) -> None:
+        self.failures += 1
+        if self._probing or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+        self._probing = False
+
+class Route:
+    """A provider plus what the router knows about it"""
+
+    def __init__(self, provider: LLMProvider, breaker: CircuitBreaker, ewma_alpha: float):
+        self.provider = provider
+        self.breaker = breaker
+        self.ewma_alpha = ewma_alpha
+        self.slots = asyncio.Semaphore(provider.max_concurrency)
+        self.ewma_seconds: Optional[float] = None
+        self.samples: deque = deque(maxlen=200)
+        self.first_token_samples: deque = deque(maxlen=200)
+        self.in_flight = 0
+        self.calls = 0
+        self.successes = 0
+        self.failures = 0
+        self.hedges_won = 0
+
+    @property
+    def name(self) -> str:
+        return self.provider.name
+
+    def observe(self, seconds: float) -> None:
+        self.samples.append(seconds)
+        if self.ewma_seconds is None:
+            self.ewma_seconds = seconds
+        else:
+            self.ewma_seconds += self.ewma_alpha * (seconds - self.ewma_seconds)
+
+    def observe_first_token(self, seconds: float) -> None:
+        self.first_token_samples.append(seconds)
+
+    @staticmethod
+    def _p95(samples: deque) -> Optional[float]:
+        if len(samples) < 20:
+            return None
+        ordered = sorted(samples)
+        return ordered[int(len(ordered) * 0.95) - 1]
+
+    def p95(self) -> Optional[float]:
+        return self._p95(self.samples)
+
+    def first_token_p95(self) -> Optional[float]:
+        return self._p95(self.first_token_samples)
+
+    def score(self) -> float:
+        """Expected latency, inflated by how busy the provider already is"""
+        return (self.ewma_seconds or 0.0) * (1 + self.in_flight / self.provider.max_concurrency)
+
+    def stats(self) -> Dict[str, object]:
+        p95, first_token_p95 = self.p95(), self.first_token_p95()
+        return {
+            "breaker": self.breaker.state,
+            "ewma_ms": round(self.ewma_seconds * 1000, 1) if self.ewma_seconds is not None else None,
+            "p95_ms": round(p95 * 1000, 1) if p95 is not None else None,
+            "first_token_p95_ms": round(first_token_p95 * 1000, 1) if first_token_p95 is not None else None,
+            "in_flight": self.in_flight,
+            "calls": self.calls,
+            "successes": self.successes,
+            "failures": self.failures,
+            "hedges_won": self.hedges_won
+        }
+
+class LLMRouter:
+    """
+    Sends each completion to the provider expected to answer fastest.
+
+    Providers are ranked by an EWMA of their latency, scaled up by their
+    share of busy slots. Untried providers rank first, so each one gets
+    measured. Each provider has its own concurrency limit and circuit
+    breaker, and a failed attempt fails over to the next provider.
+
+    With hedging, a request still running after the primary provider's p95
+    latency (at least `hedge_min_delay_seconds`) is also sent to the next
+    provider. The first valid answer wins and the other attempt is
+    cancelled. Streams are hedged on time to first token instead.
+    """
+
+    def __init__(self, providers: Sequence[LLMProvider], breaker_failures: int = 5,
+                 breaker_reset_seconds: float = 30.0, hedge_enabled: bool = False,
+                 hedge_min_delay_seconds: float = 2.0, ewma_alpha: float = 0.3):
+        self.routes = [
+            Route(provider, CircuitBreaker(breaker_failures, breaker_reset_seconds), ewma_alpha)
+            for provider in providers
+        ]
+        self.hedge_enabled = hedge_enabled
+        self.hedge_min_delay_seconds = hedge_min_delay_seconds
+        self.hedges = 0
+
+    @property
+    def providers(self) -> List[LLMProvider]:
+        return [route.provider for route in self.routes]
+
+    def ranked(self) -> List[Route]:
+        """Providers that may take a request now, best first"""
+        return sorted((r for r in self.routes if r.breaker.available()), key=Route.score)
+
+    def _hedge_delay(self, route: Route, first_token: bool = False) -> float:
+        p95 = route.first_token_p95() if first_token else route.p95()
+        return max(self.hedge_min_delay_seconds, p95 or 0.0)
+
+    async def _attempt(self, route: Route, call: Callable[[], Awaitable[str]],
+                       validate: Optional[Validator], hedge: bool) -> str:
+        if not route.breaker.acquire():
+            raise LLMUnavailableError(f"{route.name} circuit is open")
+        route.in_flight += 1
+        try:
+            with tracer.span("llm_attempt", provider=route.name, hedge=hedge):
+                async with route.slots:
+                    route.calls += 1
+                    started = time.perf_counter()
+                    # Only the provider's answer counts for or against it
+                    try:
+                        text = await call()
+                        if validate is not None and not validate(text):
+                            raise InvalidCompletionError(f"{route.name} returned an unusable completion")
+                    except Exception:
+                        route.failures += 1
+                        route.breaker.failure()
+                        raise
+                    route.successes += 1
+                    route.observe(time.perf_counter() - started)
+                    route.breaker.success()
+        except BaseException:
+            # Cancelled, or failed around the call: give back a claimed probe
+            route.breaker.release()
+            raise
+        finally:
+            route.in_flight -= 1
+        return text
+
+    async def complete(self, prompt: str, max_tokens: int = 1000,
+                       validate: Optional[Validator] = None, schema: Optional[Schema] = None) -> str:
+        """Completion from the first provider to return a valid one"""
+        remaining = self.ranked()
+        if not remaining:
+            raise LLMUnavailableError("No LLM provider available")
+        pending: Dict[asyncio.Task, Route] = {}
+        errors: List[str] = []
+        hedged = False
+
+        def launch(hedge: bool = False) -> None:
+            route = remaining.pop(0)
+            call = lambda: route.provider.complete(prompt, max_tokens, schema)
+            pending[asyncio.create_task(self._attempt(route, call, validate, hedge))] = route
+
+        launch()
+        try:
+            while pending:
+                timeout = None
+                if self.hedge_enabled and not hedged and remaining and len(pending) == 1:
+                    timeout = self._hedge_delay(next(iter(pending.values())))
+                done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    # The primary is slower than usual: race it against the next provider
+                    hedged = True
+                    self.hedges += 1
+                    launch(hedge=True)
+                    continue
+                for task in done:
+                    route = pending.pop(task)
+                    try:
+                        text = task.result()
+                    except Exception as e:
+                        errors.append(f"{route.name}: {e}")
+                        continue
+                    if hedged and pending:
+                        route.hedges_won += 1
+                    return text
+                if not pending and remaining:
+                    launch()
+        finally:
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+        raise LLMUnavailableError("; ".join(errors) or "No LLM provider available")
+
+    async def stream(self, prompt: str, on_text: TextCallback, max_tokens: int = 1000,
+                     schema: Optional[Schema] = None) -> str:
+        """
+        Streamed completion from the best provider. Only the first attempt
+        to emit text is forwarded to `on_text`, so streams never interleave.
+        With hedging, a stream that has emitted nothing after the provider's
+        p95 time to first token is raced against the next provider, and the
+        slower one is cancelled once the other emits. Fails over only while
+        nothing was emitted.
+        """
+        remaining = self.ranked()
+        if not remaining:
+            raise LLMUnavailableError("No LLM provider available")
+        pending: Dict[asyncio.Task, Route] = {}
+        errors: List[str] = []
+        winner: Optional[asyncio.Task] = None
+        first_text = asyncio.Event()
+        hedged = False
+
+        def launch(hedge: bool = False) -> None:
+            route = remaining.pop(0)
+            started = time.perf_counter()
+            task: Optional[asyncio.Task] = None
+
+            def forward(text: str) -> None:
+                nonlocal winner
+                if winner is None:
+                    winner = task
+                    route.observe_first_token(time.perf_counter() - started)
+                    first_text.set()
+                if winner is task:
+                    on_text(text)
+
+            call = lambda: route.provider.stream(prompt, max_tokens, forward, schema)
+            task = asyncio.create_task(self._attempt(route, call, None, hedge))
+            pending[task] = route
+
+        launch()
+        try:
+            while winner is None and pending:
+                timeout = None
+                if self.hedge_enabled and not hedged and remaining and len(pending) == 1:
+                    timeout = self._hedge_delay(next(iter(pending.values())), first_token=True)
+                emitted = asyncio.ensure_future(first_text.wait())
+                done, _ = await asyncio.wait({*pending, emitted}, timeout=timeout,
+                                             return_when=asyncio.FIRST_COMPLETED)
+                emitted.cancel()
+                if not done:
+                    # Nothing yet from the primary: race it against the next provider
+                    hedged = True
+                    self.hedges += 1
+                    launch(hedge=True)
+                    continue
+                for task in done & pending.keys():
+                    route = pending.pop(task)
+                    try:
+                        text = task.result()
+                    except Exception as e:
+                        if task is winner:
+                            raise
+                        errors.append(f"{route.name}: {e}")
+                        continue
+                    # A stream can finish without emitting anything
+                    if winner is None or task is winner:
+                        if hedged and pending:
+                            route.hedges_won += 1
+                        return text
+                if winner is None and not pending and remaining:
+                    launch()
+            if winner is None:
+                raise LLMUnavailableError("; ".join(errors) or "No LLM provider available")
+
+            # One stream is being forwarded; the others are no longer needed
+            losers = [task for task in pending if task is not winner]
+            if losers:
+                pending[winner].hedges_won += 1
+            for task in losers:
+                task.cancel()
+                del pending[task]
+            await asyncio.gather(*losers, return_exceptions=True)
+            return await winner
+        finally:
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+
+    async def close(self) -> None:
+        for provider in self.providers:
+            await provider.close()
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "hedging": self.hedge_enabled,
+            "hedges": self.hedges,
+            "providers": {route.name: route.stats() for route in self.routes}
+        }
+
+def create_router() -> LLMRouter:
+    """Router over the providers in `llm_providers` that have an API key"""
+    providers: List[LLMProvider] = []
+    for name in (n.strip().lower() for n in settings.llm_providers.split(",") if n.strip()):
+        if name == "anthropic":
+            if settings.anthropic_api_key:
+                # Imported here: the SDK takes over a second to import
+                import anthropic
+                client = anthropic.AsyncAnthropic(
+                    api_key=settings.anthropic_api_key,
+                    base_url=settings.anthropic_base_url
+                )
+                providers.append(AnthropicProvider(client, settings.anthropic_model,
+                                                   settings.anthropic_max_concurrency))
+        elif name == "openai":
+            if settings.openai_api_key:
+                providers.append(OpenAIProvider(settings.openai_api_key, settings.openai_base_url,
+                                                settings.openai_model, settings.openai_max_concurrency))
+        else:
+            raise ValueError(f"Unknown LLM provider: {name}")
+    return LLMRouter(
+        providers,
+        breaker_failures=settings.llm_breaker_failures,
+        breaker_reset_seconds=settings.llm_breaker_reset_seconds,
+        hedge_enabled=settings.llm_hedge_enabled,
+        hedge_min_delay_seconds=settings.llm_hedge_min_delay_seconds
+    )
+
+# Global router instance
+llm_router = services.register(
+    "llm_router",
+    create_router,
+    close=lambda router: router.close()
+)
+
+metrics.collected(
+    "aha_llm_provider_calls_total", "LLM attempts per provider by outcome", ["provider", "outcome"],
+    lambda: {
+        key: value
+        for route in llm_router.routes
+        for key, value in (((route.name, "ok"), route.successes),
+                           ((route.name, "failed"), route.failures))
+    },
+    kind="counter"
+)
+metrics.collected(
+    "aha_llm_provider_latency_seconds", "EWMA of successful LLM attempt latency per provider", ["provider"],
+    lambda: {(route.name,): route.ewma_seconds for route in llm_router.routes if route.ewma_seconds is not None}
+)
@@ -0,0 +1,223 @@
+"""
+Rule-based classification of well-known failures, ahead of the LLM
+"""
+import logging
+import re
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from app.core.config import settings
+from app.core.metrics import diagnosis_sources
+from app.core.registry import services
+from app.core.tracing import tracer
+from app.models.incident import DiagnosisResult
+from app.services.run_tree import RunTree
+
+logger = logging.getLogger(__name__)
+
+StructureCheck = Callable[[RunTree, int], bool]
+
+def fed_by_llm(tree: RunTree, i: int) -> bool:
+    """The run is an LLM call, or parses what an LLM call next to or below it returned"""
+    if tree.runs[i].get("run_type") == "llm":
+        return True
+    nearby = list(tree.children(i)) + [s for s in tree.siblings(i) if s < i]
+    return any(tree.runs[j].get("run_type") == "llm" for j in nearby)
+
+def retried(tree: RunTree, i: int) -> bool:
+    """Another run of the same name failed too, i.e. retries were exhausted"""
+    name = tree.runs[i].get("name")
+    return sum(1 for j in tree.failing_runs() if tree.runs[j].get("name") == name) > 1
+
+def ran_long(tree: RunTree, i: int) -> bool:
+    return tree.duration_ms[i] >= 30000
+
+def http_status(codes: str) -> str:
+    """Pattern for HTTP status `codes` written as one, not any bare number"""
+    return rf"(?i:\b(?:http(?:/[\d.]+)?|status(?:[ _]code)?|code))[\s:=]+(?:{codes})\b"
+
+@dataclass(frozen=True)
+class Rule:
+    """
+    A known failure: a regex over a run's error text and the diagnosis
+    to give when it matches. `diagnosis` may use {run} and {error}. When
+    `structure` holds for the failing run in the run tree, the confidence
+    rises by `structure_boost`.
+    """
+    name: str
+    category: str
+    pattern: str
+    confidence: float
+    diagnosis: str
+    root_cause: str
+    suggested_fix: str
+    structure: Optional[StructureCheck] = None
+    structure_boost: float = 0.05
+
+DEFAULT_RULES: Tuple[Rule, ...] = (
+    Rule(
+        name="json_decode",
+        category="parsing_error",
+        pattern=r"JSONDecodeError|Expecting (?:',' delimiter|value|property name)|Unterminated string|Extra data: line",
+        confidence=0.85,
+        diagnosis="{run} could not parse model output as JSON: {error}",
+        root_cause="The model returned text that is not valid JSON (prose around it, trailing commas "
+                   "or truncated output), and it was parsed without validation or repair.",
+        suggested_fix="Constrain the model to JSON (tool call or response schema), strip code fences "
+                      "before parsing, and retry the call once with the parse error on failure.",
+        structure=fed_by_llm
+    ),
+    Rule(
+        name="output_validation",
+        category="parsing_error",
+        pattern=r"OutputParserException|ValidationError|validation errors? for \w+",
+        confidence=0.8,
+        diagnosis="{run} received output that does not match the expected schema: {error}",
+        root_cause="The model's output parsed but is missing fields or has wrong types for the schema "
+                   "the next step expects.",
+        suggested_fix="Put the schema in the prompt or a tool definition, and re-ask with the "
+                      "validation errors instead of failing the run.",
+        structure=fed_by_llm
+    ),
+    Rule(
+        name="rate_limit",
+        category="api_failure",
+        pattern=http_status("429") + r"|RateLimitError|rate[ _-]?limit|[Tt]oo [Mm]any [Rr]equests|overloaded_error",
+        confidence=0.85,
+        diagnosis="{run} was rate limited by an upstream API: {error}",
+        root_cause="Requests exceeded the provider's rate or concurrency limit.",
+        suggested_fix="Retry with exponential backoff and jitter honoring Retry-After, and cap "
+                      "concurrent calls to the provider.",
+        structure=retried
+    ),
+    Rule(
+        name="auth",
+        category="api_failure",
+        pattern=http_status("401") + r"|AuthenticationError|PermissionDeniedError|[Ii]nvalid (?:x-)?api[ _-]?key|Incorrect API key",
+        confidence=0.9,
+        diagnosis="{run} was refused by an upstream API for its credentials: {error}",
+        root_cause="The API key or token is missing, invalid, expired or lacks permission.",
+        suggested_fix="Check the credential the agent is configured with and its scopes; fail fast "
+                      "at startup when it is missing."
+    ),
+    Rule(
+        name="context_length",
+        category="context_limit",
+        pattern=r"context[ _]length|maximum context|prompt is too long|too many tokens",
+        confidence=0.85,
+        diagnosis="{run} sent a prompt larger than the model's context window: {error}",
+        root_cause="Accumulated context (history, retrieved documents or tool output) pushed the "
+                   "prompt past the model's limit.",
+        suggested_fix="Budget prompt tokens: truncate or summarize history and tool output before "
+                      "the call."
+    ),
+    Rule(
+        name="timeout",
+        category="timeout",
+        pattern=r"TimeoutError|Timeout\b|ReadTimeout|ConnectTimeout|[Tt]imed? ?out|[Dd]eadline exceeded",
+        confidence=0.8,
+        diagnosis="{run} timed out: {error}",
+        root_cause="A call took longer than its timeout allows, usually a slow upstream or an "
+                   "oversized request.",
+        suggested_fix="Raise the timeout for this call or shrink the work per call, and retry "
+                      "idempotent calls with backoff.",
+        structure=ran_long
+    ),
+    Rule(
+        name="upstream_unavailable",
+        category="api_failure",
+        pattern=r"ConnectionError|ConnectError|Connection (?:refused|reset)|" + http_status("50[234]") + r"|Service Unavailable|Bad Gateway",
+        confidence=0.75,
+        diagnosis="{run} could not reach an upstream service: {error}",
+        root_cause="The upstream service was down, overloaded or unreachable.",
+        suggested_fix="Retry with backoff and surface a degraded result instead of failing the run.",
+        structure=retried
+    ),
+)
+
+class RuleClassifier:
+    """
+    Diagnoses failures that are recognizable from their error text.
+
+    All rule patterns are compiled once, and their union is tried first, so
+    a trace with no known error costs one regex scan per failing run. On a
+    hit the run tree finds the root-cause runs (failing runs with no failure
+    below them). Every root cause has to match the same rule, and the
+    confidence has to reach `min_confidence`, else the incident goes to the
+    LLM.
+    """
+
+    def __init__(self, rules: Sequence[Rule], min_confidence: float):
+        self.rules = list(rules)
+        self.min_confidence = min_confidence
+        self._patterns = [re.compile(rule.pattern) for rule in self.rules]
+        self._any = re.compile("|".join(f"(?:{rule.pattern})" for rule in self.rules))
+        self.classified = 0
+        self.escalated = 0
+
+    def match(self, text: str) -> Optional[Rule]:
+        """First rule matching `text`, in priority order"""
+        if not self._any.search(text):
+            return None
+        for rule, pattern in zip(self.rules, self._patterns):
+            if pattern.search(text):
+                return rule
+        return None
+
+    def classify(self, trace_data: Dict[str, Any]) -> Optional[DiagnosisResult]:
+        """
+        A diagnosis for a known failure, or None to escalate to the LLM.
+        Only each run's own error is matched; the webhook's error type says
+        nothing about which run it came from.
+        """
+        result, outcome = self._classify(trace_data)
+        tracer.annotate(outcome=outcome)
+        if result is None:
+            self.escalated += 1
+            return None
+        self.classified += 1
+        diagnosis_sources.inc(source="rules")
+        return result
+
+    def _classify(self, trace_data: Dict[str, Any]) -> Tuple[Optional[DiagnosisResult], str]:
+        runs: List[Dict[str, Any]] = trace_data.get("runs", [])
+        if not any(run.get("error") and self._any.search(str(run["error"])) for run in runs):
+            return None, "unknown"
+
+        tree = RunTree(runs)
+        chosen: Optional[Tuple[Rule, int]] = None
+        for cause in tree.root_causes():
+            rule = self.match(str(runs[cause]["error"]))
+            if rule is None:
+                return None, "unknown_cause"
+            if chosen is not None and chosen[0] is not rule:
+                return None, "mixed_causes"
+            chosen = chosen or (rule, cause)
+        if chosen is None:
+            return None, "unknown"
+
+        rule, cause = chosen
+        confidence = rule.confidence
+        if rule.structure is not None and rule.structure(tree, cause):
+            confidence += rule.structure_boost
+        if confidence < self.min_confidence:
+            return None, "low_confidence"
+
+        run = runs[cause]
+        error = str(run["error"]).strip().splitlines()[0][:200]
+        return DiagnosisResult(
+            diagnosis=rule.diagnosis.format(run=run.get("name") or "A run", error=error),
+            confidence_score=round(min(1.0, confidence), 2),
+            suggested_fix=rule.suggested_fix,
+            error_category=rule.category,
+            root_cause=rule.root_cause
+        ), rule.name
+
+    def stats(self) -> Dict[str, Any]:
+        return {"rules": len(self.rules), "classified": self.classified, "escalated": self.escalated}
+
+# Global classifier instance
+rule_classifier = services.register(
+    "rule_classifier",
+    lambda: RuleClassifier(DEFAULT_RULES, min_confidence=settings.diagnosis_rules_min_confidence)
+)
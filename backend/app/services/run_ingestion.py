@@ -0,0 +1,195 @@
+"""
+Incremental ingestion of LangSmith project runs into a local trace cache
+"""
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, Optional
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.core.registry import services
+from app.services.langsmith_service import LangSmithService, langsmith_service
+from app.services.run_tree import parse_run_time
+
+logger = logging.getLogger(__name__)
+
+class RunCache:
+    """
+    Runs grouped by trace_id, assembled as they are ingested.
+
+    Holds at most `max_traces` traces, least recently touched evicted
+    first, each for at most `ttl_seconds` after its last update. A later
+    copy of a run (e.g. once it has ended) replaces the earlier one.
+    """
+
+    def __init__(self, max_traces: int, ttl_seconds: float):
+        self.max_traces = max_traces
+        self.ttl_seconds = ttl_seconds
+        # trace_id -> (updated_at, run_id -> formatted run)
+        self._traces: "OrderedDict[str, tuple]" = OrderedDict()
+        self.runs_added = 0
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._traces)
+
+    def add_runs(self, runs: Iterable[Dict[str, Any]]) -> int:
+        """Store raw LangSmith runs; returns how many were added or updated"""
+        now = time.monotonic()
+        added = 0
+        for raw in runs:
+            trace_id = raw.get("trace_id")
+            if not trace_id or not raw.get("id"):
+                continue
+            trace_id = str(trace_id)
+            entry = self._traces.get(trace_id)
+            if entry is None:
+                entry = (now, {})
+            else:
+                self._traces.move_to_end(trace_id)
+            run = LangSmithService.format_run(raw)
+            entry[1][run["id"]] = run
+            self._traces[trace_id] = (now, entry[1])
+            added += 1
+        while len(self._traces) > self.max_traces:
+            self._traces.popitem(last=False)
+        self.runs_added += added
+        return added
+
+    def get_trace(self, trace_id: str, failing_run_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        The cached trace in get_trace() form, or None if it is missing,
+        expired, or has not yet seen `failing_run_id` end with its error
+        """
+        entry = self._traces.get(trace_id)
+        if entry is not None and time.monotonic() - entry[0] > self.ttl_seconds:
+            del self._traces[trace_id]
+            entry = None
+        runs = entry[1] if entry is not None else None
+        if not runs or (failing_run_id and not (runs.get(failing_run_id) or {}).get("error")):
+            self.misses += 1
+            return None
+        self.hits += 1
+        ordered = sorted(runs.values(), key=lambda run: str(run.get("start_time") or ""))
+        return {"trace_id": trace_id, "runs": ordered}
+
+    def clear(self) -> None:
+        self._traces.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {"traces": len(self._traces), "runs_added": self.runs_added, "hits": self.hits, "misses": self.misses}
+
+class RunIngestor:
+    """
+    Polls the configured LangSmith project for runs started since the last
+    poll and feeds them to the run cache, so a trace is usually assembled
+    before its error webhook arrives.
+
+    Each poll reaches back `lookback_seconds` before the newest start time
+    seen, so runs that were still in progress are picked up again once
+    they finish.
+    """
+
+    def __init__(self, langsmith: LangSmithService, cache: RunCache, project_name: str,
+                 poll_seconds: float, lookback_seconds: float):
+        self.langsmith = langsmith
+        self.cache = cache
+        self.project_name = project_name
+        self.poll_seconds = poll_seconds
+        self.lookback_seconds = lookback_seconds
+        self.project_id: Optional[str] = None
+        self.cursor: Optional[datetime] = None
+        self.polls = 0
+        self.errors = 0
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        if self._task is None:
+            self.cursor = datetime.utcnow()
+            self._task = asyncio.create_task(self._run())
+            logger.info(f"Ingesting runs of LangSmith project {self.project_name} "
+                        f"every {self.poll_seconds}s")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.poll_once()
+            except Exception as e:
+                self.errors += 1
+                logger.warning(f"Run ingestion poll failed: {e}")
+            await asyncio.sleep(self.poll_seconds)
+
+    async def poll_once(self) -> int:
+        """Pull runs started since the cursor; returns how many were cached"""
+        if self.project_id is None:
+            self.project_id = await self.langsmith.resolve_project_id(self.project_name)
+            if self.project_id is None:
+                raise RuntimeError(f"LangSmith project {self.project_name} not found")
+
+        since = (self.cursor or datetime.utcnow()) - timedelta(seconds=self.lookback_seconds)
+        newest = self.cursor
+        ingested = 0
+        async for page in self.langsmith.iter_project_runs(self.project_id, since):
+            ingested += self.cache.add_runs(page)
+            for run in page:
+                started = parse_run_time(run.get("start_time"))
+                if started is not None and (newest is None or started > newest):
+                    newest = started
+        self.cursor = newest
+        self.polls += 1
+        return ingested
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self._task is not None,
+            "polls": self.polls,
+            "errors": self.errors,
+            "cursor": self.cursor.isoformat() if self.cursor else None,
+            "cache": self.cache.stats()
+        }
+
+async def _start_if_enabled(ingestor: RunIngestor) -> None:
+    if settings.langsmith_ingest_enabled and settings.langsmith_ingest_poll:
+        await ingestor.start()
+
+# Global cache and ingestor instances
+run_cache = services.register(
+    "run_cache",
+    lambda: RunCache(
+        max_traces=settings.langsmith_run_cache_traces,
+        ttl_seconds=settings.langsmith_run_cache_ttl_seconds
+    )
+)
+
+run_ingestor = services.register(
+    "run_ingestor",
+    lambda: RunIngestor(
+        langsmith=langsmith_service,
+        cache=run_cache,
+        project_name=settings.langsmith_project,
+        poll_seconds=settings.langsmith_ingest_poll_seconds,
+        lookback_seconds=settings.langsmith_ingest_lookback_seconds
+    ),
+    warm_up=_start_if_enabled,
+    close=lambda ingestor: ingestor.stop(),
+    critical=False
+)
+
+metrics.collected(
+    "aha_run_cache_lookups_total", "Trace lookups in the ingested run cache by result", ["result"],
+    lambda: {(result,): run_cache.stats()[result] for result in ("hits", "misses")},
+    kind="counter"
+)
@@ -0,0 +1,224 @@
+"""
+Indexed call tree of a trace's runs
+"""
+from array import array
+from datetime import datetime, timezone
+from functools import cached_property
+from typing import Any, Dict, Iterator, List, Optional
+
+NO_RUN = -1
+
+def parse_run_time(value: Any) -> Optional[datetime]:
+    """Run timestamps as naive UTC; LangSmith sends ISO strings, sometimes with Z"""
+    if isinstance(value, datetime):
+        parsed = value
+    elif isinstance(value, str) and value:
+        try:
+            parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            return None
+    else:
+        return None
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+class RunTree:
+    """
+    The runs of one trace as a tree, built once in O(n).
+
+    Runs keep their position in the trace's run list. Everything else is
+    held in parallel arrays indexed by that position: parent, depth,
+    error flag, duration and the preorder interval of each subtree.
+    Children are stored contiguously (CSR), so parent, children, siblings
+    and is-ancestor lookups never rescan the run list. Runs whose parent is
+    not in the trace become roots. A parent cycle, which LangSmith should
+    never produce, is broken by making one of its runs a root.
+    """
+
+    def __init__(self, runs: List[Dict[str, Any]]):
+        n = len(runs)
+        self.runs = runs
+        self.index: Dict[str, int] = {}
+        for i, run in enumerate(runs):
+            run_id = run.get("id")
+            if run_id and run_id not in self.index:
+                self.index[str(run_id)] = i
+
+        self.parent = array("i", [NO_RUN]) * n
+        for i, run in enumerate(runs):
+            parent_id = run.get("parent_run_id")
+            if parent_id:
+                self.parent[i] = self.index.get(str(parent_id), NO_RUN)
+
+        self.has_error = bytearray(1 if run.get("error") else 0 for run in runs)
+        self._link_children()
+        self._walk()
+
+    @cached_property
+    def duration_ms(self) -> array:
+        """Parsed on first use; timestamps are the costly part of a build"""
+        return array("d", (self._duration_ms(run) for run in self.runs))
+
+    @staticmethod
+    def _duration_ms(run: Dict[str, Any]) -> float:
+        """Wall time of a run, or -1 when it has not ended"""
+        start, end = parse_run_time(run.get("start_time")), parse_run_time(run.get("end_time"))
+        if start is None or end is None:
+            return -1.0
+        return max(0.0, (end - start).total_seconds() * 1000)
+
+    def _link_children(self) -> None:
+        n = len(self.runs)
+        self.child_start = array("i", [0]) * (n + 1)
+        for p in self.parent:
+            if p != NO_RUN:
+                self.child_start[p + 1] += 1
+        for i in range(n):
+            self.child_start[i + 1] += self.child_start[i]
+        self.child_list = array("i", [0]) * self.child_start[n]
+        fill = self.child_start[:n]
+        for i, p in enumerate(self.parent):
+            if p != NO_RUN:
+                self.child_list[fill[p]] = i
+                fill[p] += 1
+
+    def _walk(self) -> None:
+        """Depth, preorder interval and error count of every subtree"""
+        n = len(self.runs)
+        self.depth = array("i", [0]) * n
+        self.enter = array("i", [NO_RUN]) * n
+        self.exit = array("i", [0]) * n
+        self.errors_below = array("i", list(self.has_error))
+        self.preorder = array("i")
+        self.roots = [i for i in range(n) if self.parent[i] == NO_RUN]
+
+        for root in self.roots:
+            self._visit(root)
+        for i in range(n):
+            if self.enter[i] == NO_RUN:
+                # Unreachable from every root, so it is in or below a parent cycle
+                cut = self._cycle_member(i)
+                self.parent[cut] = NO_RUN
+                self.roots.append(cut)
+                self._visit(cut)
+
+        for i in reversed(self.preorder):
+            p = self.parent[i]
+            if p != NO_RUN:
+                self.errors_below[p] += self.errors_below[i]
+
+    def _cycle_member(self, start: int) -> int:
+        """First run seen twice when following parents up from `start`"""
+        seen = set()
+        i = start
+        while i not in seen:
+            seen.add(i)
+            i = self.parent[i]
+        return i
+
+    def _visit(self, start: int) -> None:
+        self.depth[start] = 0 if self.parent[start] == NO_RUN else self.depth[self.parent[start]] + 1
+        stack = [start]
+        while stack:
+            i = stack.pop()
+            if i < 0:
+                self.exit[~i] = len(self.preorder)
+                continue
+            self.enter[i] = len(self.preorder)
+            self.preorder.append(i)
+            stack.append(~i)
+            for c in reversed(self.children(i)):
+                if self.enter[c] == NO_RUN and self.parent[c] == i:
+                    self.depth[c] = self.depth[i] + 1
+                    stack.append(c)
+
+    def __len__(self) -> int:
+        return len(self.runs)
+
+    def index_of(self, run_id: str) -> Optional[int]:
+        return self.index.get(run_id)
+
+    def children(self, i: int) -> array:
+        return self.child_list[self.child_start[i]:self.child_start[i + 1]]
+
+    def siblings(self, i: int) -> List[int]:
+        """Other runs with the same parent; other roots for a root"""
+        p = self.parent[i]
+        peers = self.roots if p == NO_RUN else self.children(p)
+        return [s for s in peers if s != i and self.parent[s] == p]
+
+    def ancestors(self, i: int) -> Iterator[int]:
+        """Parent, grandparent, ... up to the root"""
+        i = self.parent[i]
+        while i != NO_RUN:
+            yield i
+            i = self.parent[i]
+
+    def path_to(self, i: int) -> List[int]:
+        """Runs from the root down to `i`"""
+        path = [i, *self.ancestors(i)]
+        path.reverse()
+        return path
+
+    def is_ancestor(self, a: int, b: int) -> bool:
+        """Whether `a` is `b` or above it"""
+        return self.enter[a] <= self.enter[b] < self.exit[a]
+
+    def subtree_size(self, i: int) -> int:
+        return self.exit[i] - self.enter[i]
+
+    def failing_runs(self) -> List[int]:
+        return [i for i in range(len(self.runs)) if self.has_error[i]]
+
+    def root_causes(self) -> List[int]:
+        """Runs that errored without any run below them erroring, in trace order"""
+        return [i for i in range(len(self.runs)) if self.has_error[i] and self.errors_below[i] == 1]
+
+    def failing_path(self) -> List[int]:
+        """Root down to the first root cause; empty when nothing failed"""
+        causes = self.root_causes()
+        return self.path_to(causes[0]) if causes else []
+
+    def slowest_path(self, start: Optional[int] = None) -> List[int]:
+        """
+        From `start` (by default the slowest root), keep descending into the
+        slowest child: the chain of subtrees that dominates the wall time
+        """
+        if not self.runs:
+            return []
+        if start is None:
+            start = max(self.roots, key=lambda r: self.duration_ms[r])
+        path = [start]
+        while True:
+            kids = [c for c in self.children(path[-1]) if self.parent[c] == path[-1]]
+            if not kids:
+                return path
+            path.append(max(kids, key=lambda c: self.duration_ms[c]))
+
+    def describe(self, i: int) -> Dict[str, Any]:
+        """A run's place in the tree, for API responses"""
+        run = self.runs[i]
+        return {
+            "id": run.get("id"),
+            "name": run.get("name"),
+            "run_type": run.get("run_type"),
+            "depth": self.depth[i],
+            "duration_ms": round(self.duration_ms[i], 3) if self.duration_ms[i] >= 0 else None,
+            "error": run.get("error"),
+            "children": self.child_start[i + 1] - self.child_start[i],
+            "subtree_size": self.subtree_size(i)
+        }
+
+    def summary(self) -> Dict[str, Any]:
+        """Shape of the trace with its failing and slowest paths"""
+        failing = self.failing_path()
+        return {
+            "runs": len(self.runs),
+            "roots": len(self.roots),
+            "max_depth": max(self.depth, default=0),
+            "failing_runs": sum(self.has_error),
+            "failing_path": [self.describe(i) for i in failing],
+            "failing_siblings": [self.describe(i) for i in self.siblings(failing[-1])] if failing else [],
+            "slowest_path": [self.describe(i) for i in self.slowest_path()]
+        }
@@ -0,0 +1,124 @@
+"""
+Local vector index of past diagnoses for near-duplicate lookup
+"""
+import logging
+import threading
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+from app.core.fingerprint import normalize_error_text
+from app.core.registry import services
+from app.models.incident import DiagnosisResult
+
+logger = logging.getLogger(__name__)
+
+class HashedNgramVectorizer:
+    """Character n-grams hashed into a fixed number of buckets"""
+
+    def __init__(self, dimensions: int, ngram_range: Tuple[int, int] = (3, 5)):
+        self.dimensions = dimensions
+        self.ngram_range = ngram_range
+
+    def transform(self, text: str) -> np.ndarray:
+        """Sublinear term-frequency vector of `text`"""
+        text = f" {normalize_error_text(text).lower()} "
+        buckets: List[int] = []
+        low, high = self.ngram_range
+        for n in range(low, high + 1):
+            buckets.extend(
+                zlib.crc32(text[i:i + n].encode()) % self.dimensions
+                for i in range(len(text) - n + 1)
+            )
+        counts = np.bincount(np.asarray(buckets, dtype=np.int64), minlength=self.dimensions)
+        return np.log1p(counts.astype(np.float32))
+
+class SimilarityIndex:
+    """
+    TF-IDF over hashed n-grams with cosine similarity, held in a
+    preallocated NumPy matrix. Oldest entries are overwritten once
+    `max_entries` is reached.
+
+    Rows hold raw term frequencies because IDF shifts as entries are added;
+    keeping their element-wise squares alongside lets a query weight both
+    the dot products and the row norms with two mat-vec products instead
+    of materializing a weighted copy of the matrix.
+    """
+
+    def __init__(self, dimensions: int, max_entries: int):
+        self.vectorizer = HashedNgramVectorizer(dimensions)
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._matrix = np.zeros((min(max_entries, 256), dimensions), dtype=np.float32)
+        self._squared = np.zeros_like(self._matrix)
+        self._doc_freq = np.zeros(dimensions, dtype=np.float32)
+        self._entries: List[Tuple[str, DiagnosisResult]] = []
+        self._next_slot = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add(self, incident_id: str, text: str, result: DiagnosisResult) -> None:
+        """Index a diagnosed incident"""
+        vector = self.vectorizer.transform(text)
+        with self._lock:
+            slot = self._next_slot
+            if slot < len(self._entries):
+                # Ring buffer is full: forget the entry being overwritten
+                self._doc_freq -= self._matrix[slot] > 0
+                self._entries[slot] = (incident_id, result)
+            else:
+                if slot >= len(self._matrix):
+                    grown = min(len(self._matrix) * 2, self.max_entries)
+                    self._matrix = np.resize(self._matrix, (grown, self._matrix.shape[1]))
+                    self._squared = np.resize(self._squared, self._matrix.shape)
+                    self._matrix[slot:] = 0
+                    self._squared[slot:] = 0
+                self._entries.append((incident_id, result))
+            self._matrix[slot] = vector
+            self._squared[slot] = vector * vector
+            self._doc_freq += vector > 0
+            self._next_slot = (slot + 1) % self.max_entries
+
+    def query(self, text: str) -> Optional[Tuple[str, DiagnosisResult, float]]:
+        """Most similar indexed incident as (incident_id, result, score)"""
+        with self._lock:
+            count = len(self._entries)
+            if count == 0:
+                return None
+            idf = np.log((1 + count) / (1 + self._doc_freq)) + 1.0
+            idf_squared = idf * idf
+            query = self.vectorizer.transform(text)
+
+            dots = self._matrix[:count] @ (query * idf_squared)
+            norms = np.sqrt(self._squared[:count] @ idf_squared) * np.linalg.norm(query * idf)
+            scores = np.divide(
+                dots, norms,
+                out=np.zeros(count, dtype=np.float32), where=norms > 0
+            )
+            best = int(np.argmax(scores))
+            incident_id, result = self._entries[best]
+            return incident_id, result, float(scores[best])
+
+    def clear(self) -> None:
+        """Drop all entries"""
+        with self._lock:
+            self._matrix[:] = 0
+            self._squared[:] = 0
+            self._doc_freq[:] = 0
+            self._entries.clear()
+            self._next_slot = 0
+
+    def stats(self) -> Dict[str, int]:
+        return {"entries": len(self._entries), "dimensions": self.vectorizer.dimensions}
+
+# Global index instance
+similarity_index = services.register(
+    "similarity_index",
+    lambda: SimilarityIndex(
+        dimensions=settings.similarity_dimensions,
+        max_entries=settings.similarity_max_entries
+    )
+)
@@ -0,0 +1,174 @@
+"""
+Token-budgeted compaction of traces before LLM diagnosis
+"""
+import io
+import logging
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.core.registry import services
+from app.services.run_tree import NO_RUN, RunTree
+
+logger = logging.getLogger(__name__)
+
+# Rough characters-per-token ratio for English text and JSON-ish payloads
+CHARS_PER_TOKEN = 4
+
+OMITTED_PAYLOADS = "Inputs/Outputs: [omitted]\n"
+
+# Relevance ranks, most relevant first
+ERROR_RUN = 0
+ANCESTOR_RUN = 1
+SIBLING_RUN = 2
+OTHER_RUN = 3
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate; good enough for budgeting"""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+@dataclass
+class CompactTrace:
+    """
+    Prompt-ready trace text plus what compaction dropped. Runs dropped
+    once the budget was spent are sized without their payloads, so
+    `tokens_original` is a lower bound.
+    """
+    text: str
+    tokens_used: int
+    tokens_original: int
+    runs_included: int
+    runs_omitted: int
+
+    @property
+    def tokens_saved(self) -> int:
+        return max(0, self.tokens_original - self.tokens_used)
+
+class TraceCompactor:
+    """
+    Renders a trace for the diagnosis prompt within `token_budget`.
+
+    Runs are ranked by relevance to the failure: runs with an error, then
+    their ancestors in the run tree, then immediate siblings, then
+    everything else. They are added in that order while the budget lasts
+    and written out in original order, each payload cut to at most
+    `payload_token_limit`. Error runs are always kept. Payloads of runs
+    that no longer fit are never stringified, so the work done scales with
+    the failure rather than with the size of the trace.
+    """
+
+    def __init__(self, token_budget: int, payload_token_limit: int):
+        self.token_budget = token_budget
+        self.payload_token_limit = payload_token_limit
+        self.traces_compacted = 0
+        self.tokens_saved = 0
+
+    def compact(self, trace_data: Dict[str, Any]) -> CompactTrace:
+        """Compact `trace_data` into prompt text"""
+        runs: List[Dict[str, Any]] = trace_data.get('runs', [])
+        header = f"Trace ID: {trace_data.get('trace_id', 'unknown')}\n\n"
+        ranks = self._rank_runs(RunTree(runs))
+
+        remaining = self.token_budget - estimate_tokens(header)
+        blocks: Dict[int, str] = {}
+        original_chars = len(header)
+        for index in sorted(range(len(runs)), key=lambda i: (ranks[i], i)):
+            run = runs[index]
+            shape = self._render_run(index, run, None)
+            shape_cost = estimate_tokens(shape)
+            original_chars += len(shape) - len(OMITTED_PAYLOADS)
+            if shape_cost > remaining and ranks[index] != ERROR_RUN:
+                continue
+            payloads = (str(run.get('inputs', {})), str(run.get('outputs', {})))
+            original_chars += len(f"Inputs: {payloads[0]}\nOutputs: {payloads[1]}\n")
+            block = self._render_run(index, run, payloads)
+            cost = estimate_tokens(block)
+            if cost > remaining:
+                # Keep the run's shape without its payloads
+                block, cost = shape, shape_cost
+            blocks[index] = block
+            remaining -= cost
+
+        out = io.StringIO()
+        out.write(header)
+        for index in sorted(blocks):
+            out.write(blocks[index])
+        omitted = len(runs) - len(blocks)
+        if omitted:
+            out.write(f"[{omitted} less relevant runs omitted to fit the token budget]\n")
+        text = out.getvalue()
+
+        result = CompactTrace(
+            text=text,
+            tokens_used=estimate_tokens(text),
+            tokens_original=(original_chars + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN,
+            runs_included=len(blocks),
+            runs_omitted=omitted
+        )
+        self.traces_compacted += 1
+        self.tokens_saved += result.tokens_saved
+        return result
+
+    @staticmethod
+    def _rank_runs(tree: RunTree) -> List[int]:
+        """Relevance rank of each run, parallel to the trace's runs"""
+        ranks = [OTHER_RUN] * len(tree)
+        failing = tree.failing_runs()
+        for i in failing:
+            ranks[i] = ERROR_RUN
+        for i in failing:
+            for ancestor in tree.ancestors(i):
+                if ranks[ancestor] != OTHER_RUN:
+                    break  # already marked, or failing itself and walked from there
+                ranks[ancestor] = ANCESTOR_RUN
+
+        for parent in {tree.parent[i] for i in failing}:
+            for sibling in tree.roots if parent == NO_RUN else tree.children(parent):
+                if ranks[sibling] == OTHER_RUN:
+                    ranks[sibling] = SIBLING_RUN
+        return ranks
+
+    @staticmethod
+    def _truncate(text: str, token_limit: int) -> str:
+        """Keep the head and tail of `text`, which is where errors and keys usually sit"""
+        max_chars = token_limit * CHARS_PER_TOKEN
+        if len(text) <= max_chars:
+            return text
+        keep = max_chars // 2
+        return f"{text[:keep]} ...[{len(text) - 2 * keep} chars truncated]... {text[-keep:]}"
+
+    def _render_run(self, index: int, run: Dict[str, Any], payloads: Optional[Tuple[str, str]]) -> str:
+        """Block for one run, with its stringified (inputs, outputs) or without payloads"""
+        parts = [
+            f"=== RUN {index + 1}: {run.get('name', 'Unknown')} ===\n",
+            f"Type: {run.get('run_type', 'unknown')}\n"
+        ]
+        if payloads is None:
+            parts.append(OMITTED_PAYLOADS)
+        else:
+            parts.append(f"Inputs: {self._truncate(payloads[0], self.payload_token_limit)}\n")
+            parts.append(f"Outputs: {self._truncate(payloads[1], self.payload_token_limit)}\n")
+        if run.get('error'):
+            parts.append(f"ERROR: {self._truncate(str(run['error']), self.payload_token_limit)}\n")
+        parts.append(f"Duration: {run.get('start_time', '')} to {run.get('end_time', '')}\n\n")
+        return "".join(parts)
+
+    def stats(self) -> Dict[str, int]:
+        return {"traces_compacted": self.traces_compacted, "tokens_saved": self.tokens_saved}
+
+# Global compactor instance
+trace_compactor = services.register(
+    "trace_compactor",
+    lambda: TraceCompactor(
+        token_budget=settings.diagnosis_token_budget,
+        payload_token_limit=settings.diagnosis_payload_token_limit
+    )
+)
+
+metrics.collected(
+    "aha_trace_tokens_saved_total",
+    "Prompt tokens removed by trace compaction, not counting payloads of runs dropped unread", [],
+    lambda: {(): trace_compactor.tokens_saved},
+    kind="counter"
+)
@@ -0,0 +1,138 @@
+"""
+Storage backend interface for incidents
+"""
+import base64
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.models.incident import IncidentResponse, IncidentPage
+
+@dataclass
+class IncidentFilter:
+    """Server-side filters for incident listing"""
+    status: Optional[str] = None
+    error_type: Optional[str] = None
+    created_after: Optional[datetime] = None   # inclusive
+    created_before: Optional[datetime] = None  # exclusive
+
+    def __post_init__(self):
+        self.created_after = to_naive_utc(self.created_after)
+        self.created_before = to_naive_utc(self.created_before)
+
+    def matches(self, incident: IncidentResponse) -> bool:
+        if self.status is not None and incident.status != self.status:
+            return False
+        if self.error_type is not None and incident.error_type != self.error_type:
+            return False
+        if self.created_after is not None and incident.created_at < self.created_after:
+            return False
+        if self.created_before is not None and incident.created_at >= self.created_before:
+            return False
+        return True
+
+def to_naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """Incidents are stored with naive UTC timestamps"""
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+def encode_cursor(incident: IncidentResponse) -> str:
+    """Opaque cursor pointing just past `incident` in newest-first order"""
+    raw = f"{incident.created_at.isoformat(timespec='microseconds')}|{incident.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    """Inverse of encode_cursor; raises ValueError for malformed cursors"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, incident_id = base64.urlsafe_b64decode(padded).decode().split("|", 1)
+        return datetime.fromisoformat(created_at), incident_id
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+class IncidentStore(ABC):
+    """Interface implemented by every incident storage backend"""
+
+    @abstractmethod
+    def create_incident(
+        self,
+        trace_id: str,
+        error_type: str,
+        error_message: str,
+        langsmith_trace_url: Optional[str] = None,
+        fingerprint: Optional[str] = None
+    ) -> IncidentResponse:
+        """Create a new incident"""
+
+    @abstractmethod
+    def update_incident(
+        self,
+        incident_id: str,
+        diagnosis: Optional[str] = None,
+        confidence_score: Optional[float] = None,
+        error_category: Optional[str] = None,
+        github_issue_url: Optional[str] = None,
+        status: Optional[str] = None,
+        stage: Optional[str] = None,
+        related_incident_id: Optional[str] = None
+    ) -> Optional[IncidentResponse]:
+        """Update an existing incident"""
+
+    @abstractmethod
+    def get_incident(self, incident_id: str) -> Optional[IncidentResponse]:
+        """Get an incident by ID"""
+
+    @abstractmethod
+    def find_incident_by_trace(self, trace_id: str) -> Optional[IncidentResponse]:
+        """Most recent incident for a trace"""
+
+    @abstractmethod
+    def find_recent_by_fingerprint(self, fingerprint: str, since: datetime) -> Optional[IncidentResponse]:
+        """Most recent incident with this fingerprint created at or after `since`"""
+
+    @abstractmethod
+    def record_occurrence(self, incident_id: str, seen_at: datetime) -> Optional[IncidentResponse]:
+        """Count another occurrence of an existing incident"""
+
+    @abstractmethod
+    def get_all_incidents(self, limit: Optional[int] = None) -> List[IncidentResponse]:
+        """Get incidents newest first, optionally only the most recent `limit`"""
+
+    @abstractmethod
+    def list_incidents(
+        self,
+        limit: int = 50,
+        cursor: Optional[str] = None,
+        filters: Optional[IncidentFilter] = None
+    ) -> IncidentPage:
+        """
+        Get one page of incidents newest first.
+
+        `cursor` is the `next_cursor` of the previous page; raises ValueError
+        when it cannot be decoded.
+        """
+
+    @abstractmethod
+    def count_incidents(self) -> int:
+        """Number of stored incidents"""
+
+    @abstractmethod
+    def count_by_status(self) -> Dict[str, int]:
+        """Number of stored incidents per status"""
+
+    @abstractmethod
+    def delete_incident(self, incident_id: str) -> bool:
+        """Remove one incident; False if it did not exist"""
+
+    @abstractmethod
+    def clear_all(self) -> None:
+        """Clear all incidents (for demo reset)"""
+
+    def stats(self) -> Dict[str, Any]:
+        """Backend-specific counters for /api/health"""
+        return {"incidents": self.count_incidents()}
+
+    def close(self) -> None:
+        """Release any resources held by the backend"""
@@ -0,0 +1,57 @@
+"""
+Selects the incident storage backend from configuration
+"""
+import functools
+from typing import Any, Callable
+
+from app.core.config import settings
+from app.core.metrics import store_seconds
+from app.core.registry import services
+from app.storage.base import IncidentStore
+from app.storage.memory_store import MemoryStore
+from app.storage.retention import IncidentArchive, RetentionPolicy
+from app.storage.sqlite_store import SQLiteStore
+
+# Store calls timed into aha_store_query_seconds
+TIMED_OPERATIONS = (
+    "create_incident", "update_incident", "get_incident", "find_incident_by_trace",
+    "find_recent_by_fingerprint", "record_occurrence", "list_incidents", "count_incidents",
+    "count_by_status"
+)
+
+def _timed(operation: str, method: Callable[..., Any]) -> Callable[..., Any]:
+    @functools.wraps(method)
+    def wrapper(*args, **kwargs):
+        with store_seconds.time(operation=operation):
+            return method(*args, **kwargs)
+    return wrapper
+
+def instrument_store(store: IncidentStore) -> IncidentStore:
+    """Time the store's query methods without touching the backends"""
+    for operation in TIMED_OPERATIONS:
+        setattr(store, operation, _timed(operation, getattr(store, operation)))
+    return store
+
+def create_incident_store() -> IncidentStore:
+    """Build the store named by `aha_storage_backend`"""
+    backend = settings.aha_storage_backend.lower()
+    if backend == "sqlite":
+        return SQLiteStore(settings.aha_sqlite_path)
+    if backend == "memory":
+        if settings.aha_shared_state:
+            raise ValueError("The memory backend cannot be shared between processes; use sqlite")
+        return MemoryStore(
+            retention=RetentionPolicy(
+                max_incidents=settings.aha_retention_max_incidents,
+                max_age_seconds=settings.aha_retention_max_age_seconds
+            ),
+            archive=IncidentArchive(settings.aha_archive_path) if settings.aha_archive_path else None
+        )
+    raise ValueError(f"Unknown storage backend: {settings.aha_storage_backend}")
+
+# Global store instance
+incident_store = services.register(
+    "incident_store",
+    lambda: instrument_store(create_incident_store()),
+    close=lambda store: store.close()
+)
@@ -1,78 +1,237 @@
 """
 Simple in-memory storage for demo purposes
 """
-from typing import Dict, List, Optional
+from bisect import bisect_left, insort
+from collections import Counter
+from itertools import islice
+from typing import Dict, List, Optional, Tuple
 from datetime import datetime
+import logging
 import uuid
 
-from app.models.incident import IncidentResponse
+from app.models.incident import IncidentResponse, IncidentPage
+from app.storage.base import (
+    IncidentStore, IncidentFilter, encode_cursor, decode_cursor
+)
+from app.storage.records import IncidentRecord, TextPool, intern_optional
+from app.storage.retention import IncidentArchive, RetentionPolicy
+
+logger = logging.getLogger(__name__)
+
+class MemoryStore(IncidentStore):
+    """
+    In-memory incident storage.
+
+    Incidents are held as compact IncidentRecords with pooled message and
+    diagnosis text. With a retention policy, the oldest incidents beyond
+    the count or age limit are evicted on each create, and written to
+    `archive` first if one is given.
+    """
+
+    def __init__(self, retention: Optional[RetentionPolicy] = None, archive: Optional[IncidentArchive] = None):
+        # Insertion order is creation order, so newest-first is a reverse walk
+        self._incidents: Dict[str, IncidentRecord] = {}
+        # (created_at, id) ascending, used to seek to a cursor in O(log n)
+        self._order: List[Tuple[datetime, str]] = []
+        # Latest incident id per trace and per error fingerprint
+        self._by_trace: Dict[str, str] = {}
+        self._by_fingerprint: Dict[str, str] = {}
+        self._texts = TextPool()
+        self.retention = retention or RetentionPolicy()
+        self.archive = archive
+        self.evicted = 0
 
-class MemoryStore:
-    """In-memory incident storage"""
-    
-    def __init__(self):
-        self._incidents: Dict[str, IncidentResponse] = {}
-    
     def create_incident(
-        self, 
-        trace_id: str, 
-        error_type: str, 
+        self,
+        trace_id: str,
+        error_type: str,
         error_message: str,
-        langsmith_trace_url: Optional[str] = None
+        langsmith_trace_url: Optional[str] = None,
+        fingerprint: Optional[str] = None
     ) -> IncidentResponse:
         """Create a new incident"""
         incident_id = str(uuid.uuid4())
-        incident = IncidentResponse(
+        record = IncidentRecord(
             id=incident_id,
             trace_id=trace_id,
-            error_type=error_type,
-            error_message=error_message,
+            error_type=intern_optional(error_type),
+            error_message=self._texts.acquire(error_message),
             langsmith_trace_url=langsmith_trace_url,
             created_at=datetime.utcnow(),
-            status="detected"
+            fingerprint=intern_optional(fingerprint)
         )
-        self._incidents[incident_id] = incident
-        return incident
-    
+        self._incidents[incident_id] = record
+        insort(self._order, (record.created_at, incident_id))
+        self._by_trace[trace_id] = incident_id
+        if fingerprint:
+            self._by_fingerprint[fingerprint] = incident_id
+        if self.retention.enabled:
+            self._enforce_retention(record.created_at)
+        return record.to_response()
+
     def update_incident(
-        self, 
-        incident_id: str, 
+        self,
+        incident_id: str,
         diagnosis: Optional[str] = None,
         confidence_score: Optional[float] = None,
+        error_category: Optional[str] = None,
         github_issue_url: Optional[str] = None,
-        status: Optional[str] = None
+        status: Optional[str] = None,
+        stage: Optional[str] = None,
+        related_incident_id: Optional[str] = None
     ) -> Optional[IncidentResponse]:
         """Update an existing incident"""
-        if incident_id not in self._incidents:
+        record = self._incidents.get(incident_id)
+        if record is None:
             return None
-        
-        incident = self._incidents[incident_id]
+
         if diagnosis is not None:
-            incident.diagnosis = diagnosis
+            record.diagnosis = self._texts.replace(record.diagnosis, diagnosis)
         if confidence_score is not None:
-            incident.confidence_score = confidence_score
+            record.confidence_score = confidence_score
+        if error_category is not None:
+            record.error_category = intern_optional(error_category)
         if github_issue_url is not None:
-            incident.github_issue_url = github_issue_url
+            record.github_issue_url = github_issue_url
         if status is not None:
-            incident.status = status
-        
-        return incident
-    
+            record.status = intern_optional(status)
+        if stage is not None:
+            record.stage = intern_optional(stage)
+        if related_incident_id is not None:
+            record.related_incident_id = related_incident_id
+
+        return record.to_response()
+
     def get_incident(self, incident_id: str) -> Optional[IncidentResponse]:
         """Get an incident by ID"""
-        return self._incidents.get(incident_id)
-    
-    def get_all_incidents(self) -> List[IncidentResponse]:
+        record = self._incidents.get(incident_id)
+        return record.to_response() if record else None
+
+    def find_incident_by_trace(self, trace_id: str) -> Optional[IncidentResponse]:
+        """Most recent incident for a trace"""
+        incident_id = self._by_trace.get(trace_id)
+        return self.get_incident(incident_id) if incident_id else None
+
+    def find_recent_by_fingerprint(self, fingerprint: str, since: datetime) -> Optional[IncidentResponse]:
+        """Most recent incident with this fingerprint created at or after `since`"""
+        incident_id = self._by_fingerprint.get(fingerprint)
+        record = self._incidents.get(incident_id) if incident_id else None
+        if record and record.created_at >= since:
+            return record.to_response()
+        return None
+
+    def record_occurrence(self, incident_id: str, seen_at: datetime) -> Optional[IncidentResponse]:
+        """Count another occurrence of an existing incident"""
+        record = self._incidents.get(incident_id)
+        if record is None:
+            return None
+        record.occurrence_count += 1
+        record.last_seen_at = seen_at
+        return record.to_response()
+
+    def get_all_incidents(self, limit: Optional[int] = None) -> List[IncidentResponse]:
         """Get all incidents, sorted by creation time (newest first)"""
-        return sorted(
-            self._incidents.values(), 
-            key=lambda x: x.created_at, 
-            reverse=True
-        )
-    
+        return [record.to_response() for record in islice(reversed(self._incidents.values()), limit)]
+
+    def list_incidents(
+        self,
+        limit: int = 50,
+        cursor: Optional[str] = None,
+        filters: Optional[IncidentFilter] = None
+    ) -> IncidentPage:
+        """Get one page of incidents newest first"""
+        filters = filters or IncidentFilter()
+        created_after = filters.created_after
+        created_before = filters.created_before
+
+        position = len(self._order)
+        if cursor is not None:
+            position = bisect_left(self._order, decode_cursor(cursor))
+        if created_before is not None:
+            position = min(position, bisect_left(self._order, (created_before, "")))
+
+        items: List[IncidentResponse] = []
+        while position > 0 and len(items) <= limit:
+            position -= 1
+            created_at, incident_id = self._order[position]
+            if created_after is not None and created_at < created_after:
+                break
+            record = self._incidents[incident_id]
+            # Records carry the fields the filter reads
+            if filters.matches(record):
+                items.append(record.to_response())
+
+        next_cursor = encode_cursor(items[limit - 1]) if len(items) > limit else None
+        return IncidentPage(items=items[:limit], next_cursor=next_cursor)
+
+    def count_incidents(self) -> int:
+        """Number of stored incidents"""
+        return len(self._incidents)
+
+    def count_by_status(self) -> Dict[str, int]:
+        """Number of stored incidents per status"""
+        return dict(Counter(record.status for record in self._incidents.values()))
+
+    def delete_incident(self, incident_id: str) -> bool:
+        """Remove one incident; False if it did not exist"""
+        record = self._incidents.pop(incident_id, None)
+        if record is None:
+            return False
+        i = bisect_left(self._order, (record.created_at, incident_id))
+        if i < len(self._order) and self._order[i][1] == incident_id:
+            del self._order[i]
+        self._unindex(record)
+        return True
+
     def clear_all(self) -> None:
         """Clear all incidents (for demo reset)"""
         self._incidents.clear()
+        self._order.clear()
+        self._by_trace.clear()
+        self._by_fingerprint.clear()
+        self._texts.clear()
+
+    def _enforce_retention(self, now: datetime) -> None:
+        """Evict the oldest incidents beyond the count or age limit"""
+        evict = 0
+        if self.retention.max_incidents > 0:
+            evict = max(0, len(self._order) - self.retention.max_incidents)
+        cutoff = self.retention.cutoff(now)
+        if cutoff is not None:
+            evict = max(evict, bisect_left(self._order, (cutoff, "")))
+        if evict == 0:
+            return
+
+        expired = self._order[:evict]
+        del self._order[:evict]
+        records = [self._incidents.pop(incident_id) for _, incident_id in expired]
+        if self.archive is not None:
+            self.archive.write(record.to_response() for record in records)
+        for record in records:
+            self._unindex(record)
+        self.evicted += len(records)
+        logger.debug(f"Evicted {len(records)} incidents past retention"
+                    + (f", archived to {self.archive.path}" if self.archive else ""))
+
+    def _unindex(self, record: IncidentRecord) -> None:
+        """Drop a removed record from the lookups and release its pooled text"""
+        if self._by_trace.get(record.trace_id) == record.id:
+            del self._by_trace[record.trace_id]
+        if record.fingerprint and self._by_fingerprint.get(record.fingerprint) == record.id:
+            del self._by_fingerprint[record.fingerprint]
+        self._texts.release(record.error_message)
+        self._texts.release(record.diagnosis)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "incidents": len(self._incidents),
+            "pooled_texts": len(self._texts),
+            "evicted": self.evicted,
+            "archived": self.archive.archived if self.archive else 0,
+            "archive_failed": self.archive.failed if self.archive else 0
+        }
 
-# Global memory store instance
-memory_store = MemoryStore()
+    def close(self) -> None:
+        """Finish queued archive writes"""
+        if self.archive is not None:
+            self.archive.close()
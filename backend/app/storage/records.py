@@ -0,0 +1,86 @@
+"""
+Compact in-memory incident records, separate from the API model
+"""
+import sys
+from datetime import datetime
+from typing import Dict, Optional
+
+from app.models.incident import IncidentResponse
+
+def intern_optional(value: Optional[str]) -> Optional[str]:
+    """Share one string object for enum-like values (types, categories, stages)"""
+    return sys.intern(value) if value is not None else None
+
+class TextPool:
+    """
+    Reference-counted pool of long strings such as error messages and
+    diagnoses, so near-identical incidents share one copy of each body.
+    """
+
+    def __init__(self):
+        self._entries: Dict[str, list] = {}  # text -> [canonical text, refcount]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def acquire(self, text: Optional[str]) -> Optional[str]:
+        """Canonical copy of `text`, counted until released"""
+        if text is None:
+            return None
+        entry = self._entries.get(text)
+        if entry is None:
+            entry = self._entries[text] = [text, 0]
+        entry[1] += 1
+        return entry[0]
+
+    def release(self, text: Optional[str]) -> None:
+        if text is None:
+            return
+        entry = self._entries.get(text)
+        if entry is not None:
+            entry[1] -= 1
+            if entry[1] <= 0:
+                del self._entries[text]
+
+    def replace(self, old: Optional[str], new: Optional[str]) -> Optional[str]:
+        canonical = self.acquire(new)
+        self.release(old)
+        return canonical
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+class IncidentRecord:
+    """
+    One stored incident. Slots instead of a pydantic model: no per-instance
+    dict or validation state, and repeated values point at shared strings.
+    Converted to IncidentResponse only when read.
+    """
+    __slots__ = (
+        "id", "trace_id", "error_type", "error_message", "diagnosis", "confidence_score",
+        "error_category", "github_issue_url", "langsmith_trace_url", "created_at", "status",
+        "stage", "fingerprint", "occurrence_count", "last_seen_at", "related_incident_id"
+    )
+
+    def __init__(self, id: str, trace_id: str, error_type: str, error_message: str,
+                 langsmith_trace_url: Optional[str], created_at: datetime, fingerprint: Optional[str]):
+        self.id = id
+        self.trace_id = trace_id
+        self.error_type = error_type
+        self.error_message = error_message
+        self.diagnosis: Optional[str] = None
+        self.confidence_score: Optional[float] = None
+        self.error_category: Optional[str] = None
+        self.github_issue_url: Optional[str] = None
+        self.langsmith_trace_url = langsmith_trace_url
+        self.created_at = created_at
+        self.status = "detected"
+        self.stage: Optional[str] = None
+        self.fingerprint = fingerprint
+        self.occurrence_count = 1
+        self.last_seen_at: Optional[datetime] = None
+        self.related_incident_id: Optional[str] = None
+
+    def to_response(self) -> IncidentResponse:
+        # Every field was set by the store, so skip validation
+        return IncidentResponse.model_construct(**{name: getattr(self, name) for name in self.__slots__})
@@ -0,0 +1,65 @@
+"""
+Retention limits for stored incidents and the archive evicted ones go to
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Iterable, List, Optional
+
+from app.models.incident import IncidentResponse
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class RetentionPolicy:
+    """Keep at most `max_incidents`, none older than `max_age_seconds`; 0 disables either"""
+    max_incidents: int = 0
+    max_age_seconds: float = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_incidents > 0 or self.max_age_seconds > 0
+
+    def cutoff(self, now: datetime) -> Optional[datetime]:
+        """Incidents created before this are expired"""
+        if self.max_age_seconds <= 0:
+            return None
+        return now - timedelta(seconds=self.max_age_seconds)
+
+class IncidentArchive:
+    """
+    Appends evicted incidents to a JSONL file, one incident per line.
+
+    Eviction happens inside create_incident on the event loop, so writes are
+    handed to a single writer thread, which keeps them in eviction order.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.archived = 0
+        self.failed = 0
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="incident-archive")
+
+    def write(self, incidents: Iterable[IncidentResponse]) -> None:
+        """Queue incidents for the archive without waiting for the file"""
+        batch = list(incidents)
+        if batch:
+            self._writer.submit(self._append, batch)
+
+    def _append(self, incidents: List[IncidentResponse]) -> None:
+        lines = [incident.model_dump_json() + "\n" for incident in incidents]
+        try:
+            with open(self.path, "a") as archive:
+                archive.writelines(lines)
+            self.archived += len(lines)
+        except OSError as e:
+            self.failed += len(lines)
+            logger.error(f"Failed to archive {len(lines)} incidents to {self.path}: {e}")
+
+    def flush(self) -> None:
+        """Wait until every queued incident is written"""
+        self._writer.submit(lambda: None).result()
+
+    def close(self) -> None:
+        self._writer.shutdown(wait=True)
@@ -0,0 +1,245 @@
+"""
+SQLite-backed incident storage that survives restarts
+"""
+import sqlite3
+import threading
+import uuid
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.models.incident import IncidentResponse, IncidentPage
+from app.storage.base import IncidentStore, IncidentFilter, encode_cursor, decode_cursor
+
+# Column name -> SQL type. New columns are appended here and added to
+# existing databases on startup.
+COLUMNS: List[Tuple[str, str]] = [
+    ("id", "TEXT PRIMARY KEY"),
+    ("trace_id", "TEXT NOT NULL"),
+    ("error_type", "TEXT NOT NULL"),
+    ("error_message", "TEXT NOT NULL"),
+    ("diagnosis", "TEXT"),
+    ("confidence_score", "REAL"),
+    ("github_issue_url", "TEXT"),
+    ("langsmith_trace_url", "TEXT"),
+    ("created_at", "TEXT NOT NULL"),
+    ("status", "TEXT NOT NULL DEFAULT 'detected'"),
+    ("stage", "TEXT"),
+    ("fingerprint", "TEXT"),
+    ("occurrence_count", "INTEGER NOT NULL DEFAULT 1"),
+    ("last_seen_at", "TEXT"),
+    ("related_incident_id", "TEXT"),
+    ("error_category", "TEXT"),
+]
+
+INDEXES = [
+    "CREATE INDEX IF NOT EXISTS idx_incidents_created_at ON incidents (created_at DESC, id DESC)",
+    "CREATE INDEX IF NOT EXISTS idx_incidents_status ON incidents (status, created_at DESC, id DESC)",
+    "CREATE INDEX IF NOT EXISTS idx_incidents_error_type ON incidents (error_type, created_at DESC, id DESC)",
+    "CREATE INDEX IF NOT EXISTS idx_incidents_trace_id ON incidents (trace_id, created_at DESC)",
+    "CREATE INDEX IF NOT EXISTS idx_incidents_fingerprint ON incidents (fingerprint, created_at DESC)",
+]
+
+def format_timestamp(value: datetime) -> str:
+    """Fixed-width ISO timestamp so lexical order matches time order"""
+    return value.isoformat(timespec="microseconds")
+
+class SQLiteStore(IncidentStore):
+    """Incident storage in a single SQLite database running in WAL mode"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._create_schema()
+
+    def _create_schema(self) -> None:
+        columns = ", ".join(f"{name} {sql_type}" for name, sql_type in COLUMNS)
+        with self._lock:
+            self._conn.execute(f"CREATE TABLE IF NOT EXISTS incidents ({columns})")
+            existing = {row["name"] for row in self._conn.execute("PRAGMA table_info(incidents)")}
+            for name, sql_type in COLUMNS:
+                if name not in existing:
+                    self._conn.execute(f"ALTER TABLE incidents ADD COLUMN {name} {sql_type}")
+            for statement in INDEXES:
+                self._conn.execute(statement)
+
+    def _query(self, sql: str, params: Tuple = ()) -> List[sqlite3.Row]:
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    @staticmethod
+    def _to_incident(row: sqlite3.Row) -> IncidentResponse:
+        data: Dict[str, Any] = dict(row)
+        data["created_at"] = datetime.fromisoformat(data["created_at"])
+        if data.get("last_seen_at"):
+            data["last_seen_at"] = datetime.fromisoformat(data["last_seen_at"])
+        return IncidentResponse(**data)
+
+    def create_incident(
+        self,
+        trace_id: str,
+        error_type: str,
+        error_message: str,
+        langsmith_trace_url: Optional[str] = None,
+        fingerprint: Optional[str] = None
+    ) -> IncidentResponse:
+        """Create a new incident"""
+        incident = IncidentResponse(
+            id=str(uuid.uuid4()),
+            trace_id=trace_id,
+            error_type=error_type,
+            error_message=error_message,
+            langsmith_trace_url=langsmith_trace_url,
+            created_at=datetime.utcnow(),
+            status="detected",
+            fingerprint=fingerprint
+        )
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO incidents (id, trace_id, error_type, error_message, "
+                "langsmith_trace_url, created_at, status, fingerprint) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    incident.id, incident.trace_id, incident.error_type, incident.error_message,
+                    incident.langsmith_trace_url, format_timestamp(incident.created_at), incident.status,
+                    incident.fingerprint
+                )
+            )
+        return incident
+
+    def update_incident(
+        self,
+        incident_id: str,
+        diagnosis: Optional[str] = None,
+        confidence_score: Optional[float] = None,
+        error_category: Optional[str] = None,
+        github_issue_url: Optional[str] = None,
+        status: Optional[str] = None,
+        stage: Optional[str] = None,
+        related_incident_id: Optional[str] = None
+    ) -> Optional[IncidentResponse]:
+        """Update an existing incident"""
+        changes = {
+            "diagnosis": diagnosis,
+            "confidence_score": confidence_score,
+            "error_category": error_category,
+            "github_issue_url": github_issue_url,
+            "status": status,
+            "stage": stage,
+            "related_incident_id": related_incident_id,
+        }
+        changes = {key: value for key, value in changes.items() if value is not None}
+
+        if changes:
+            assignments = ", ".join(f"{key} = ?" for key in changes)
+            with self._lock:
+                self._conn.execute(
+                    f"UPDATE incidents SET {assignments} WHERE id = ?",
+                    (*changes.values(), incident_id)
+                )
+        return self.get_incident(incident_id)
+
+    def get_incident(self, incident_id: str) -> Optional[IncidentResponse]:
+        """Get an incident by ID"""
+        rows = self._query("SELECT * FROM incidents WHERE id = ?", (incident_id,))
+        return self._to_incident(rows[0]) if rows else None
+
+    def find_incident_by_trace(self, trace_id: str) -> Optional[IncidentResponse]:
+        """Most recent incident for a trace"""
+        rows = self._query(
+            "SELECT * FROM incidents WHERE trace_id = ? ORDER BY created_at DESC LIMIT 1",
+            (trace_id,)
+        )
+        return self._to_incident(rows[0]) if rows else None
+
+    def find_recent_by_fingerprint(self, fingerprint: str, since: datetime) -> Optional[IncidentResponse]:
+        """Most recent incident with this fingerprint created at or after `since`"""
+        rows = self._query(
+            "SELECT * FROM incidents WHERE fingerprint = ? AND created_at >= ? "
+            "ORDER BY created_at DESC LIMIT 1",
+            (fingerprint, format_timestamp(since))
+        )
+        return self._to_incident(rows[0]) if rows else None
+
+    def record_occurrence(self, incident_id: str, seen_at: datetime) -> Optional[IncidentResponse]:
+        """Count another occurrence of an existing incident"""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE incidents SET occurrence_count = occurrence_count + 1, last_seen_at = ? "
+                "WHERE id = ?",
+                (format_timestamp(seen_at), incident_id)
+            )
+        return self.get_incident(incident_id)
+
+    def get_all_incidents(self, limit: Optional[int] = None) -> List[IncidentResponse]:
+        """Get incidents newest first using the created_at index"""
+        rows = self._query(
+            "SELECT * FROM incidents ORDER BY created_at DESC, id DESC LIMIT ?",
+            (-1 if limit is None else limit,)
+        )
+        return [self._to_incident(row) for row in rows]
+
+    def list_incidents(
+        self,
+        limit: int = 50,
+        cursor: Optional[str] = None,
+        filters: Optional[IncidentFilter] = None
+    ) -> IncidentPage:
+        """Get one page of incidents newest first with a keyset query"""
+        filters = filters or IncidentFilter()
+        clauses: List[str] = []
+        params: List[Any] = []
+
+        if cursor is not None:
+            created_at, incident_id = decode_cursor(cursor)
+            clauses.append("(created_at, id) < (?, ?)")
+            params.extend([format_timestamp(created_at), incident_id])
+        if filters.status is not None:
+            clauses.append("status = ?")
+            params.append(filters.status)
+        if filters.error_type is not None:
+            clauses.append("error_type = ?")
+            params.append(filters.error_type)
+        if filters.created_after is not None:
+            clauses.append("created_at >= ?")
+            params.append(format_timestamp(filters.created_after))
+        if filters.created_before is not None:
+            clauses.append("created_at < ?")
+            params.append(format_timestamp(filters.created_before))
+
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        # One extra row tells us whether another page exists
+        rows = self._query(
+            f"SELECT * FROM incidents {where} ORDER BY created_at DESC, id DESC LIMIT ?",
+            (*params, limit + 1)
+        )
+        items = [self._to_incident(row) for row in rows[:limit]]
+        next_cursor = encode_cursor(items[-1]) if len(rows) > limit else None
+        return IncidentPage(items=items, next_cursor=next_cursor)
+
+    def count_incidents(self) -> int:
+        """Number of stored incidents"""
+        return self._query("SELECT COUNT(*) FROM incidents")[0][0]
+
+    def count_by_status(self) -> Dict[str, int]:
+        """Number of stored incidents per status"""
+        return dict(self._query("SELECT status, COUNT(*) FROM incidents GROUP BY status"))
+
+    def delete_incident(self, incident_id: str) -> bool:
+        """Remove one incident; False if it did not exist"""
+        with self._lock:
+            cursor = self._conn.execute("DELETE FROM incidents WHERE id = ?", (incident_id,))
+        return cursor.rowcount == 1
+
+    def clear_all(self) -> None:
+        """Clear all incidents (for demo reset)"""
+        with self._lock:
+            self._conn.execute("DELETE FROM incidents")
+
+    def close(self) -> None:
+        """Close the database connection"""
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,74 @@
+"""
+Offline benchmark of batched versus per-incident diagnosis.
+
+Diagnoses a burst of distinct incidents through DiagnosisService backed by
+the fake Anthropic client, whose concurrency cap stands in for a provider
+rate limit, and reports wall time and the number of LLM calls made.
+
+    python -m demo.benchmark_batch_diagnosis --incidents 64 --latency 0.5 --rate-limit 4
+"""
+import argparse
+import asyncio
+import os
+import time
+
+os.environ.setdefault("LANGSMITH_API_KEY", "fake")
+os.environ.setdefault("GITHUB_TOKEN", "fake")
+os.environ.setdefault("GITHUB_REPO_OWNER", "fake")
+
+from app.core.config import settings
+from app.services.diagnosis_batcher import DiagnosisBatcher
+from app.services.diagnosis_service import DiagnosisService
+from app.services.llm_router import AnthropicProvider, LLMRouter
+from demo.fakes.anthropic_client import FakeAnthropicClient
+
+def _trace(n: int) -> dict:
+    return {
+        "trace_id": f"trace-{n}",
+        "runs": [
+            {"id": f"root-{n}", "name": "orchestrator", "run_type": "chain",
+             "inputs": {"task": f"job {n}"}, "outputs": None, "error": None, "parent_run_id": None},
+            {"id": f"tool-{n}", "name": f"tool_{n % 7}", "run_type": "tool",
+             "inputs": {"raw": "{"}, "outputs": None,
+             "error": f"Error{n % 5}Exception: step {n % 7} failed", "parent_run_id": f"root-{n}"}
+        ]
+    }
+
+def _service(latency: float, rate_limit: int) -> DiagnosisService:
+    client = FakeAnthropicClient(latency, rate_limit)
+    return DiagnosisService(LLMRouter([AnthropicProvider(client, settings.anthropic_model, rate_limit)]))
+
+async def _measure(label: str, service: DiagnosisService, incidents: int) -> None:
+    started = time.perf_counter()
+    results = await asyncio.gather(*(service.analyze_trace(_trace(n)) for n in range(incidents)))
+    elapsed = time.perf_counter() - started
+    failed = sum(1 for r in results if r.error_category == "analysis_failure")
+    calls = len(service.router.providers[0].client.calls)
+    print(f"{label:<10} wall={elapsed:7.3f}s  llm_calls={calls:4d}  failed={failed}")
+
+async def run(incidents: int, latency: float, rate_limit: int, batch_size: int) -> None:
+    # Every incident is distinct; keep reuse paths out of the comparison
+    settings.diagnosis_cache_enabled = False
+    settings.similarity_enabled = False
+
+    single = _service(latency, rate_limit)
+    single.batcher = None
+    await _measure("single", single, incidents)
+
+    batched = _service(latency, rate_limit)
+    batched.batcher = DiagnosisBatcher(
+        complete=batched._complete,
+        max_batch=batch_size,
+        window_seconds=settings.diagnosis_batch_window_seconds,
+        max_prompt_tokens=settings.diagnosis_batch_max_tokens
+    )
+    await _measure("batched", batched, incidents)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--incidents", type=int, default=64)
+    parser.add_argument("--latency", type=float, default=0.5, help="seconds per LLM call")
+    parser.add_argument("--rate-limit", type=int, default=4, help="concurrent LLM calls allowed")
+    parser.add_argument("--batch-size", type=int, default=settings.diagnosis_batch_size)
+    args = parser.parse_args()
+    asyncio.run(run(args.incidents, args.latency, args.rate_limit, args.batch_size))
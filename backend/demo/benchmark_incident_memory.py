@@ -0,0 +1,85 @@
+"""
+Offline benchmark of incident memory in the memory storage backend.
+
+Stores incidents whose error messages and diagnoses repeat across a small
+set of failure modes, as they do in an error storm, and reports the heap
+held by: full pydantic models (the previous representation), the compact
+records with pooled text, and compact records under a count limit.
+
+    python -m demo.benchmark_incident_memory --incidents 20000 --variants 50
+"""
+import argparse
+import os
+import tempfile
+import tracemalloc
+import uuid
+from datetime import datetime
+from typing import Callable, Dict
+
+from app.models.incident import IncidentResponse
+from app.storage.memory_store import MemoryStore
+from app.storage.retention import IncidentArchive, RetentionPolicy
+
+def _texts(n: int, variants: int):
+    """Fresh string objects each time, like bodies parsed from webhooks and LLM replies"""
+    variant = n % variants
+    message = "".join(["JSONDecodeError: Expecting ',' delimiter in tool output of ResearcherAgent "] * 8)
+    message += f" variant {variant}"
+    diagnosis = "".join(["The agent emitted malformed JSON because the prompt does not pin a schema. "] * 12)
+    diagnosis += f" variant {variant}"
+    return message, diagnosis
+
+def _fill_models(incidents: int, variants: int) -> Dict[str, IncidentResponse]:
+    stored = {}
+    for n in range(incidents):
+        message, diagnosis = _texts(n, variants)
+        incident_id = str(uuid.uuid4())
+        stored[incident_id] = IncidentResponse(
+            id=incident_id, trace_id=f"trace-{n}", error_type="JSONDecodeError", error_message=message,
+            diagnosis=diagnosis, confidence_score=0.8, error_category="parsing_error",
+            langsmith_trace_url=f"https://smith.langchain.com/trace/trace-{n}",
+            created_at=datetime.utcnow(), status="analyzed", stage="complete"
+        )
+    return stored
+
+def _fill_store(store: MemoryStore, incidents: int, variants: int) -> MemoryStore:
+    for n in range(incidents):
+        message, diagnosis = _texts(n, variants)
+        incident = store.create_incident(
+            trace_id=f"trace-{n}", error_type="JSONDecodeError", error_message=message,
+            langsmith_trace_url=f"https://smith.langchain.com/trace/trace-{n}"
+        )
+        store.update_incident(incident.id, diagnosis=diagnosis, confidence_score=0.8,
+                              error_category="parsing_error", status="analyzed", stage="complete")
+    return store
+
+def _measure(label: str, build: Callable[[], object]) -> None:
+    tracemalloc.start()
+    held = build()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    stats = f"  {held.stats()}" if isinstance(held, MemoryStore) else ""
+    print(f"{label:<28} {current / 1024 / 1024:8.1f} MB{stats}")
+
+def run(incidents: int, variants: int, keep: int) -> None:
+    print(f"{incidents} incidents, {variants} distinct message/diagnosis pairs")
+    _measure("pydantic models", lambda: _fill_models(incidents, variants))
+    _measure("compact records", lambda: _fill_store(MemoryStore(), incidents, variants))
+    with tempfile.TemporaryDirectory() as workdir:
+        archive = IncidentArchive(os.path.join(workdir, "archive.jsonl"))
+
+        def retained() -> MemoryStore:
+            store = _fill_store(MemoryStore(RetentionPolicy(max_incidents=keep), archive), incidents, variants)
+            archive.flush()
+            return store
+
+        _measure(f"compact, keep {keep}", retained)
+        archive.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--incidents", type=int, default=20000)
+    parser.add_argument("--variants", type=int, default=50)
+    parser.add_argument("--keep", type=int, default=2000)
+    args = parser.parse_args()
+    run(args.incidents, args.variants, args.keep)
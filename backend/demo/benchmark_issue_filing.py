@@ -0,0 +1,67 @@
+"""
+Offline benchmark of GitHub issue filing against the fake GitHub API.
+
+Files a storm of issues concurrently through GitHubService while the fake
+enforces a secondary rate limit, and reports wall time, the worst event
+loop stall, how often GitHub throttled us and how many labels were made.
+
+    python -m demo.benchmark_issue_filing --issues 40 --categories 5 --creates-per-second 10
+"""
+import argparse
+import asyncio
+import os
+import time
+
+os.environ.setdefault("LANGSMITH_API_KEY", "fake")
+os.environ.setdefault("GITHUB_TOKEN", "fake")
+os.environ.setdefault("GITHUB_REPO_OWNER", "fake")
+
+from app.core.config import settings
+from app.models.incident import DiagnosisResult
+from demo.benchmark_trace_fetch import _probe_loop_lag
+from demo.fakes.github_server import create_app
+from demo.fakes.runner import BackgroundServer
+
+async def run(issues: int, categories: int, creates_per_second: int, latency: float) -> None:
+    fake = create_app(latency_seconds=latency, max_creates_per_second=creates_per_second)
+    with BackgroundServer(fake) as server:
+        settings.github_api_url = server.url
+        settings.github_repo_owner = "fake"
+        settings.github_repo_name = "aha-incidents"
+        from app.services.github_service import GitHubService
+        service = GitHubService()
+
+        results = [
+            DiagnosisResult(
+                diagnosis=f"Failure {n}", confidence_score=0.8, suggested_fix="Fix it",
+                error_category=f"category_{n % categories}", root_cause="Unknown"
+            )
+            for n in range(issues)
+        ]
+
+        stop = asyncio.Event()
+        probe = asyncio.create_task(_probe_loop_lag(stop))
+        await asyncio.sleep(0)
+        started = time.perf_counter()
+        urls = await asyncio.gather(*(
+            service.create_issue(f"Agent Failure {n}", f"trace-{n}", result, "http://langsmith")
+            for n, result in enumerate(results)
+        ))
+        elapsed = time.perf_counter() - started
+        stop.set()
+        worst_lag = await probe
+        await service.aclose()
+
+        print(f"{issues} issues, {categories} error categories, GitHub allows {creates_per_second} creates/s")
+        print(f"filed={sum(1 for url in urls if url)}  wall={elapsed:6.2f}s  "
+              f"max_loop_stall={worst_lag * 1000:6.1f}ms  throttled={fake.state.throttled}  "
+              f"labels_created={len(fake.state.labels)}  requests={fake.state.requests}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--issues", type=int, default=40)
+    parser.add_argument("--categories", type=int, default=5)
+    parser.add_argument("--creates-per-second", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=0.02)
+    args = parser.parse_args()
+    asyncio.run(run(args.issues, args.categories, args.creates_per_second, args.latency))
@@ -0,0 +1,145 @@
+"""
+Offline benchmark of LLM routing, failover and hedging.
+
+Sends a steady stream of diagnosis prompts through the LLM router backed
+by scripted fake providers and reports completion latency percentiles
+and how calls were spread across providers. There are two scenarios:
+
+  tail    the primary usually answers in 1s, but one call in ten takes 8s;
+          the secondary always takes 1.5s
+  outage  the primary fails every call for the first half of the run
+
+Each scenario is run with the primary alone, routed without hedging, and
+routed with hedging. `--scale` shrinks all latencies to keep runs short.
+
+`--check` runs scripted checks of failover, the breaker opening and
+probing half-open, and cancellation of hedge losers for completions and
+streams, instead of the scenarios. The exit status is 1 when any fails.
+
+    python -m demo.benchmark_llm_router --requests 200 --rate 20 --scale 0.1
+    python -m demo.benchmark_llm_router --check
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from typing import List
+
+os.environ.setdefault("LANGSMITH_API_KEY", "fake")
+os.environ.setdefault("GITHUB_TOKEN", "fake")
+os.environ.setdefault("GITHUB_REPO_OWNER", "fake")
+
+from app.services.llm_router import LLMRouter, LLMUnavailableError
+from demo.benchmark_pipeline import percentile
+from demo.fakes.llm_providers import ScriptedProvider
+
+PROMPT = "=== RUN 1: SynthesizerAgent ===\nERROR: JSONDecodeError: Expecting ',' delimiter\n"
+
+def _providers(scenario: str, scale: float, requests: int) -> List[ScriptedProvider]:
+    if scenario == "tail":
+        primary = ScriptedProvider("primary", lambda n: (8.0 if n % 10 == 9 else 1.0) * scale)
+    else:
+        primary = ScriptedProvider("primary", 1.0 * scale, fails=lambda n: n < requests // 2)
+    return [primary, ScriptedProvider("secondary", 1.5 * scale)]
+
+async def _drive(router: LLMRouter, requests: int, rate: float) -> None:
+    latencies: List[float] = []
+    failed = 0
+
+    async def one(n: int) -> None:
+        nonlocal failed
+        await asyncio.sleep(n / rate)
+        started = time.perf_counter()
+        try:
+            await router.complete(PROMPT, 500)
+            latencies.append(time.perf_counter() - started)
+        except LLMUnavailableError:
+            failed += 1
+
+    await asyncio.gather(*(one(n) for n in range(requests)))
+    ms = "  ".join(f"p{p}={round(percentile(latencies, p) * 1000)}ms" for p in (50, 95, 99)) if latencies else "no answers"
+    calls = "  ".join(f"{r.name}={r.calls}" for r in router.routes)
+    print(f"  {ms}  failed={failed}  calls: {calls}  hedges={router.hedges}")
+
+async def run(requests: int, rate: float, scale: float) -> None:
+    for scenario in ("tail", "outage"):
+        print(f"{scenario}:")
+        variants = [
+            ("primary only", lambda: LLMRouter(_providers(scenario, scale, requests)[:1])),
+            ("routed", lambda: LLMRouter(_providers(scenario, scale, requests), breaker_reset_seconds=2.0)),
+            ("routed+hedge", lambda: LLMRouter(_providers(scenario, scale, requests), breaker_reset_seconds=2.0,
+                                               hedge_enabled=True, hedge_min_delay_seconds=1.2 * scale)),
+        ]
+        for label, build in variants:
+            print(f" {label}")
+            await _drive(build(), requests, rate)
+
+async def check() -> List[str]:
+    """Scripted checks of the router's failure handling; returns what failed"""
+    failures: List[str] = []
+
+    def expect(ok: bool, what: str) -> None:
+        print(f"  {'ok  ' if ok else 'FAIL'} {what}")
+        if not ok:
+            failures.append(what)
+
+    # Failover: every primary call fails, the secondary answers
+    down = True
+    primary = ScriptedProvider("primary", 0.01, fails=lambda n: down)
+    secondary = ScriptedProvider("secondary", 0.01)
+    router = LLMRouter([primary, secondary], breaker_failures=3, breaker_reset_seconds=0.3)
+    answered = [await router.complete(PROMPT, 500) for _ in range(3)]
+    expect(all(answered) and secondary.calls == 3, "failed calls fail over to the next provider")
+
+    # Breaker: open after 3 failures, then one half-open probe whose success closes it
+    route = router.routes[0]
+    expect(route.breaker.state == "open", "breaker opens after consecutive failures")
+    await router.complete(PROMPT, 500)
+    expect(primary.calls == 3, "an open breaker keeps calls off the provider")
+    await asyncio.sleep(0.35)
+    expect(route.breaker.state == "half_open", "breaker goes half-open after the reset delay")
+    down = False
+    await asyncio.gather(*(router.complete(PROMPT, 500) for _ in range(3)))
+    expect(primary.calls == 4, "half-open breaker lets exactly one probe through")
+    expect(route.breaker.state == "closed", "a successful probe closes the breaker")
+
+    # All providers down
+    router = LLMRouter([ScriptedProvider("a", 0.0, fail_every=1), ScriptedProvider("b", 0.0, fail_every=1)])
+    try:
+        await router.complete(PROMPT, 500)
+        expect(False, "all providers failing raises LLMUnavailableError")
+    except LLMUnavailableError:
+        expect(True, "all providers failing raises LLMUnavailableError")
+
+    # Hedging: the slow primary is raced, loses and is cancelled without counting as a failure
+    slow, fast = ScriptedProvider("slow", 1.0), ScriptedProvider("fast", 0.02)
+    router = LLMRouter([slow, fast], hedge_enabled=True, hedge_min_delay_seconds=0.05)
+    started = time.perf_counter()
+    await router.complete(PROMPT, 500)
+    expect(time.perf_counter() - started < 0.5 and router.routes[1].hedges_won == 1, "hedge answers first")
+    expect(slow.cancelled == 1 and router.routes[0].in_flight == 0, "losing hedge attempt is cancelled")
+    expect(router.routes[0].breaker.state == "closed" and router.routes[0].failures == 0,
+           "a cancelled attempt is not a provider failure")
+
+    # Streams hedge on first token and forward only the winner
+    slow, fast = ScriptedProvider("slow", 1.0), ScriptedProvider("fast", 0.02)
+    router = LLMRouter([slow, fast], hedge_enabled=True, hedge_min_delay_seconds=0.05)
+    received: List[str] = []
+    await router.stream(PROMPT, received.append)
+    expect(len(received) == 1 and slow.cancelled == 1, "streams forward only the first to emit and cancel the other")
+    return failures
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1],
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--rate", type=float, default=20.0, help="prompts per second")
+    parser.add_argument("--scale", type=float, default=0.1, help="multiplier for scripted latencies")
+    parser.add_argument("--check", action="store_true", help="run the scripted checks and exit 1 on failure")
+    args = parser.parse_args()
+    if args.check:
+        failed = asyncio.run(check())
+        print(f"{len(failed)} checks failed" if failed else "all checks passed")
+        sys.exit(1 if failed else 0)
+    asyncio.run(run(args.requests, args.rate, args.scale))
@@ -0,0 +1,441 @@
+"""
+End-to-end load test of the webhook-to-issue pipeline against local fakes.
+
+Starts fake LangSmith, Anthropic and GitHub servers, runs the backend as a
+real uvicorn process pointed at them, fires LangSmith webhooks in one of
+three traffic profiles and follows every incident through the SSE stream
+until its issue is filed. Reports webhook throughput, webhook ack and
+end-to-end latency percentiles, event loop responsiveness (round trips to
+/live while under load) and the backend's resident memory.
+
+    python -m demo.benchmark_pipeline --profile steady --rate 20 --duration 15
+    python -m demo.benchmark_pipeline --profile burst --burst-size 100 --burst-interval 5
+    python -m demo.benchmark_pipeline --profile duplicates --duplicate-ratio 0.7
+
+Profiles:
+  steady      unique failures at a fixed rate
+  burst       `--burst-size` unique failures at once, every `--burst-interval` seconds
+  duplicates  like steady, but a share of deliveries are LangSmith retries of an
+              earlier run or new runs hitting an already-seen error
+
+Backend settings not set here are taken from the environment, e.g.
+GITHUB_REQUESTS_PER_SECOND=20 to lift the default GitHub write pacing.
+
+`--ingest` turns on run ingestion: each trace is emitted into the fake
+LangSmith project `--ingest-lead` seconds before its webhook, so the
+backend can serve it from its run cache instead of fetching it.
+
+`--max-p95` turns the run into a gate: the exit status is 1 when the
+end-to-end p95 exceeds it or any incident fails to complete.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+
+from demo.fakes.anthropic_server import create_app as create_anthropic_app
+from demo.fakes.github_server import create_app as create_github_app
+from demo.fakes.langsmith_server import create_app as create_langsmith_app
+from demo.fakes.runner import BackgroundServer, _free_port
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+@dataclass
+class Delivery:
+    """One webhook the load generator sends, and what happened to it"""
+    offset: float
+    payload: Dict[str, Any]
+    sent_at: Optional[float] = None
+    acked_at: Optional[float] = None
+    status: Optional[str] = None
+    incident_id: Optional[str] = None
+
+@dataclass
+class RunResults:
+    deliveries: List[Delivery]
+    finished: Dict[str, Tuple[float, str]] = field(default_factory=dict)  # incident -> (time, stage)
+    live_round_trips: List[float] = field(default_factory=list)
+    rss_samples: List[int] = field(default_factory=list)
+    started_at: float = 0.0
+    stream_resets: int = 0
+    stuck_stages: Dict[str, Optional[str]] = field(default_factory=dict)  # unfinished incident -> stage
+    emitted: Dict[str, "asyncio.Task[str]"] = field(default_factory=dict)  # trace -> failing run id
+    run_ingestion: Optional[Dict[str, Any]] = None
+
+def _payload(trace_id: str, run_id: str, error_type: str) -> Dict[str, Any]:
+    return {
+        "trace_id": trace_id,
+        "run_id": run_id,
+        "project_name": "aha-load-test",
+        "status": "error",
+        "error": {"type": error_type, "message": f"{error_type} raised by ResearcherAgent"}
+    }
+
+def build_schedule(args: argparse.Namespace) -> List[Delivery]:
+    """Deliveries with their send offsets for the chosen profile"""
+    rng = random.Random(args.seed)
+    deliveries: List[Delivery] = []
+
+    def unique(n: int) -> Dict[str, Any]:
+        # Error types carry the index so every failure gets its own fingerprint
+        return _payload(f"load-trace-{n}", f"load-run-{n}", f"LoadTestError{n}")
+
+    if args.profile == "steady":
+        total = int(args.rate * args.duration)
+        deliveries = [Delivery(n / args.rate, unique(n)) for n in range(total)]
+    elif args.profile == "burst":
+        bursts = max(1, int(args.duration // args.burst_interval))
+        deliveries = [
+            Delivery(b * args.burst_interval, unique(b * args.burst_size + i))
+            for b in range(bursts) for i in range(args.burst_size)
+        ]
+    elif args.profile == "duplicates":
+        total = int(args.rate * args.duration)
+        sent: List[Dict[str, Any]] = []
+        for n in range(total):
+            if sent and rng.random() < args.duplicate_ratio:
+                earlier = rng.choice(sent)
+                if rng.random() < 0.5:
+                    payload = dict(earlier)  # redelivery of the same run
+                else:
+                    # A new trace failing the same way
+                    payload = _payload(f"load-trace-{n}", f"load-run-{n}", earlier["error"]["type"])
+            else:
+                payload = unique(n)
+            sent.append(payload)
+            deliveries.append(Delivery(n / args.rate, payload))
+    else:
+        raise ValueError(f"Unknown profile: {args.profile}")
+    return deliveries
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, int(round(pct / 100 * len(ordered) + 0.5)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+def _rss_kb(pid: int) -> int:
+    """Resident memory of `pid` and its children (uvicorn workers), Linux only"""
+    total = 0
+    pending = [pid]
+    while pending:
+        current = pending.pop()
+        try:
+            with open(f"/proc/{current}/status") as status:
+                for line in status:
+                    if line.startswith("VmRSS:"):
+                        total += int(line.split()[1])
+            with open(f"/proc/{current}/task/{current}/children") as children:
+                pending.extend(int(child) for child in children.read().split())
+        except (FileNotFoundError, ProcessLookupError, PermissionError):
+            continue
+    return total
+
+def start_backend(args: argparse.Namespace, workdir: str, fakes: Dict[str, str]) -> Tuple[subprocess.Popen, str]:
+    port = _free_port("127.0.0.1")
+    env = {
+        **os.environ,
+        "LANGSMITH_API_KEY": "fake",
+        "LANGSMITH_API_URL": fakes["langsmith"],
+        "ANTHROPIC_API_KEY": "fake",
+        "ANTHROPIC_BASE_URL": fakes["anthropic"],
+        "GITHUB_TOKEN": "fake",
+        "GITHUB_REPO_OWNER": "fake",
+        "GITHUB_REPO_NAME": "aha-incidents",
+        "GITHUB_API_URL": fakes["github"],
+        "GITHUB_ISSUE_INDEX_PATH": os.path.join(workdir, "issues.db"),
+        "AHA_SQLITE_PATH": os.path.join(workdir, "incidents.db"),
+        "AHA_QUEUE_PATH": os.path.join(workdir, "queue.db"),
+        "AHA_STATE_PATH": os.path.join(workdir, "state.db"),
+        "AHA_SHARED_STATE": "true" if args.workers > 1 else "false",
+        "AHA_DEBUG_MODE": "false",
+        "DIAGNOSIS_CACHE_ENABLED": str(args.reuse).lower(),
+        "SIMILARITY_ENABLED": str(args.reuse).lower(),
+        "DIAGNOSIS_RULES_ENABLED": str(args.rules).lower(),
+        "LANGSMITH_INGEST_ENABLED": str(args.ingest).lower(),
+        "LANGSMITH_INGEST_POLL_SECONDS": str(args.ingest_poll),
+        "LANGSMITH_INGEST_LOOKBACK_SECONDS": str(args.ingest_lookback),
+    }
+    env.pop("DIAGNOSIS_CACHE_PATH", None)
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(args.workers), "--log-level", "warning",
+         # Idle keep-alive connections outlive the gaps between bursts
+         "--timeout-keep-alive", "60"],
+        cwd=BACKEND_DIR, env=env
+    )
+    return process, f"http://127.0.0.1:{port}"
+
+async def wait_until_ready(client: httpx.AsyncClient, process: subprocess.Popen, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Backend exited with status {process.returncode}")
+        try:
+            if (await client.get("/ready")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError("Backend did not become ready")
+
+async def follow_incidents(client: httpx.AsyncClient, results: RunResults, connected: asyncio.Event) -> None:
+    """Record when each incident reaches a final stage, from the SSE stream"""
+    async with client.stream("GET", "/api/incidents/stream", params={"since": 0}, timeout=None) as response:
+        connected.set()
+        async for line in response.aiter_lines():
+            if not line.startswith("data: "):
+                continue
+            event = json.loads(line[6:])
+            if event["type"] == "reset":
+                results.stream_resets += 1
+                continue
+            incident = event.get("incident") or {}
+            stage = incident.get("stage")
+            if stage in ("complete", "failed") and incident["id"] not in results.finished:
+                results.finished[incident["id"]] = (time.perf_counter(), stage)
+
+async def probe_live(client: httpx.AsyncClient, results: RunResults, stop: asyncio.Event) -> None:
+    """Round trips to /live; slow ones mean the backend's event loop was busy"""
+    while not stop.is_set():
+        started = time.perf_counter()
+        try:
+            await client.get("/live")
+            results.live_round_trips.append(time.perf_counter() - started)
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.05)
+
+async def sample_memory(pid: int, results: RunResults, stop: asyncio.Event) -> None:
+    while not stop.is_set():
+        results.rss_samples.append(_rss_kb(pid))
+        await asyncio.sleep(0.25)
+
+async def emit_trace(langsmith: httpx.AsyncClient, trace_id: str) -> str:
+    """Have the fake LangSmith project record a finished trace; returns its failing run id"""
+    response = await langsmith.post(f"/fake/traces/{trace_id}")
+    response.raise_for_status()
+    return response.json()["failing_run_id"]
+
+async def send(client: httpx.AsyncClient, delivery: Delivery, results: RunResults,
+               langsmith: Optional[httpx.AsyncClient] = None, lead: float = 0.0) -> None:
+    if langsmith is not None:
+        # The trace's runs exist upstream before LangSmith reports its failure
+        await asyncio.sleep(max(0.0, results.started_at + delivery.offset - lead - time.perf_counter()))
+        trace_id = delivery.payload["trace_id"]
+        if trace_id not in results.emitted:
+            results.emitted[trace_id] = asyncio.create_task(emit_trace(langsmith, trace_id))
+        delivery.payload = {**delivery.payload, "run_id": await results.emitted[trace_id]}
+    await asyncio.sleep(max(0.0, results.started_at + delivery.offset - time.perf_counter()))
+    delivery.sent_at = time.perf_counter()
+    try:
+        response = await client.post("/webhook/langsmith", json=delivery.payload)
+        body = response.json() if response.status_code == 200 else {}
+        delivery.status = body.get("status", f"http_{response.status_code}")
+        delivery.incident_id = body.get("incident_id")
+    except httpx.HTTPError as e:
+        delivery.status = type(e).__name__
+    delivery.acked_at = time.perf_counter()
+
+async def run_load(args: argparse.Namespace, base_url: str, pid: int, langsmith_url: str) -> RunResults:
+    results = RunResults(deliveries=build_schedule(args))
+    limits = httpx.Limits(max_connections=args.connections, max_keepalive_connections=args.connections)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60.0) as client, \
+            httpx.AsyncClient(base_url=base_url, timeout=None) as side_client, \
+            httpx.AsyncClient(base_url=langsmith_url, limits=limits, timeout=60.0) as langsmith:
+        connected = asyncio.Event()
+        stop = asyncio.Event()
+        follower = asyncio.create_task(follow_incidents(side_client, results, connected))
+        await asyncio.wait_for(connected.wait(), timeout=10)
+        monitors = [
+            asyncio.create_task(probe_live(side_client, results, stop)),
+            asyncio.create_task(sample_memory(pid, results, stop)),
+        ]
+
+        results.started_at = time.perf_counter()
+        emitter = langsmith if args.ingest else None
+        await asyncio.gather(*(send(client, delivery, results, emitter, args.ingest_lead)
+                               for delivery in results.deliveries))
+
+        # Wait for every accepted incident to finish
+        expected = {d.incident_id for d in results.deliveries if d.status == "accepted" and d.incident_id}
+        deadline = time.perf_counter() + args.drain_timeout
+        while not expected <= results.finished.keys() and time.perf_counter() < deadline:
+            await asyncio.sleep(0.1)
+
+        # Stragglers: ask the API directly in case the stream missed them
+        for incident_id in expected - results.finished.keys():
+            response = await side_client.get(f"/api/incidents/{incident_id}")
+            if response.status_code == 200:
+                results.stuck_stages[incident_id] = response.json().get("stage")
+        if args.ingest:
+            results.run_ingestion = (await side_client.get("/api/health")).json().get("run_ingestion")
+
+        stop.set()
+        await asyncio.gather(*monitors)
+        follower.cancel()
+        try:
+            await follower
+        except (asyncio.CancelledError, httpx.HTTPError):
+            pass
+    return results
+
+def summarize(args: argparse.Namespace, results: RunResults) -> Dict[str, Any]:
+    deliveries = results.deliveries
+    acked = [d for d in deliveries if d.acked_at is not None and d.sent_at is not None]
+    statuses: Dict[str, int] = {}
+    for d in deliveries:
+        statuses[d.status or "unsent"] = statuses.get(d.status or "unsent", 0) + 1
+
+    accepted = {d.incident_id: d for d in deliveries if d.status == "accepted" and d.incident_id}
+    end_to_end = [
+        results.finished[incident_id][0] - d.sent_at
+        for incident_id, d in accepted.items() if incident_id in results.finished
+    ]
+    failed = sum(1 for incident_id in accepted if results.finished.get(incident_id, (0, ""))[1] == "failed")
+    last_ack = max((d.acked_at for d in acked), default=results.started_at)
+    last_finish = max((results.finished[i][0] for i in accepted if i in results.finished),
+                      default=results.started_at)
+
+    def ms(value: Optional[float]) -> Optional[float]:
+        return round(value * 1000, 1) if value is not None else None
+
+    ack_latencies = [d.acked_at - d.sent_at for d in acked]
+    return {
+        "profile": args.profile,
+        "webhooks": len(deliveries),
+        "statuses": statuses,
+        "webhooks_per_second": round(len(acked) / max(last_ack - results.started_at, 1e-9), 1),
+        "incidents_accepted": len(accepted),
+        "incidents_completed": len(end_to_end) - failed,
+        "incidents_failed": failed,
+        "incidents_unfinished": len(accepted) - len(end_to_end),
+        "incidents_per_second": round(len(end_to_end) / max(last_finish - results.started_at, 1e-9), 2),
+        "ack_ms": {p: ms(percentile(ack_latencies, p)) for p in (50, 95, 99)},
+        "end_to_end_ms": {p: ms(percentile(end_to_end, p)) for p in (50, 95, 99)},
+        "live_round_trip_ms": {
+            "p50": ms(percentile(results.live_round_trips, 50)),
+            "p99": ms(percentile(results.live_round_trips, 99)),
+            "max": ms(max(results.live_round_trips, default=None))
+        },
+        "rss_mb": {
+            "start": round(results.rss_samples[0] / 1024, 1) if results.rss_samples else None,
+            "peak": round(max(results.rss_samples) / 1024, 1) if results.rss_samples else None
+        },
+        "stream_resets": results.stream_resets,
+        "run_ingestion": results.run_ingestion,
+        "unfinished_stages": results.stuck_stages
+    }
+
+def print_summary(summary: Dict[str, Any]) -> None:
+    def row(label: str, values: Dict[Any, Any]) -> str:
+        return f"{label:<18}" + "  ".join(f"{key}={value}" for key, value in values.items())
+
+    print(f"profile={summary['profile']}  webhooks={summary['webhooks']}  "
+          + "  ".join(f"{status}={count}" for status, count in sorted(summary["statuses"].items())))
+    print(f"throughput        webhooks/s={summary['webhooks_per_second']}  "
+          f"incidents/s={summary['incidents_per_second']}")
+    print(f"incidents         accepted={summary['incidents_accepted']}  completed={summary['incidents_completed']}  "
+          f"failed={summary['incidents_failed']}  unfinished={summary['incidents_unfinished']}")
+    print(row("ack ms", {f"p{p}": v for p, v in summary["ack_ms"].items()}))
+    print(row("end-to-end ms", {f"p{p}": v for p, v in summary["end_to_end_ms"].items()}))
+    print(row("/live rtt ms", summary["live_round_trip_ms"]))
+    print(row("backend rss MB", summary["rss_mb"]))
+    if summary["run_ingestion"]:
+        print(row("run ingestion", {k: v for k, v in summary["run_ingestion"].items() if k != "cursor"}))
+    if summary["stream_resets"]:
+        print(f"warning: SSE stream reset {summary['stream_resets']} times; some completions were missed")
+    for incident_id, stage in summary["unfinished_stages"].items():
+        print(f"unfinished        {incident_id} stage={stage}")
+
+def main(args: argparse.Namespace) -> int:
+    langsmith = create_langsmith_app(runs_per_trace=args.runs, latency_seconds=args.langsmith_latency)
+    anthropic = create_anthropic_app(latency_seconds=args.llm_latency, max_concurrency=args.llm_concurrency)
+    github = create_github_app(latency_seconds=args.github_latency,
+                               max_creates_per_second=args.github_creates_per_second)
+
+    with BackgroundServer(langsmith) as langsmith_server, \
+            BackgroundServer(anthropic) as anthropic_server, \
+            BackgroundServer(github) as github_server, \
+            tempfile.TemporaryDirectory(prefix="aha-load-") as workdir:
+        fakes = {"langsmith": langsmith_server.url, "anthropic": anthropic_server.url, "github": github_server.url}
+        process, base_url = start_backend(args, workdir, fakes)
+        try:
+            async def session() -> RunResults:
+                async with httpx.AsyncClient(base_url=base_url) as client:
+                    await wait_until_ready(client, process)
+                return await run_load(args, base_url, process.pid, langsmith_server.url)
+
+            results = asyncio.run(session())
+        finally:
+            process.terminate()
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+        summary = summarize(args, results)
+        summary["upstream_requests"] = {
+            "langsmith": langsmith.state.requests,
+            "anthropic": anthropic.state.requests,
+            "github": github.state.requests,
+            "github_throttled": github.state.throttled
+        }
+
+    print_summary(summary)
+    print("upstream          " + "  ".join(f"{k}={v}" for k, v in summary["upstream_requests"].items()))
+    if args.json:
+        Path(args.json).write_text(json.dumps(summary, indent=2))
+
+    if args.max_p95 is not None:
+        p95 = summary["end_to_end_ms"][95]
+        if summary["incidents_failed"] or summary["incidents_unfinished"] or p95 is None or p95 > args.max_p95 * 1000:
+            print(f"FAIL: end-to-end p95 {p95}ms exceeds {args.max_p95 * 1000:.0f}ms or incidents did not complete")
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description=__doc__.splitlines()[1], formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--profile", choices=["steady", "burst", "duplicates"], default="steady")
+    parser.add_argument("--rate", type=float, default=20.0, help="webhooks per second (steady, duplicates)")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds of traffic")
+    parser.add_argument("--burst-size", type=int, default=100)
+    parser.add_argument("--burst-interval", type=float, default=5.0)
+    parser.add_argument("--duplicate-ratio", type=float, default=0.6)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--connections", type=int, default=50, help="load generator connection pool size")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--runs", type=int, default=25, help="runs per fake trace")
+    parser.add_argument("--langsmith-latency", type=float, default=0.05)
+    parser.add_argument("--llm-latency", type=float, default=1.0)
+    parser.add_argument("--llm-concurrency", type=int, default=50)
+    parser.add_argument("--github-latency", type=float, default=0.05)
+    parser.add_argument("--github-creates-per-second", type=int, default=None)
+    parser.add_argument("--reuse", action="store_true",
+                        help="keep the diagnosis cache and similar-incident reuse on")
+    parser.add_argument("--rules", action="store_true",
+                        help="let the rule classifier diagnose known failures without the LLM")
+    parser.add_argument("--ingest", action="store_true",
+                        help="turn on run ingestion and emit each trace ahead of its webhook")
+    parser.add_argument("--ingest-lead", type=float, default=2.0, help="seconds a trace exists before its webhook")
+    parser.add_argument("--ingest-poll", type=float, default=0.5)
+    parser.add_argument("--ingest-lookback", type=float, default=2.0)
+    parser.add_argument("--drain-timeout", type=float, default=120.0,
+                        help="seconds to wait for incidents to finish after the last webhook")
+    parser.add_argument("--max-p95", type=float, default=None, help="fail if end-to-end p95 exceeds this (seconds)")
+    parser.add_argument("--json", help="also write the summary to this file")
+    sys.exit(main(parser.parse_args()))
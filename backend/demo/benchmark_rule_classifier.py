@@ -0,0 +1,69 @@
+"""
+Offline benchmark of the rule classifier on a mix of failures.
+
+Builds traces that fail with a sample of errors: JSON parsing, rate limits,
+timeouts, auth and context-length failures the rules know, plus failures
+they should leave to the LLM. Reports the share diagnosed without the LLM,
+the outcome per error and the classification latency.
+
+    python -m demo.benchmark_rule_classifier --traces 5000 --runs 25
+"""
+import argparse
+import os
+import random
+import time
+from collections import Counter
+from typing import List
+
+os.environ.setdefault("LANGSMITH_API_KEY", "fake")
+os.environ.setdefault("GITHUB_TOKEN", "fake")
+os.environ.setdefault("GITHUB_REPO_OWNER", "fake")
+
+from app.services.rule_classifier import DEFAULT_RULES, RuleClassifier
+from demo.benchmark_pipeline import percentile
+from demo.fakes.langsmith_server import _build_runs
+
+ERRORS = [
+    ("JSONDecodeError", "Expecting ',' delimiter: line 1 column 45 (char 44)"),
+    ("JSONDecodeError", "Unterminated string starting at: line 3 column 12 (char 88)"),
+    ("OutputParserException", "Could not parse LLM output: `Final answer:`"),
+    ("RateLimitError", "Error code: 429 - rate_limit_error"),
+    ("ReadTimeout", "The read operation timed out"),
+    ("AuthenticationError", "Error code: 401 - invalid x-api-key"),
+    ("BadRequestError", "prompt is too long: 210345 tokens > 200000 maximum"),
+    ("ConnectError", "[Errno 111] Connection refused"),
+    ("KeyError", "'citations'"),
+    ("AssertionError", "synthesizer returned an empty report"),
+]
+
+def run(traces: int, runs: int, seed: int) -> None:
+    rng = random.Random(seed)
+    classifier = RuleClassifier(DEFAULT_RULES, min_confidence=0.8)
+    outcomes: Counter = Counter()
+    handled: Counter = Counter()
+    latencies: List[float] = []
+    for n in range(traces):
+        error_type, message = rng.choice(ERRORS)
+        trace = {"trace_id": f"trace-{n}", "runs": _build_runs(f"trace-{n}", runs)}
+        trace["runs"][-1]["error"] = f"{error_type}: {message}"
+        started = time.perf_counter()
+        result = classifier.classify(trace)
+        latencies.append(time.perf_counter() - started)
+        outcomes[error_type] += 1
+        if result is not None:
+            handled[error_type] += 1
+
+    print(f"{traces} traces of {runs} runs")
+    for error_type, count in outcomes.most_common():
+        print(f"  {error_type:<24} {handled[error_type]:>6}/{count:<6} diagnosed by rules")
+    total = sum(handled.values())
+    print(f"without the LLM: {total}/{traces} ({total / traces:.0%})")
+    print(f"classify us: p50={percentile(latencies, 50) * 1e6:.0f}  p99={percentile(latencies, 99) * 1e6:.0f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--traces", type=int, default=5000)
+    parser.add_argument("--runs", type=int, default=25)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    run(args.traces, args.runs, args.seed)
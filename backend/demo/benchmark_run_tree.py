@@ -0,0 +1,84 @@
+"""
+Offline benchmark of run ranking on large, deep traces.
+
+Builds a synthetic trace of nested agent calls where the failure in the
+deepest call propagates up, so every run on the failing path carries an
+error, as LangChain reports it. Times the previous ranking, which walks to
+the root from every failing run, against ranking through a RunTree, and
+reports what the tree build and the dashboard summary cost on their own.
+
+    python -m demo.benchmark_run_tree --runs 20000 --depth 2000
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Set
+
+from app.services.run_tree import RunTree
+from app.services.trace_compactor import ANCESTOR_RUN, ERROR_RUN, OTHER_RUN, SIBLING_RUN, TraceCompactor
+
+def build_trace(runs: int, depth: int, seed: int) -> List[Dict[str, Any]]:
+    """A failing chain `depth` deep with the remaining runs hung off random links"""
+    rng = random.Random(seed)
+    started = datetime(2024, 1, 1, 12, 0, 0)
+    trace = []
+    for i in range(runs):
+        on_path = i < depth
+        parent = None if i == 0 else str(i - 1) if on_path else str(rng.randrange(min(i, depth)))
+        trace.append({
+            "id": str(i),
+            "name": f"Agent-{i}",
+            "run_type": "chain" if on_path else "llm",
+            "parent_run_id": parent,
+            "error": "JSONDecodeError: Expecting ',' delimiter" if on_path else None,
+            "start_time": (started + timedelta(milliseconds=i)).isoformat(),
+            "end_time": (started + timedelta(milliseconds=i + rng.randrange(1, 500))).isoformat()
+        })
+    return trace
+
+def rank_by_rescanning(runs: List[Dict[str, Any]]) -> List[int]:
+    """The ranking as it was before the run tree"""
+    by_id = {run.get('id'): i for i, run in enumerate(runs) if run.get('id')}
+    ranks = [OTHER_RUN] * len(runs)
+    failing_parents: Set[Optional[str]] = set()
+    for i, run in enumerate(runs):
+        if not run.get('error'):
+            continue
+        ranks[i] = ERROR_RUN
+        failing_parents.add(run.get('parent_run_id'))
+        parent = run.get('parent_run_id')
+        seen: Set[str] = set()
+        while parent in by_id and parent not in seen:
+            seen.add(parent)
+            ancestor = by_id[parent]
+            ranks[ancestor] = min(ranks[ancestor], ANCESTOR_RUN)
+            parent = runs[ancestor].get('parent_run_id')
+    for i, run in enumerate(runs):
+        if ranks[i] == OTHER_RUN and run.get('parent_run_id') in failing_parents:
+            ranks[i] = SIBLING_RUN
+    return ranks
+
+def _timed(label: str, action) -> Any:
+    started = time.perf_counter()
+    result = action()
+    print(f"{label:<24} {(time.perf_counter() - started) * 1000:10.1f} ms")
+    return result
+
+def run(runs: int, depth: int, seed: int) -> None:
+    trace = build_trace(runs, depth, seed)
+    print(f"{runs} runs, failing path {depth} deep")
+    before = _timed("rank by rescanning", lambda: rank_by_rescanning(trace))
+    after = _timed("rank via run tree", lambda: TraceCompactor._rank_runs(RunTree(trace)))
+    tree = _timed("  build run tree", lambda: RunTree(trace))
+    summary = _timed("  dashboard summary", tree.summary)
+    print(f"ranks match: {before == after}  failing path: {len(summary['failing_path'])} runs  "
+          f"slowest path: {len(summary['slowest_path'])} runs")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=20000)
+    parser.add_argument("--depth", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    run(args.runs, args.depth, args.seed)
@@ -0,0 +1,90 @@
+"""
+Offline benchmark of trace fetching against the fake LangSmith server.
+
+Compares the old pattern (blocking HTTP calls inside a coroutine) with the
+pooled async LangSmithService, reporting wall time and the worst event loop
+stall observed while the fetches were in flight.
+
+    python -m demo.benchmark_trace_fetch --traces 50 --runs 250 --latency 0.05
+"""
+import argparse
+import asyncio
+import os
+import time
+
+import httpx
+
+os.environ.setdefault("LANGSMITH_API_KEY", "fake")
+os.environ.setdefault("GITHUB_TOKEN", "fake")
+os.environ.setdefault("GITHUB_REPO_OWNER", "fake")
+
+from demo.fakes.langsmith_server import create_app
+from demo.fakes.runner import BackgroundServer
+
+async def _probe_loop_lag(stop: asyncio.Event, interval: float = 0.005) -> float:
+    """Return the longest delay beyond `interval` seen by a ticking coroutine"""
+    worst = 0.0
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        worst = max(worst, time.perf_counter() - started - interval)
+    return worst
+
+async def _blocking_fetch(base_url: str, trace_id: str, page_size: int) -> int:
+    """The pre-async pattern: synchronous paging on the event loop thread"""
+    runs = []
+    cursor = None
+    with httpx.Client(base_url=base_url) as client:
+        while True:
+            body = {"trace": trace_id, "limit": page_size}
+            if cursor:
+                body["cursor"] = cursor
+            payload = client.post("/runs/query", json=body).json()
+            runs.extend(payload["runs"])
+            cursor = payload["cursors"]["next"]
+            if not cursor:
+                return len(runs)
+
+async def _measure(label: str, coro_factory) -> None:
+    stop = asyncio.Event()
+    probe = asyncio.create_task(_probe_loop_lag(stop))
+    await asyncio.sleep(0)  # let the probe start ticking
+    started = time.perf_counter()
+    await coro_factory()
+    elapsed = time.perf_counter() - started
+    stop.set()
+    worst_lag = await probe
+    print(f"{label:<10} wall={elapsed:7.3f}s  max_loop_stall={worst_lag * 1000:8.1f}ms")
+
+async def run(traces: int, runs: int, latency: float) -> None:
+    with BackgroundServer(create_app(runs_per_trace=runs, latency_seconds=latency)) as server:
+        os.environ["LANGSMITH_API_URL"] = server.url
+        from app.services.langsmith_service import LangSmithService
+        from app.core.config import settings
+        settings.langsmith_api_url = server.url
+
+        trace_ids = [f"bench-trace-{i}" for i in range(traces)]
+        page_size = settings.langsmith_page_size
+
+        async def blocking():
+            for trace_id in trace_ids:
+                await _blocking_fetch(server.url, trace_id, page_size)
+
+        service = LangSmithService()
+
+        async def pooled():
+            results = await service.get_traces(trace_ids)
+            assert all(results.values()), "fake server returned an empty trace"
+
+        print(f"{traces} traces x {runs} runs, {latency * 1000:.0f}ms per page")
+        await _measure("blocking", blocking)
+        await _measure("async", pooled)
+        await service.aclose()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--traces", type=int, default=50)
+    parser.add_argument("--runs", type=int, default=250)
+    parser.add_argument("--latency", type=float, default=0.05)
+    args = parser.parse_args()
+    asyncio.run(run(args.traces, args.runs, args.latency))
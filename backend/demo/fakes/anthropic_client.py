@@ -0,0 +1,117 @@
+"""
+In-process stand-in for anthropic.AsyncAnthropic.
+
+Answers the diagnosis prompts with canned, well-formed JSON derived from
+the ERROR lines of each trace, so the diagnosis pipeline can run offline.
+A forced tool choice gets the answer as that tool's input, as the API
+does.
+`max_concurrency` mimics a provider rate limit. With `stream=True` the
+answer arrives as content_block_delta events spread across the latency.
+"""
+import asyncio
+import json
+import re
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional
+
+_INCIDENT = re.compile(r"^=== INCIDENT (\d+) ===$", re.MULTILINE)
+_ERROR = re.compile(r"^ERROR: (.+)$", re.MULTILINE)
+
+def _answer_for(trace_text: str) -> dict:
+    errors = _ERROR.findall(trace_text)
+    error = errors[0] if errors else "no error recorded"
+    category = "parsing_error" if "Decode" in error or "pars" in error.lower() else "logic_error"
+    return {
+        "diagnosis": f"Run failed with {error}",
+        "confidence_score": 0.8,
+        "root_cause": f"The failing run raised {error}",
+        "error_category": category,
+        "suggested_fix": f"Handle {error.split(':')[0]} in the failing step"
+    }
+
+def answer_prompt(prompt: str) -> str:
+    """Canned response for a single or batched diagnosis prompt"""
+    markers = list(_INCIDENT.finditer(prompt))
+    if not markers:
+        return json.dumps(_answer_for(prompt))
+    incidents = []
+    for i, marker in enumerate(markers):
+        end = markers[i + 1].start() if i + 1 < len(markers) else len(prompt)
+        incidents.append({"incident": int(marker.group(1)), **_answer_for(prompt[marker.end():end])})
+    return json.dumps({"incidents": incidents})
+
+def answer_messages(messages: List[Dict[str, Any]], responder=answer_prompt) -> str:
+    """Answer the last user message"""
+    return responder(next(m["content"] for m in reversed(messages) if m["role"] == "user"))
+
+def forced_tool(request: Dict[str, Any]) -> Optional[str]:
+    """Name of the tool a request forces the model to call, if any"""
+    choice = request.get("tool_choice") or {}
+    return choice.get("name") if choice.get("type") == "tool" else None
+
+class _FakeMessages:
+    def __init__(self, client: "FakeAnthropicClient"):
+        self._client = client
+
+    async def create(
+        self,
+        model: str,
+        max_tokens: int,
+        messages: List[Dict[str, Any]],
+        stream: bool = False,
+        **kwargs
+    ) -> Any:
+        prompt = next(m["content"] for m in reversed(messages) if m["role"] == "user")
+        tool = forced_tool(kwargs)
+        if stream:
+            return self._stream(model, max_tokens, prompt, messages, tool)
+        async with self._client._slots:
+            self._client.calls.append({"model": model, "max_tokens": max_tokens, "prompt": prompt})
+            await asyncio.sleep(self._client.latency_seconds)
+            text = answer_messages(messages, self._client.responder)
+        if tool:
+            # A malformed answer would be rejected by the API, so it stays text
+            try:
+                block = SimpleNamespace(type="tool_use", id="toolu_fake", name=tool, input=json.loads(text))
+            except json.JSONDecodeError:
+                block = SimpleNamespace(type="text", text=text)
+        else:
+            block = SimpleNamespace(type="text", text=text)
+        return SimpleNamespace(
+            content=[block],
+            usage=SimpleNamespace(input_tokens=len(prompt) // 4, output_tokens=len(text) // 4)
+        )
+
+    async def _stream(self, model: str, max_tokens: int, prompt: str, messages: List[Dict[str, Any]],
+                      tool: Optional[str]):
+        async with self._client._slots:
+            self._client.calls.append({"model": model, "max_tokens": max_tokens, "prompt": prompt})
+            text = answer_messages(messages, self._client.responder)
+            chunks = [text[i:i + 8] for i in range(0, len(text), 8)] or [""]
+            delay = self._client.latency_seconds / len(chunks)
+            yield SimpleNamespace(
+                type="message_start",
+                message=SimpleNamespace(usage=SimpleNamespace(input_tokens=len(prompt) // 4, output_tokens=1))
+            )
+            yield SimpleNamespace(type="content_block_start", index=0)
+            for chunk in chunks:
+                await asyncio.sleep(delay)
+                delta = (SimpleNamespace(type="input_json_delta", partial_json=chunk) if tool
+                         else SimpleNamespace(type="text_delta", text=chunk))
+                yield SimpleNamespace(type="content_block_delta", index=0, delta=delta)
+            yield SimpleNamespace(type="content_block_stop", index=0)
+            yield SimpleNamespace(
+                type="message_delta", delta=SimpleNamespace(stop_reason="end_turn"),
+                usage=SimpleNamespace(output_tokens=len(text) // 4)
+            )
+            yield SimpleNamespace(type="message_stop")
+
+class FakeAnthropicClient:
+    """Duck-typed AsyncAnthropic exposing `messages.create`"""
+
+    def __init__(self, latency_seconds: float = 0.0, max_concurrency: int = 1000, responder=None):
+        self.latency_seconds = latency_seconds
+        self.responder = responder or answer_prompt
+        self.calls: List[Dict[str, Any]] = []
+        self._slots = asyncio.Semaphore(max_concurrency)
+        self.messages = _FakeMessages(self)
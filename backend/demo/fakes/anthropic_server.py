@@ -0,0 +1,96 @@
+"""
+Local stub of the Anthropic Messages API for offline demos and load tests.
+
+Serves POST /v1/messages with the same canned answers as the in-process
+FakeAnthropicClient, so a separately running backend can be pointed at it
+with ANTHROPIC_BASE_URL. `stream: true` requests get the SSE event sequence
+the SDK expects.
+"""
+import asyncio
+import json
+import uuid
+from typing import Any, Dict
+
+from fastapi import FastAPI, Body
+from fastapi.responses import StreamingResponse
+
+from demo.fakes.anthropic_client import answer_messages, forced_tool
+
+def _sse(event_type: str, data: Dict[str, Any]) -> str:
+    return f"event: {event_type}\ndata: {json.dumps({'type': event_type, **data})}\n\n"
+
+def create_app(latency_seconds: float = 0.5, max_concurrency: int = 1000) -> FastAPI:
+    """
+    Build a stub of the Messages API.
+
+    Each answer takes `latency_seconds`; at most `max_concurrency` answers
+    are generated at once and the rest wait, like a provider rate limit.
+    """
+    app = FastAPI(title="Fake Anthropic")
+    app.state.requests = 0
+    slots = asyncio.Semaphore(max_concurrency)
+
+    @app.post("/v1/messages")
+    async def create_message(body: Dict[str, Any] = Body(...)):
+        app.state.requests += 1
+        prompt = next(m["content"] for m in reversed(body["messages"]) if m["role"] == "user")
+        text = answer_messages(body["messages"])
+        tool = forced_tool(body)
+        message = {
+            "id": f"msg_{uuid.uuid4().hex[:24]}",
+            "type": "message",
+            "role": "assistant",
+            "model": body.get("model", "fake"),
+            "stop_reason": None,
+            "stop_sequence": None,
+        }
+        usage = {"input_tokens": len(prompt) // 4, "output_tokens": len(text) // 4}
+
+        if not body.get("stream"):
+            async with slots:
+                await asyncio.sleep(latency_seconds)
+            if tool:
+                content = [{"type": "tool_use", "id": f"toolu_{uuid.uuid4().hex[:24]}",
+                            "name": tool, "input": json.loads(text)}]
+            else:
+                content = [{"type": "text", "text": text}]
+            return {
+                **message,
+                "content": content,
+                "stop_reason": "tool_use" if tool else "end_turn",
+                "usage": usage
+            }
+
+        async def events():
+            async with slots:
+                chunks = [text[i:i + 8] for i in range(0, len(text), 8)] or [""]
+                delay = latency_seconds / len(chunks)
+                yield _sse("message_start", {"message": {
+                    **message, "content": [], "usage": {"input_tokens": usage["input_tokens"], "output_tokens": 1}
+                }})
+                if tool:
+                    block = {"type": "tool_use", "id": f"toolu_{uuid.uuid4().hex[:24]}", "name": tool, "input": {}}
+                else:
+                    block = {"type": "text", "text": ""}
+                yield _sse("content_block_start", {"index": 0, "content_block": block})
+                for chunk in chunks:
+                    await asyncio.sleep(delay)
+                    delta = ({"type": "input_json_delta", "partial_json": chunk} if tool
+                             else {"type": "text_delta", "text": chunk})
+                    yield _sse("content_block_delta", {"index": 0, "delta": delta})
+                yield _sse("content_block_stop", {"index": 0})
+                yield _sse("message_delta", {
+                    "delta": {"stop_reason": "tool_use" if tool else "end_turn", "stop_sequence": None},
+                    "usage": {"output_tokens": usage["output_tokens"]}
+                })
+                yield _sse("message_stop", {})
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    return app
+
+app = create_app()
+
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run(app, host="127.0.0.1", port=8102)
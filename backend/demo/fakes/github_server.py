@@ -0,0 +1,132 @@
+"""
+Local stub of the GitHub issues API for offline demos and benchmarks
+"""
+import asyncio
+import time
+from collections import deque
+from typing import Any, Dict, Optional
+
+from fastapi import FastAPI, Body, HTTPException
+from fastapi.responses import JSONResponse
+
+def create_app(
+    latency_seconds: float = 0.02,
+    max_creates_per_second: Optional[int] = None,
+    owner: str = "fake",
+    repo: str = "aha-incidents"
+) -> FastAPI:
+    """
+    Build a stub covering the repository, label and issue endpoints.
+
+    When `max_creates_per_second` is set, POSTs beyond it within a second
+    get GitHub's secondary rate-limit response (403 with retry-after).
+    """
+    app = FastAPI(title="Fake GitHub")
+    app.state.labels = {}
+    app.state.issues = []
+    app.state.requests = 0
+    app.state.throttled = 0
+    recent_creates = deque()
+    base = f"/repos/{owner}/{repo}"
+
+    async def handle(creates: bool) -> Optional[JSONResponse]:
+        app.state.requests += 1
+        await asyncio.sleep(latency_seconds)
+        if creates and max_creates_per_second:
+            now = time.monotonic()
+            while recent_creates and now - recent_creates[0] > 1.0:
+                recent_creates.popleft()
+            if len(recent_creates) >= max_creates_per_second:
+                app.state.throttled += 1
+                return JSONResponse(
+                    {"message": "You have exceeded a secondary rate limit."},
+                    status_code=403,
+                    headers={"retry-after": "1"}
+                )
+            recent_creates.append(now)
+        return None
+
+    @app.get(base)
+    async def get_repo():
+        await handle(False)
+        return {"full_name": f"{owner}/{repo}", "name": repo, "owner": {"login": owner}}
+
+    @app.get(f"{base}/labels")
+    async def list_labels():
+        await handle(False)
+        return [{"name": name} for name in app.state.labels]
+
+    @app.post(f"{base}/labels", status_code=201)
+    async def create_label(body: Dict[str, Any] = Body(...)):
+        if throttled := await handle(True):
+            return throttled
+        if body["name"] in app.state.labels:
+            raise HTTPException(status_code=422, detail="Validation Failed")
+        app.state.labels[body["name"]] = body
+        return {"name": body["name"]}
+
+    @app.get(f"{base}/issues")
+    async def list_issues(state: str = "open", labels: Optional[str] = None, per_page: int = 30, page: int = 1):
+        await handle(False)
+        wanted = set(labels.split(",")) if labels else set()
+        matching = [
+            issue for issue in app.state.issues
+            if (state == "all" or issue["state"] == state)
+            and wanted <= {label["name"] for label in issue["labels"]}
+        ]
+        return matching[(page - 1) * per_page:page * per_page]
+
+    @app.post(f"{base}/issues", status_code=201)
+    async def create_issue(body: Dict[str, Any] = Body(...)):
+        if throttled := await handle(True):
+            return throttled
+        missing = [name for name in body.get("labels", []) if name not in app.state.labels]
+        if missing:
+            raise HTTPException(status_code=422, detail=f"Unknown labels: {missing}")
+        number = len(app.state.issues) + 1
+        issue = {
+            "number": number,
+            "title": body["title"],
+            "body": body.get("body", ""),
+            "state": "open",
+            "labels": [{"name": name} for name in body.get("labels", [])],
+            "html_url": f"https://github.com/{owner}/{repo}/issues/{number}",
+            "comments": []
+        }
+        app.state.issues.append(issue)
+        return issue
+
+    @app.get(f"{base}/issues/{{number}}")
+    async def get_issue(number: int):
+        if throttled := await handle(False):
+            return throttled
+        if not 1 <= number <= len(app.state.issues):
+            raise HTTPException(status_code=404, detail="Not Found")
+        return app.state.issues[number - 1]
+
+    @app.patch(f"{base}/issues/{{number}}")
+    async def update_issue(number: int, body: Dict[str, Any] = Body(...)):
+        if throttled := await handle(True):
+            return throttled
+        if not 1 <= number <= len(app.state.issues):
+            raise HTTPException(status_code=404, detail="Not Found")
+        app.state.issues[number - 1].update({k: v for k, v in body.items() if k in ("state", "title", "body")})
+        return app.state.issues[number - 1]
+
+    @app.post(f"{base}/issues/{{number}}/comments", status_code=201)
+    async def create_comment(number: int, body: Dict[str, Any] = Body(...)):
+        if throttled := await handle(True):
+            return throttled
+        if not 1 <= number <= len(app.state.issues):
+            raise HTTPException(status_code=404, detail="Not Found")
+        comment = {"id": number * 100000 + len(app.state.issues[number - 1]["comments"]), "body": body["body"]}
+        app.state.issues[number - 1]["comments"].append(comment)
+        return comment
+
+    return app
+
+app = create_app()
+
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run(app, host="127.0.0.1", port=8101)
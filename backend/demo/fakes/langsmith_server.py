@@ -0,0 +1,92 @@
+"""
+Local stub of the LangSmith runs API for offline demos and benchmarks
+"""
+import asyncio
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from fastapi import FastAPI, Body
+
+PROJECT_ID = "00000000-0000-4000-8000-000000000001"
+
+def _build_runs(trace_id: str, run_count: int, started: Optional[datetime] = None,
+                step_seconds: float = 1.0) -> List[Dict[str, Any]]:
+    """Generate a deterministic multi-agent trace ending in a parsing failure"""
+    namespace = uuid.uuid5(uuid.NAMESPACE_URL, trace_id)
+    started = started or datetime(2024, 1, 1, 12, 0, 0)
+    root_id = str(uuid.uuid5(namespace, "root"))
+    runs = []
+
+    for i in range(run_count):
+        run_id = root_id if i == 0 else str(uuid.uuid5(namespace, str(i)))
+        is_last = i == run_count - 1
+        runs.append({
+            "id": run_id,
+            "trace_id": trace_id,
+            "name": "ResearchTeam" if i == 0 else f"ResearcherAgent-{i}",
+            "run_type": "chain" if i == 0 else "llm",
+            "inputs": {"query": "state of AI agents", "step": i},
+            "outputs": None if is_last else {"result": f"finding {i}"},
+            "error": (
+                "JSONDecodeError: Expecting ',' delimiter: line 1 column 45 (char 44)"
+                if is_last else None
+            ),
+            "start_time": (started + timedelta(seconds=i * step_seconds)).isoformat(),
+            "end_time": (started + timedelta(seconds=(i + 1) * step_seconds)).isoformat(),
+            "parent_run_id": None if i == 0 else root_id,
+            "session_id": PROJECT_ID,
+        })
+    return runs
+
+def create_app(runs_per_trace: int = 25, latency_seconds: float = 0.05) -> FastAPI:
+    """
+    Build a stub exposing POST /runs/query with cursor pagination, by trace
+    or by project and start time, plus GET /sessions for the project id.
+
+    Project queries read a feed of traces emitted through
+    POST /fake/traces/{trace_id}, which stands in for an agent finishing a
+    run. Every page response is delayed by latency_seconds to model
+    network time.
+    """
+    app = FastAPI(title="Fake LangSmith")
+    app.state.requests = 0
+    app.state.feed = []
+
+    @app.get("/sessions")
+    async def list_sessions(name: str, limit: int = 100):
+        return [{"id": PROJECT_ID, "name": name}][:limit]
+
+    @app.post("/fake/traces/{trace_id}")
+    async def emit_trace(trace_id: str):
+        """Add a just-finished trace to the project feed; returns its failing run"""
+        step = 0.01
+        runs = _build_runs(trace_id, runs_per_trace,
+                           datetime.utcnow() - timedelta(seconds=runs_per_trace * step), step)
+        app.state.feed.extend(runs)
+        return {"trace_id": trace_id, "failing_run_id": runs[-1]["id"]}
+
+    @app.post("/runs/query")
+    async def query_runs(body: Dict[str, Any] = Body(...)):
+        app.state.requests += 1
+        await asyncio.sleep(latency_seconds)
+
+        if "trace" in body:
+            runs = _build_runs(body["trace"], runs_per_trace)
+        else:
+            since = datetime.fromisoformat(body["start_time"])
+            runs = [run for run in app.state.feed if datetime.fromisoformat(run["start_time"]) >= since]
+        limit = int(body.get("limit", 100))
+        offset = int(body.get("cursor") or 0)
+        page = runs[offset:offset + limit]
+        next_cursor: Optional[str] = str(offset + limit) if offset + limit < len(runs) else None
+
+        return {"runs": page, "cursors": {"next": next_cursor}}
+
+    return app
+
+app = create_app()
+
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run(app, host="127.0.0.1", port=8100)
@@ -0,0 +1,47 @@
+"""
+In-process LLM providers with scripted latencies and failures.
+
+Each answers diagnosis prompts like the fake Anthropic client. Latency
+comes from a script: a fixed number, a list cycled per call, or a
+callable given the call number. Failures come from `fail_every` or a
+callable, so a degrading provider can be staged without a network.
+"""
+import asyncio
+import itertools
+from typing import Callable, Iterable, Optional, Union
+
+from app.services.llm_router import LLMProvider, Schema
+from demo.fakes.anthropic_client import answer_prompt
+
+LatencyScript = Union[float, Iterable[float], Callable[[int], float]]
+
+class ProviderOutage(Exception):
+    """Raised by a scripted provider for a failing call"""
+
+class ScriptedProvider(LLMProvider):
+    def __init__(self, name: str, latency: LatencyScript, max_concurrency: int = 100,
+                 fails: Optional[Callable[[int], bool]] = None, fail_every: int = 0):
+        super().__init__(name, max_concurrency)
+        if callable(latency):
+            self._latency = latency
+        elif isinstance(latency, (int, float)):
+            self._latency = lambda n: float(latency)
+        else:
+            cycle = list(latency)
+            self._latency = lambda n: cycle[n % len(cycle)]
+        self._fails = fails or (lambda n: fail_every > 0 and n % fail_every == fail_every - 1)
+        self._counter = itertools.count()
+        self.calls = 0
+        self.cancelled = 0
+
+    async def complete(self, prompt: str, max_tokens: int, schema: Optional[Schema] = None) -> str:
+        n = next(self._counter)
+        self.calls += 1
+        try:
+            await asyncio.sleep(self._latency(n))
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        if self._fails(n):
+            raise ProviderOutage(f"{self.name} call {n} failed")
+        return answer_prompt(prompt)
@@ -0,0 +1,72 @@
+"""
+Stand-in OTLP/HTTP collector for inspecting AHA pipeline spans offline.
+
+Accepts OTLP/JSON on POST /v1/traces and appends each span, flattened to
+the same shape the JSONL exporter writes, to `--out`, so
+`python -m demo.span_report` works on either.
+
+    python -m demo.fakes.otlp_collector --port 4318 --out collected_spans.jsonl
+"""
+import argparse
+import json
+from typing import Any, Dict, List, Optional
+
+from fastapi import FastAPI, Body
+
+def _attribute_value(value: Dict[str, Any]) -> Any:
+    if "intValue" in value:
+        return int(value["intValue"])
+    for key in ("doubleValue", "boolValue", "stringValue"):
+        if key in value:
+            return value[key]
+    return None
+
+def flatten(body: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """OTLP/JSON export request -> flat span dicts"""
+    spans = []
+    for resource_spans in body.get("resourceSpans", []):
+        for scope_spans in resource_spans.get("scopeSpans", []):
+            for span in scope_spans.get("spans", []):
+                start, end = int(span["startTimeUnixNano"]), int(span["endTimeUnixNano"])
+                status = span.get("status", {})
+                spans.append({
+                    "trace_id": span["traceId"],
+                    "span_id": span["spanId"],
+                    "parent_id": span.get("parentSpanId"),
+                    "name": span["name"],
+                    "start_ns": start,
+                    "end_ns": end,
+                    "duration_ms": round((end - start) / 1e6, 3),
+                    "attributes": {a["key"]: _attribute_value(a["value"]) for a in span.get("attributes", [])},
+                    "error": status.get("message") if status.get("code") == 2 else None
+                })
+    return spans
+
+def create_app(out_path: Optional[str] = None) -> FastAPI:
+    """Build a collector that keeps spans in memory and optionally on disk"""
+    app = FastAPI(title="Fake OTLP collector")
+    app.state.spans = []
+
+    @app.post("/v1/traces")
+    async def export_traces(body: Dict[str, Any] = Body(...)):
+        spans = flatten(body)
+        app.state.spans.extend(spans)
+        if out_path:
+            with open(out_path, "a") as out:
+                for span in spans:
+                    out.write(json.dumps(span) + "\n")
+        return {"partialSuccess": {}}
+
+    @app.get("/spans")
+    async def list_spans(trace_id: Optional[str] = None):
+        return [s for s in app.state.spans if trace_id is None or s["trace_id"] == trace_id]
+
+    return app
+
+if __name__ == "__main__":
+    import uvicorn
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--port", type=int, default=4318)
+    parser.add_argument("--out", default="collected_spans.jsonl")
+    args = parser.parse_args()
+    uvicorn.run(create_app(args.out), host="127.0.0.1", port=args.port)
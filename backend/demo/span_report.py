@@ -0,0 +1,55 @@
+"""
+Tail-latency report over exported AHA pipeline spans.
+
+Reads the JSONL written by AHA_TRACING_EXPORTER=jsonl (or the fake OTLP
+collector) and prints, per span name, the count and p50/p95/p99/max
+duration, then the slowest incidents with the spans that dominated them.
+
+    python -m demo.span_report aha_spans.jsonl --slowest 5
+"""
+import argparse
+import json
+from collections import defaultdict
+from typing import Any, Dict, List
+
+from demo.benchmark_pipeline import percentile
+
+def load_spans(path: str) -> List[Dict[str, Any]]:
+    with open(path) as spans:
+        return [json.loads(line) for line in spans if line.strip()]
+
+def report(spans: List[Dict[str, Any]], slowest: int) -> None:
+    by_name: Dict[str, List[float]] = defaultdict(list)
+    for span in spans:
+        by_name[span["name"]].append(span["duration_ms"])
+
+    print(f"{'span':<18}{'count':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for name, durations in sorted(by_name.items(), key=lambda item: -max(item[1])):
+        row = [percentile(durations, p) for p in (50, 95, 99)] + [max(durations)]
+        print(f"{name:<18}{len(durations):>7}" + "".join(f"{value:>10.1f}" for value in row))
+
+    # An incident's end-to-end time runs from its first span start to its last span end;
+    # later webhooks coalesced into it are not part of that
+    by_trace: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+    for span in spans:
+        if span["attributes"].get("status") != "coalesced":
+            by_trace[span["trace_id"]].append(span)
+
+    def total_ms(trace_spans: List[Dict[str, Any]]) -> float:
+        return (max(s["end_ns"] for s in trace_spans) - min(s["start_ns"] for s in trace_spans)) / 1e6
+
+    print(f"\nslowest {slowest} incidents")
+    for trace_id, trace_spans in sorted(by_trace.items(), key=lambda item: -total_ms(item[1]))[:slowest]:
+        incident = next((s["attributes"].get("incident_id") for s in trace_spans
+                         if s["attributes"].get("incident_id")), trace_id)
+        parts = [s for s in trace_spans if s["name"] != "process_incident"]
+        top = sorted(parts, key=lambda s: -s["duration_ms"])[:4]
+        print(f"{incident}  {total_ms(trace_spans):9.1f}ms  "
+              + ", ".join(f"{s['name']}={s['duration_ms']:.0f}ms" for s in top))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("path")
+    parser.add_argument("--slowest", type=int, default=5)
+    args = parser.parse_args()
+    report(load_spans(args.path), args.slowest)
@@ -74,6 +74,11 @@ const IncidentCard = ({ incident }) => {
           </h3>
         </div>
         <div className="flex items-center space-x-2">
+          {incident.occurrence_count > 1 && (
+            <span className="status-badge bg-red-100 text-red-800">
+              ×{incident.occurrence_count}
+            </span>
+          )}
           <span className={getStatusClass(incident.status)}>
             {incident.status}
           </span>
@@ -101,11 +106,21 @@ const IncidentCard = ({ incident }) => {
           <p className="text-sm text-blue-800 line-clamp-3">
             {incident.diagnosis}
           </p>
+          {incident.related_incident_id && (
+            <p className="text-xs text-blue-600 mt-1 font-mono">
+              Reused from similar incident {incident.related_incident_id.slice(0, 8)}
+            </p>
+          )}
           {incident.confidence_score && (
             <div className="mt-2">
               <span className="inline-flex items-center px-2 py-1 rounded-full text-xs font-medium bg-blue-100 text-blue-800">
                 Confidence: {formatConfidenceScore(incident.confidence_score)}
               </span>
+              {incident.error_category && (
+                <span className="ml-2 inline-flex items-center px-2 py-1 rounded-full text-xs font-medium bg-gray-100 text-gray-700">
+                  {incident.error_category}
+                </span>
+              )}
             </div>
           )}
         </div>
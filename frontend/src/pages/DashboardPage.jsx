@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from 'react'
+import React, { useState, useEffect, useRef } from 'react'
 import { RefreshCw, Trash2, AlertTriangle, TrendingUp } from 'lucide-react'
 import IncidentCard from '../components/IncidentCard'
 import DemoNarrative from '../components/demo/DemoNarrative'
@@ -8,17 +8,42 @@ import { incidentAPI } from '../services/api'
 
 const DashboardPage = () => {
   const [incidents, setIncidents] = useState([])
+  const [nextCursor, setNextCursor] = useState(null)
+  const [loadingMore, setLoadingMore] = useState(false)
   const [loading, setLoading] = useState(true)
   const [error, setError] = useState(null)
   const [refreshing, setRefreshing] = useState(false)
   const [currentDemoStep, setCurrentDemoStep] = useState(0)
   const [isDemoRunning, setIsDemoRunning] = useState(false)
+  // Store-wide counts; the incident list only holds the pages loaded so far
+  const [counts, setCounts] = useState(null)
+  const countsTimer = useRef(null)
+
+  const fetchCounts = async () => {
+    try {
+      const health = await incidentAPI.healthCheck()
+      setCounts({ total: health.incident_count, byStatus: health.incidents_by_status || {} })
+    } catch (err) {
+      console.error('Error fetching incident counts:', err)
+    }
+  }
+
+  // Coalesce a burst of live events into one count refresh
+  const scheduleCountsRefresh = () => {
+    if (countsTimer.current) return
+    countsTimer.current = setTimeout(() => {
+      countsTimer.current = null
+      fetchCounts()
+    }, 1000)
+  }
 
   const fetchIncidents = async () => {
     try {
       setError(null)
-      const data = await incidentAPI.getIncidents()
-      setIncidents(data)
+      fetchCounts()
+      const page = await incidentAPI.getIncidents()
+      setIncidents(page.items)
+      setNextCursor(page.next_cursor)
     } catch (err) {
       setError('Failed to fetch incidents')
       console.error('Error fetching incidents:', err)
@@ -28,6 +53,20 @@ const DashboardPage = () => {
     }
   }
 
+  const handleLoadMore = async () => {
+    setLoadingMore(true)
+    try {
+      const page = await incidentAPI.getIncidents({ cursor: nextCursor })
+      setIncidents(prev => [...prev, ...page.items])
+      setNextCursor(page.next_cursor)
+    } catch (err) {
+      setError('Failed to fetch incidents')
+      console.error('Error fetching incidents:', err)
+    } finally {
+      setLoadingMore(false)
+    }
+  }
+
   const handleRefresh = async () => {
     setRefreshing(true)
     await fetchIncidents()
@@ -38,6 +77,8 @@ const DashboardPage = () => {
       try {
         await incidentAPI.clearIncidents()
         setIncidents([])
+        setNextCursor(null)
+        fetchCounts()
       } catch (err) {
         setError('Failed to clear incidents')
         console.error('Error clearing incidents:', err)
@@ -83,18 +124,52 @@ const DashboardPage = () => {
     setIsDemoRunning(false)
   }
 
+  const applyIncidentEvent = ({ type, incident }) => {
+    scheduleCountsRefresh()
+    switch (type) {
+      case 'created':
+        setIncidents(prev => [incident, ...prev.filter(i => i.id !== incident.id)])
+        break
+      case 'updated':
+        setIncidents(prev => {
+          const exists = prev.some(i => i.id === incident.id)
+          return exists
+            ? prev.map(i => (i.id === incident.id ? incident : i))
+            : [incident, ...prev]
+        })
+        break
+      case 'cleared':
+        setIncidents([])
+        setNextCursor(null)
+        break
+      case 'reset':
+        // Missed too many events to replay - reload the first page
+        fetchIncidents()
+        break
+      default:
+        break
+    }
+  }
+
   useEffect(() => {
     fetchIncidents()
-    
-    // Auto-refresh every 30 seconds
-    const interval = setInterval(fetchIncidents, 30000)
-    return () => clearInterval(interval)
+
+    // Live updates instead of polling
+    const unsubscribe = incidentAPI.subscribeToIncidents(applyIncidentEvent)
+    return () => {
+      unsubscribe()
+      clearTimeout(countsTimer.current)
+    }
   }, [])
 
   const getStats = () => {
-    const total = incidents.length
-    const analyzed = incidents.filter(i => i.status === 'analyzed').length
-    const resolved = incidents.filter(i => i.status === 'resolved').length
+    // Fall back to the loaded incidents until the counts arrive
+    const countStatus = status => counts
+      ? counts.byStatus[status] || 0
+      : incidents.filter(i => i.status === status).length
+    const total = counts ? counts.total : incidents.length
+    const analyzed = countStatus('analyzed')
+    const resolved = countStatus('resolved')
     const avgConfidence = incidents
       .filter(i => i.confidence_score)
       .reduce((sum, i) => sum + i.confidence_score, 0) / 
@@ -199,7 +274,7 @@ const DashboardPage = () => {
           <div className="flex items-center">
             <TrendingUp className="h-8 w-8 text-aha-yellow" />
             <div className="ml-4">
-              <p className="text-sm font-medium text-gray-600">Avg Confidence</p>
+              <p className="text-sm font-medium text-gray-600">Avg Confidence (loaded)</p>
               <p className="text-2xl font-semibold text-gray-900">
                 {stats.avgConfidence ? `${Math.round(stats.avgConfidence * 100)}%` : 'N/A'}
               </p>
@@ -234,6 +309,15 @@ const DashboardPage = () => {
           {incidents.map((incident) => (
             <IncidentCard key={incident.id} incident={incident} />
           ))}
+          {nextCursor && (
+            <button
+              onClick={handleLoadMore}
+              disabled={loadingMore}
+              className="btn-secondary mx-auto"
+            >
+              {loadingMore ? 'Loading...' : 'Load more'}
+            </button>
+          )}
         </div>
       )}
     </div>
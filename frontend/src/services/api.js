@@ -39,11 +39,13 @@ api.interceptors.response.use(
 
 export const incidentAPI = {
   /**
-   * Get all incidents
+   * Get one page of incidents, newest first
+   * @param {Object} params - limit, cursor, status, error_type, since, until
+   * @returns {Promise<{items: Array, next_cursor: string|null}>}
    */
-  getIncidents: async () => {
+  getIncidents: async (params = {}) => {
     try {
-      const response = await api.get('/api/incidents');
+      const response = await api.get('/api/incidents', { params });
       return response.data;
     } catch (error) {
       console.error('Failed to fetch incidents:', error);
@@ -51,6 +53,27 @@ export const incidentAPI = {
     }
   },
 
+  /**
+   * Stream incident deltas over Server-Sent Events.
+   * EventSource reconnects on its own and resumes via Last-Event-ID.
+   * @param {Function} onEvent - called with {type, incident}
+   * @returns {Function} unsubscribe
+   */
+  subscribeToIncidents: (onEvent) => {
+    const source = new EventSource(`${API_BASE_URL}/api/incidents/stream`);
+    source.onmessage = (message) => {
+      try {
+        onEvent(JSON.parse(message.data));
+      } catch (error) {
+        console.error('Failed to parse incident event:', error);
+      }
+    };
+    source.onerror = () => {
+      console.warn('Incident stream disconnected, retrying...');
+    };
+    return () => source.close();
+  },
+
   /**
    * Get a specific incident by ID
    */
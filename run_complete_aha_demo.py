@@ -120,7 +120,7 @@ def check_incidents():
     try:
         response = requests.get(f"{AHA_BACKEND}/api/incidents")
         if response.status_code == 200:
-            incidents = response.json()
+            incidents = response.json()["items"]
             print(f"Found {len(incidents)} incidents:")
             for incident in incidents:
                 print(f"  - {incident.get('trace_id')}: {incident.get('diagnosis', 'Pending analysis')}")